@@ -1,107 +1,459 @@
 import tkinter as tk
-from tkinter import ttk, messagebox, simpledialog
-import csv
+from tkinter import ttk, messagebox, simpledialog, filedialog
+import argparse
 import datetime
+import time
+from collections.abc import Sequence
+
+from clevermart_core import (MARKUP, STOCK_LEVELS, Cart, CheckoutEngine, CheckoutError, CleverMartError,
+                             HistoryPages, InsufficientStockError, InventoryManager, StorageError)
+from clevermart_metrics import metrics
+from clevermart_server import InventoryClient, RemoteCart, RemoteCheckoutEngine, RemoteInventoryManager
+from clevermart_storage import BackgroundWriter, CSVBackend, SQLiteBackend
+
+STOCK_COLORS = {"sufficient": "green", "moderate": "yellow", "low": "red"}
+STOCK_TAGS = {"sufficient": "Sufficient stock", "moderate": "Moderate stock", "low": "Nearly out of stock"}
 
 # =============================================================================
-# Inventory Manager: Handles CSV‑Based Data Persistence
+# Product Grid: Virtualized, Widget-Recycling Shop Cards
 # =============================================================================
-class InventoryManager:
-    def __init__(self, csv_file="inventory.csv"):
-        self.csv_file = csv_file
-        self.items = []
-        self.load_inventory_data()
-
-    def load_inventory_data(self):
-        try:
-            with open(self.csv_file, "r", newline="") as csvfile:
-                reader = csv.DictReader(csvfile)
-                self.items.clear()
-                for row in reader:
-                    row["price"] = float(row["price"])
-                    row["quantity"] = int(row["quantity"])
-                    row["max"] = int(row["max"])
-                    if not row.get("category"):
-                        row["category"] = "Other"
-                    self.items.append(row)
-        except FileNotFoundError:
-            # No CSV exists; start with an empty inventory.
-            pass
-        except Exception as e:
-            messagebox.showerror("Load Error", f"Error loading inventory data:\n{e}")
+class ProductCard:
+    """One reusable shop card; bind() points it at a different product."""
+
+    def __init__(self, grid):
+        self.grid = grid
+        self.product = None
+        self.frame = tk.Frame(grid.canvas, bg="gray40", bd=2, relief="solid", padx=15, pady=10)
+        self.frame.pack_propagate(False)
+
+        self.header_frame = tk.Frame(self.frame, bg="green")
+        self.header_frame.pack(fill="x", padx=5, pady=2)
+        self.name_label = tk.Label(self.header_frame, font=("Segoe UI", 14, "bold"), bg="green", fg="white")
+        self.name_label.pack(side="left", padx=10)
+
+        content_frame = tk.Frame(self.frame, bg="gray40")
+        content_frame.pack(fill="x")
+        self.price_label = tk.Label(content_frame, font=("Segoe UI", 12), bg="gray40", fg="white")
+        self.price_label.pack(side="left", padx=10)
+        self.stock_label = tk.Label(content_frame, font=("Segoe UI", 12), bg="gray40", fg="lightgray")
+        self.stock_label.pack(side="right", padx=10)
+
+        qty_frame = tk.Frame(self.frame, bg="gray40")
+        qty_frame.pack(pady=5)
+        minus_btn = tk.Button(qty_frame, text="-", font=("Segoe UI", 10), width=3, bg="gray50", fg="white", command=lambda: self.change_qty(-1))
+        minus_btn.pack(side="left", padx=2)
+        self.qty_label = tk.Label(qty_frame, font=("Segoe UI", 10), width=4, bg="gray50", fg="white", relief="solid", bd=1)
+        self.qty_label.pack(side="left", padx=2)
+        plus_btn = tk.Button(qty_frame, text="+", font=("Segoe UI", 10), width=3, bg="gray50", fg="white", command=lambda: self.change_qty(1))
+        plus_btn.pack(side="left", padx=2)
+
+        btn_frame = tk.Frame(self.frame, bg="gray40")
+        btn_frame.pack(pady=(5, 10), fill="x")
+        add_cart_btn = tk.Button(btn_frame, text="Add to Cart", font=("Segoe UI", 12), bg="blue", fg="white", relief="flat", command=lambda: self.grid.on_add(self.product, self.grid.quantity(self.product), False))
+        add_cart_btn.pack(side="left", expand=True, fill="x", padx=2)
+        buy_now_btn = tk.Button(btn_frame, text="Buy Now", font=("Segoe UI", 12), bg="green", fg="white", relief="flat", command=lambda: self.grid.on_add(self.product, self.grid.quantity(self.product), True))
+        buy_now_btn.pack(side="left", expand=True, fill="x", padx=2)
+
+        self.frame.bind("<Enter>", lambda event: self.frame.config(bg="gray50"))
+        self.frame.bind("<Leave>", lambda event: self.frame.config(bg="gray40"))
+        self.window_id = grid.canvas.create_window(0, 0, window=self.frame, anchor="nw",
+                                                   width=grid.card_width, height=ProductGrid.CARD_HEIGHT)
+
+    def bind(self, product):
+        self.product = product
+        current_stock = product["quantity"]
+        stock_color = STOCK_COLORS[self.grid.level_of(product["name"])]
+        self.header_frame.config(bg=stock_color)
+        self.name_label.config(text=product["name"], bg=stock_color)
+        self.price_label.config(text=f"Price: ₱{product['price'] * MARKUP:.2f}")
+        self.stock_label.config(text=f"Stock: {current_stock}")
+        self.qty_label.config(text=str(self.grid.quantity(product)))
+
+    def change_qty(self, delta):
+        qty = max(1, self.grid.quantity(self.product) + delta)
+        self.grid.quantities[self.product["name"]] = qty
+        self.qty_label.config(text=str(qty))
+
+
+class ProductGrid:
+    """Two-column product grid on a Canvas that only materializes visible rows.
+
+    Cards are recycled as the view scrolls, so the widget count depends on the
+    viewport height rather than the number of products.  Selected quantities
+    live in a plain dict keyed by product name.  ``level_of`` maps a name
+    to its stock level for the card colour.
+    """
+    COLUMNS = 2
+    ROW_HEIGHT = 190
+    CARD_HEIGHT = 170
+    BUFFER_ROWS = 1
+
+    def __init__(self, parent, products, on_add, level_of):
+        self.on_add = on_add
+        self.level_of = level_of
+        self.quantities = {}
+        self.cards = {}   # product index -> bound ProductCard
+        self.spare = []   # hidden cards ready for reuse
+        self.card_width = 1
+
+        self.canvas = tk.Canvas(parent, bg="gray20", highlightthickness=0)
+        self.canvas.pack(side="left", fill="both", expand=True, padx=10, pady=10)
+        self.scrollbar = ttk.Scrollbar(parent, orient="vertical", command=self.canvas.yview)
+        self.scrollbar.pack(side="right", fill="y")
+        self.canvas.configure(yscrollcommand=self._on_scroll)
+        self.canvas.bind("<Configure>", self._on_resize)
+        self.empty_text = self.canvas.create_text(20, 20, anchor="nw", text="No products available in this category.",
+                                                  font=("Segoe UI", 14), fill="lightgray")
+        self.set_products(products)
+
+    def set_products(self, products):
+        """Show a new product list, reusing the existing cards."""
+        for index in list(self.cards):
+            self._release(index)
+        self.products = list(products)
+        self.names = {product["name"] for product in self.products}
+        self.canvas.itemconfigure(self.empty_text, state="hidden" if self.products else "normal")
+        rows = -(-len(self.products) // self.COLUMNS)
+        self.canvas.configure(scrollregion=(0, 0, 0, rows * self.ROW_HEIGHT))
+        self.render()
+
+    def patch(self, product):
+        """Rebind the card showing this product, if it is on screen."""
+        for card in self.cards.values():
+            if card.product is product:
+                card.bind(product)
+
+    def quantity(self, product):
+        return self.quantities.get(product["name"], 1)
+
+    def _on_scroll(self, first, last):
+        self.scrollbar.set(first, last)
+        self.render()
+
+    def _on_resize(self, event):
+        # Column positions depend on the width, so re-place every card.
+        self.card_width = max(1, event.width // self.COLUMNS - 20)
+        for card in list(self.cards.values()) + self.spare:
+            self.canvas.itemconfigure(card.window_id, width=self.card_width)
+        for index in list(self.cards):
+            self._release(index)
+        self.render()
+
+    def _release(self, index):
+        card = self.cards.pop(index)
+        self.canvas.itemconfigure(card.window_id, state="hidden")
+        self.spare.append(card)
+
+    def render(self):
+        with metrics.timer("grid_render"):
+            self._render()
+
+    def _render(self):
+        top = self.canvas.canvasy(0)
+        height = self.canvas.winfo_height()
+        first_row = max(0, int(top // self.ROW_HEIGHT) - self.BUFFER_ROWS)
+        last_row = int((top + height) // self.ROW_HEIGHT) + self.BUFFER_ROWS
+        wanted = range(first_row * self.COLUMNS, min(len(self.products), (last_row + 1) * self.COLUMNS))
+
+        for index in [i for i in self.cards if i not in wanted]:
+            self._release(index)
+        for index in wanted:
+            if index in self.cards:
+                continue
+            card = self.spare.pop() if self.spare else ProductCard(self)
+            card.bind(self.products[index])
+            row, col = divmod(index, self.COLUMNS)
+            self.canvas.coords(card.window_id, 10 + col * (self.card_width + 20), row * self.ROW_HEIGHT + 10)
+            self.canvas.itemconfigure(card.window_id, state="normal")
+            self.cards[index] = card
 
-    def save_inventory_data(self):
-        try:
-            with open(self.csv_file, "w", newline="") as csvfile:
-                fieldnames = ["name", "price", "quantity", "max", "category"]
-                writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-                writer.writeheader()
-                for item in self.items:
-                    writer.writerow(item)
-        except Exception as e:
-            messagebox.showerror("Save Error", f"Error saving inventory data:\n{e}")
+# =============================================================================
+# Tree Loader: Time-Sliced, Cancellable Treeview Population
+# =============================================================================
+def _sort_key(text):
+    try:
+        return (0, float(text.replace("₱", "").replace(",", "")))
+    except ValueError:
+        return (1, text.lower())
+
+
+class TreeLoader:
+    """Fills a Treeview in time-sliced batches so the mainloop stays responsive.
+
+    load() cancels any population still in flight.  Clicking a column heading
+    sorts the rows by moving them in place rather than re-inserting them.
+    """
+    SLICE_MS = 15
+
+    def __init__(self, tree, progress=None):
+        self.tree = tree
+        self.progress = progress
+        self.job = None
+        self.rows = []
+        self.position = 0
+        self.render = None
+        self.started = 0.0
+        self.sort_column = None
+        self.sort_reverse = False
+        for col in tree["columns"]:
+            tree.heading(col, command=lambda c=col: self.sort_by(c))
+
+    def load(self, rows, render):
+        """Replace the tree's rows; render(row) returns (values, tags).
+
+        A Sequence (a list, a TransactionLog) is read in place as the slices run.
+        """
+        self.cancel()
+        self.tree.delete(*self.tree.get_children())
+        self.rows = rows if isinstance(rows, Sequence) else list(rows)
+        self.render = render
+        self.position = 0
+        self.started = time.perf_counter()
+        if self.progress is not None:
+            self.progress.config(maximum=max(1, len(self.rows)), value=0)
+        self._step()
+
+    def cancel(self):
+        if self.job is not None:
+            self.tree.after_cancel(self.job)
+            self.job = None
+
+    def _step(self):
+        self.job = None
+        if not self.tree.winfo_exists():
+            return
+        deadline = time.perf_counter() + self.SLICE_MS / 1000
+        rows, render, insert = self.rows, self.render, self.tree.insert
+        while self.position < len(rows):
+            values, tags = render(rows[self.position])
+            insert("", "end", values=values, tags=tags)
+            self.position += 1
+            if self.position % 50 == 0 and time.perf_counter() >= deadline:
+                break
+        if self.progress is not None:
+            self.progress.config(value=self.position)
+        if self.position < len(rows):
+            self.job = self.tree.after(1, self._step)
+            return
+        metrics.record("tree_populate", time.perf_counter() - self.started)
+        metrics.count("tree_rows", len(rows))
+        if self.sort_column is not None:
+            self._apply_sort()
+
+    def sort_by(self, column):
+        self.sort_reverse = not self.sort_reverse if column == self.sort_column else False
+        self.sort_column = column
+        if self.job is None:
+            self._apply_sort()
+        # Otherwise the sort is applied once the remaining rows are in.
+
+    def _apply_sort(self):
+        tree, column = self.tree, self.sort_column
+        ordered = sorted(tree.get_children(""), key=lambda iid: _sort_key(tree.set(iid, column)),
+                         reverse=self.sort_reverse)
+        for position, iid in enumerate(ordered):
+            tree.move(iid, "", position)
 
 # =============================================================================
 # Main Application: CleverMartApp
 # =============================================================================
 class CleverMartApp:
-    def __init__(self, root):
+    SEARCH_DEBOUNCE_MS = 200
+    LOAD_SLICE_MS = 15         # catalog loading work per event-loop turn
+    LOAD_REFRESH_MS = 500      # how often a visible shop view picks up newly loaded products
+    GROUP_COMMIT_MS = 10       # with --durability group, how long a write waits to share its fsync
+    SERVER_SYNC_MS = 1000      # with --server, how often other tills' catalog changes are pulled in
+    PERF_REFRESH_MS = 1000     # how often an open performance panel redraws
+    CONFIRM_POLL_MS = 5        # how often a paid sale checks whether the writer has stored it
+
+    def __init__(self, root, storage=None, group_commit=False, client=None):
         self.root = root
         self.root.title("CleverMart")
         self.root.geometry("700x500")
         self.root.resizable(False, False)
         self.root.config(bg="gray20")
 
-        self.inventory_manager = InventoryManager()
+        self.closed = False
+        self.confirming = False  # set while a paid sale waits for the writer, which then reports any failure
+        self.reported_error = None  # the write failure last shown, so one failure is shown once
+        self.server_down = False  # set while sync_with_server is failing, so an outage is reported once
+        self.root.protocol("WM_DELETE_WINDOW", self.shutdown)
+        if client is not None:
+            # An inventory server owns the catalog: the cart reserves stock there
+            # and the local catalog is a replica kept current by sync_with_server.
+            self.inventory_manager = RemoteInventoryManager(client)
+            self.storage = self.inventory_manager.storage
+            self.cart = RemoteCart(client)
+            self.checkout_engine = RemoteCheckoutEngine(self.inventory_manager)
+        else:
+            # Writes go through a worker thread so a slow disk never stalls the UI.
+            self.storage = BackgroundWriter(storage or CSVBackend(), on_error=self.report_storage_error,
+                                            group_ms=self.GROUP_COMMIT_MS if group_commit else 0)
+            self.inventory_manager = InventoryManager(storage=self.storage, load=False)
+            self.cart = Cart()             # Current purchase cart.
+            self.checkout_engine = CheckoutEngine(self.inventory_manager)  # Transactions load on first admin view.
+        self.inventory_load = None
+        self.load_started = 0.0
+        self.last_load_refresh = 0.0
 
-        self.cart = []                 # Current purchase cart.
-        self.sales_history = []        # Detailed per-item sales.
-        self.transaction_history = []  # Overall purchase transactions.
-        self.load_transaction_data()
         self.current_category = "Snacks & Sweets"
         self.previous_screen = None
 
-        self.product_widgets = []
+        self.shop_frame = None
+        self.category_views = {}  # category -> (frame, ProductGrid), built on first visit
+        self.stale_categories = set()
+        self.refresh_pending = False
+        self.inventory_manager.subscribe(self.on_inventory_change)
+        self.inventory_manager.subscribe_stock_alerts(self.on_stock_alert)
+        self.monitoring_button = None
+        self.stock_view = None  # (Treeview, level shown or "All", TreeLoader) while Stock Monitoring is open
+        self.stock_refresh_pending = False
         self.guest_frame = None
         self.admin_frame = None
         self.inventory_tree = None
+        self.inventory_loader = None
+        self.filter_job = None
+        self.performance_window = None
 
         self.setup_welcome_screen()
+        self.start_inventory_load()
+        if client is not None:
+            self.root.after(self.SERVER_SYNC_MS, self.sync_with_server)
+
+    # ------------------------------------------------------------------------------
+    # Inventory Loading: Streamed In Between Events
+    # ------------------------------------------------------------------------------
+    def start_inventory_load(self):
+        # The window is up before any data is read; products become available
+        # batch by batch while the event loop keeps running.
+        self.load_started = time.perf_counter()
+        self.inventory_load = self.inventory_manager.load_inventory_incrementally()
+        self.root.after_idle(self.continue_inventory_load)
+
+    def continue_inventory_load(self):
+        deadline = time.perf_counter() + self.LOAD_SLICE_MS / 1000
+        try:
+            for _ in self.inventory_load:
+                if time.perf_counter() >= deadline:
+                    break
+        except StorageError as e:
+            self.inventory_load = None
+            messagebox.showerror("Load Error", str(e))
+            return
+        if self.inventory_manager.loaded:
+            self.inventory_load = None
+            metrics.record("inventory_load", time.perf_counter() - self.load_started)
+        now = time.perf_counter()
+        if self.inventory_load is None or now - self.last_load_refresh >= self.LOAD_REFRESH_MS / 1000:
+            self.last_load_refresh = now
+            self.stale_categories.update(self.category_views)
+            if self.shop_frame is not None and self.shop_frame.winfo_ismapped():
+                self.refresh_stale_view()
+        if self.inventory_load is not None:
+            self.root.after(1, self.continue_inventory_load)
+        elif self.inventory_tree is not None and self.inventory_tree.winfo_exists():
+            self.populate_inventory_table()
+
+    def sync_with_server(self):
+        if self.closed:
+            return
+        if self.inventory_manager.loaded:
+            try:
+                self.inventory_manager.sync()
+            except StorageError as e:
+                # The server may be restarting: keep retrying every tick, but only
+                # show one dialog per outage.
+                if not self.server_down:
+                    self.server_down = True
+                    messagebox.showerror("Sync Error", f"Lost contact with the inventory server; "
+                                                       f"retrying in the background:\n{e}")
+            else:
+                self.server_down = False
+        self.root.after(self.SERVER_SYNC_MS, self.sync_with_server)
+
+    # ------------------------------------------------------------------------------
+    # Background Writes: Error Reporting and Shutdown
+    # ------------------------------------------------------------------------------
+    def report_storage_error(self, error):
+        # Called on the writer thread; show the error from the Tk event loop.
+        self.root.after(0, lambda: self.show_storage_error(error))
+
+    def show_storage_error(self, error):
+        # A sale waiting for confirmation reports the failure in its own dialog.
+        if self.confirming or error is self.reported_error:
+            return
+        self.reported_error = error
+        messagebox.showerror("Save Error", f"Changes could not be saved and will be retried:\n{error}")
+
+    def confirm_sale(self, ticket, change, window):
+        """Confirm a paid sale once the writer has stored it, polling from the event loop.
+
+        Only the writes up to the sale's ticket are waited for, so the UI
+        never blocks on the rest of the queue.
+        """
+        status = self.storage.status(ticket)
+        if status == "pending":
+            self.confirming = True
+            self.root.after(self.CONFIRM_POLL_MS, lambda: self.confirm_sale(ticket, change, window))
+            return
+        self.confirming = False
+        if status == "failed":
+            self.reported_error = self.storage.error
+            messagebox.showwarning("Payment Accepted", f"Your change is ₱{change:.2f}.\n"
+                                                       f"The sale could not be saved yet and will be retried:\n"
+                                                       f"{self.reported_error}")
+        else:
+            messagebox.showinfo("Payment Successful", f"Payment accepted. Your change is ₱{change:.2f}.")
+        if window.winfo_exists():
+            window.destroy()
+
+    def shutdown(self):
+        if self.closed:
+            return
+        self.closed = True
+        try:
+            self.storage.close()  # waits for every queued write
+        except Exception as e:
+            messagebox.showerror("Save Error", f"Some changes could not be saved:\n{e}")
+        self.root.destroy()
 
     # ------------------------------------------------------------------------------
     # Transaction Data Persistence Methods
     # ------------------------------------------------------------------------------
+    @property
+    def sales_history(self):
+        return self.checkout_engine.sales_history  # Per-item sales of this session; older lines via sales_between().
+
+    @property
+    def transaction_history(self):
+        return self.checkout_engine.transaction_history  # Overall purchase transactions.
+
     def load_transaction_data(self):
         try:
-            with open("transactions.csv", "r", newline="") as csvfile:
-                reader = csv.DictReader(csvfile)
-                self.transaction_history.clear()
-                for row in reader:
-                    row["total_sale"] = float(row["total_sale"])
-                    row["total_profit"] = float(row["total_profit"])
-                    row["tendered"] = float(row["tendered"])
-                    row["change"] = float(row["change"])
-                    self.transaction_history.append(row)
-        except FileNotFoundError:
-            self.transaction_history = []
-        except Exception as e:
-            messagebox.showerror("Load Error", f"Error loading transactions data:\n{e}")
+            self.checkout_engine.ensure_transactions()
+        except StorageError as e:
+            messagebox.showerror("Load Error", str(e))
 
-    def save_transaction_data(self):
+    def load_sales_summary(self):
         try:
-            with open("transactions.csv", "w", newline="") as csvfile:
-                fieldnames = ["date", "total_sale", "total_profit", "tendered", "change"]
-                writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-                writer.writeheader()
-                for trans in self.transaction_history:
-                    writer.writerow(trans)
-        except Exception as e:
-            messagebox.showerror("Save Error", f"Error saving transactions data:\n{e}")
+            self.checkout_engine.ensure_summary()
+        except StorageError as e:
+            messagebox.showerror("Load Error", str(e))
+
+    def clear_transaction_data(self):
+        """Clear the purchase history; returns False if it could not be cleared."""
+        try:
+            self.checkout_engine.clear_transactions()
+        except StorageError as e:
+            messagebox.showerror("Save Error", str(e))
+            return False
+        return True
 
     # ------------------------------------------------------------------------------
     # Welcome Screen & Root Clearing Utility
     # ------------------------------------------------------------------------------
     def setup_welcome_screen(self):
+        self.root.unbind("<Control-P>")
         self.clear_root()
         self.welcome_label = tk.Label(self.root, text="Welcome to CleverMart!",
                                       font=("Comic Sans MS", 28, "italic"), fg="white", bg="gray20")
@@ -120,7 +472,11 @@ class CleverMartApp:
 
     def clear_root(self):
         for widget in self.root.winfo_children():
-            widget.destroy()
+            if widget is self.shop_frame:
+                # The shop and its per-category views are kept for reuse.
+                widget.place_forget()
+            else:
+                widget.destroy()
 
     # ------------------------------------------------------------------------------
     # Guest Interface & Shop Screen
@@ -143,7 +499,7 @@ class CleverMartApp:
         shop_button.pack(pady=(0, 10))
         exit_button = tk.Button(self.guest_frame, text="Exit",
                                 font=("Arial", 12), bg="gray50", fg="white", width=20, height=2,
-                                command=self.root.quit)
+                                command=self.shutdown)
         exit_button.pack(pady=(0, 10))
         return_button = tk.Button(self.guest_frame, text="Return Home",
                                   font=("Arial", 12), bg="gray40", fg="white", width=20, height=2,
@@ -151,14 +507,40 @@ class CleverMartApp:
         return_button.pack(pady=(0, 10))
 
     def display_shop_screen(self, selected_category="Snacks & Sweets"):
+        with metrics.timer("shop_screen"):
+            self._display_shop_screen(selected_category)
+
+    def _display_shop_screen(self, selected_category):
         self.previous_screen = "guest"
         self.current_category = selected_category
         self.clear_root()
-
-        shop_frame = tk.Frame(self.root, bg="gray20")
-        shop_frame.place(relx=0.5, rely=0.5, anchor="center", relwidth=0.95, relheight=0.9)
-
-        top_bar = tk.Frame(shop_frame, bg="gray30")
+        if self.shop_frame is None:
+            self.build_shop_frame()
+        self.shop_frame.place(relx=0.5, rely=0.5, anchor="center", relwidth=0.95, relheight=0.9)
+        self.shop_title.config(text=selected_category)
+
+        # Each category keeps its built view; switching just raises it.
+        if selected_category not in self.category_views:
+            view = tk.Frame(self.shop_views, bg="gray20")
+            view.place(relx=0, rely=0, relwidth=1, relheight=1)
+            grid = ProductGrid(view, self.inventory_manager.items_in_category(selected_category),
+                               on_add=lambda p, qty, checkout: self.add_to_cart(p, qty, checkout=checkout),
+                               level_of=self.inventory_manager.get_stock_level)
+            self.category_views[selected_category] = (view, grid)
+        self.refresh_stale_view()
+        self.category_views[selected_category][0].tkraise()
+
+    def refresh_stale_view(self):
+        self.refresh_pending = False
+        category = self.current_category
+        if category in self.stale_categories and category in self.category_views:
+            self.stale_categories.discard(category)
+            self.category_views[category][1].set_products(self.inventory_manager.items_in_category(category))
+
+    def build_shop_frame(self):
+        self.shop_frame = tk.Frame(self.root, bg="gray20")
+
+        top_bar = tk.Frame(self.shop_frame, bg="gray30")
         top_bar.pack(fill="x", padx=10, pady=10)
         snacks_btn = tk.Button(top_bar, text="Snacks & Sweets", font=("Segoe UI", 12), bg="gray35", fg="white", command=lambda: self.display_shop_screen("Snacks & Sweets"))
         snacks_btn.pack(side="left", padx=5)
@@ -167,103 +549,42 @@ class CleverMartApp:
         cart_btn = tk.Button(top_bar, text="View Cart", font=("Segoe UI", 12), bg="dodgerblue", fg="white", command=self.view_cart)
         cart_btn.pack(side="right", padx=5)
 
-        title_label = tk.Label(shop_frame, text=selected_category, font=("Segoe UI", 20, "bold"), bg="gray20", fg="white")
-        title_label.pack(pady=(0, 10))
-
-        canvas = tk.Canvas(shop_frame, bg="gray20", highlightthickness=0)
-        canvas.pack(side="left", fill="both", expand=True, padx=10, pady=10)
-        scrollbar = ttk.Scrollbar(shop_frame, orient="vertical", command=canvas.yview)
-        scrollbar.pack(side="right", fill="y")
-        canvas.configure(yscrollcommand=scrollbar.set)
-        inner_frame = tk.Frame(canvas, bg="gray20")
-        canvas.create_window((0, 0), window=inner_frame, anchor="nw")
-        inner_frame.bind("<Configure>", lambda event: canvas.configure(scrollregion=canvas.bbox("all")))
-        inner_frame.grid_columnconfigure(0, weight=1)
-        inner_frame.grid_columnconfigure(1, weight=1)
-
-        filtered_products = [prod for prod in self.inventory_manager.items if prod.get("category") == selected_category]
-        if not filtered_products:
-            no_prod_label = tk.Label(inner_frame, text="No products available in this category.", font=("Segoe UI", 14), bg="gray20", fg="lightgray")
-            no_prod_label.pack(pady=20)
-        else:
-            max_cols = 2
-            for idx, prod in enumerate(filtered_products):
-                row = idx // max_cols
-                col = idx % max_cols
-
-                max_stock = prod.get("max", prod["quantity"])
-                current_stock = prod["quantity"]
-                if current_stock >= 0.75 * max_stock:
-                    stock_color = "green"
-                elif current_stock >= 0.25 * max_stock:
-                    stock_color = "yellow"
-                else:
-                    stock_color = "red"
-
-                card = tk.Frame(inner_frame, bg="gray40", bd=2, relief="solid", padx=15, pady=10)
-                card.grid(row=row, column=col, padx=10, pady=10, sticky="n")
-
-                header_frame = tk.Frame(card, bg=stock_color)
-                header_frame.pack(fill="x", padx=5, pady=2)
-               
-                name_label = tk.Label(header_frame, text=prod["name"], font=("Segoe UI", 14, "bold"),bg=stock_color, fg="white")
-                name_label.pack(side="left", padx=10)
-
-                content_frame = tk.Frame(card, bg="gray40")
-                content_frame.pack(fill="x")
-               
-                marked_price = prod["price"] * 1.10
-               
-                price_label = tk.Label(content_frame, text=f"Price: ₱{marked_price:.2f}", font=("Segoe UI", 12),bg="gray40", fg="white")
-                price_label.pack(side="left", padx=10)
-               
-                stock_label = tk.Label(content_frame, text=f"Stock: {current_stock}", font=("Segoe UI", 12), bg="gray40", fg="lightgray")
-                stock_label.pack(side="right", padx=10)
-
-                qty_var = tk.IntVar(value=1)
-                qty_frame = tk.Frame(card, bg="gray40")
-                qty_frame.pack(pady=5)
-               
-                minus_btn = tk.Button(qty_frame, text="-", font=("Segoe UI", 10), width=3,bg="gray50", fg="white", command=lambda var=qty_var: var.set(max(1, var.get() - 1)))
-                minus_btn.pack(side="left", padx=2)
-               
-                qty_display = tk.Label(qty_frame, textvariable=qty_var, font=("Segoe UI", 10), width=4, bg="gray50", fg="white", relief="solid", bd=1)
-                qty_display.pack(side="left", padx=2)
-               
-                plus_btn = tk.Button(qty_frame, text="+", font=("Segoe UI", 10), width=3, bg="gray50", fg="white", command=lambda var=qty_var: var.set(var.get() + 1))
-                plus_btn.pack(side="left", padx=2)
-
-                btn_frame = tk.Frame(card, bg="gray40")
-                btn_frame.pack(pady=(5, 10), fill="x")
-               
-                add_cart_btn = tk.Button(btn_frame, text="Add to Cart", font=("Segoe UI", 12), bg="blue", fg="white", relief="flat", command=lambda p=prod, var=qty_var: self.add_to_cart(p, var.get(), checkout=False))
-                add_cart_btn.pack(side="left", expand=True, fill="x", padx=2)
-               
-                buy_now_btn = tk.Button(btn_frame, text="Buy Now", font=("Segoe UI", 12), bg="green", fg="white", relief="flat",command=lambda p=prod, var=qty_var: self.add_to_cart(p, var.get(), checkout=True))
-                buy_now_btn.pack(side="left", expand=True, fill="x", padx=2)
-
-                card.bind("<Enter>", lambda event, frame=card: frame.config(bg="gray50"))
-                card.bind("<Leave>", lambda event, frame=card: frame.config(bg="gray40"))
-
-        return_button = tk.Button(shop_frame, text="Return Home", font=("Segoe UI", 14), bg="gray30", fg="white", command=self.setup_welcome_screen)
-        return_button.pack(pady=(10, 20))
-        self.product_widgets.append(return_button)
+        self.shop_title = tk.Label(self.shop_frame, font=("Segoe UI", 20, "bold"), bg="gray20", fg="white")
+        self.shop_title.pack(pady=(0, 10))
+
+        return_button = tk.Button(self.shop_frame, text="Return Home", font=("Segoe UI", 14), bg="gray30", fg="white", command=self.setup_welcome_screen)
+        return_button.pack(side="bottom", pady=(10, 20))
+
+        self.shop_views = tk.Frame(self.shop_frame, bg="gray20")
+        self.shop_views.pack(fill="both", expand=True)
+
+    def on_inventory_change(self, event, item):
+        # Stock/price changes patch the one card showing the product; anything
+        # that changes which products a category holds marks that view stale.
+        category = item["category"]
+        if category not in self.category_views:
+            return
+        if event == "update":
+            self.category_views[category][1].patch(item)
+            return
+        self.stale_categories.add(category)
+        if category == self.current_category and self.shop_frame.winfo_ismapped() and not self.refresh_pending:
+            # Coalesce a burst of changes (e.g. a multi-line checkout) into one rebuild.
+            self.refresh_pending = True
+            self.root.after_idle(self.refresh_stale_view)
 
     # ------------------------------------------------------------------------------
     # add_to_cart: Accepts a checkout flag.
     # ------------------------------------------------------------------------------
     def add_to_cart(self, product, qty, checkout=False):
-        if product["quantity"] < qty:
-            messagebox.showerror("Stock Error", f"Insufficient stock for {product['name']}.")
+        try:
+            self.cart.add(product, qty)
+        except InsufficientStockError as e:
+            messagebox.showerror("Stock Error", str(e))
+            return
+        except CleverMartError as e:
+            messagebox.showerror("Cart Error", str(e))
             return
-        for item in self.cart:
-            if item["name"] == product["name"]:
-                item["quantity"] += qty
-                messagebox.showinfo("Cart", f"Added {qty} x {product['name']} to your cart!")
-                if checkout:
-                    self.view_cart()
-                return
-        self.cart.append({"name": product["name"], "price": product["price"], "quantity": qty})
         messagebox.showinfo("Cart", f"Added {qty} x {product['name']} to your cart!")
         if checkout:
             self.view_cart()
@@ -324,14 +645,11 @@ class CleverMartApp:
         
         def refresh_cart():
             cart_tree.delete(*cart_tree.get_children())
-            new_total = 0
             for item in self.cart:
-                marked_price = item["price"] * 1.10
+                marked_price = item["price"] * MARKUP
                 subtotal = marked_price * item["quantity"]
-                new_total += subtotal
                 cart_tree.insert("", "end", values=(item["name"], f"₱{marked_price:.2f}", item["quantity"], f"₱{subtotal:.2f}"))
-            total_label.config(text=f"Total: ₱{new_total:.2f}")
-            return new_total
+            total_label.config(text=f"Total: ₱{self.cart.total:.2f}")
 
         def deduct_item():
             selected_item = cart_tree.selection()
@@ -340,15 +658,13 @@ class CleverMartApp:
                 return
             item_values = cart_tree.item(selected_item[0], "values")
             product_name = item_values[0]
-            for cart_item in self.cart:
-                if cart_item["name"] == product_name:
-                    if cart_item["quantity"] > 1:
-                        cart_item["quantity"] -= 1
-                        messagebox.showinfo("Cart", f"Deducted 1 unit of {product_name}.")
-                    else:
-                        if messagebox.askyesno("Remove Item", f"Do you want to remove {product_name} from the cart?"):
-                            self.cart.remove(cart_item)
-                    break
+            cart_item = self.cart.get(product_name)
+            if cart_item is not None:
+                if cart_item["quantity"] > 1:
+                    self.cart.deduct(product_name)
+                    messagebox.showinfo("Cart", f"Deducted 1 unit of {product_name}.")
+                elif messagebox.askyesno("Remove Item", f"Do you want to remove {product_name} from the cart?"):
+                    self.cart.remove(product_name)
             refresh_cart()
 
         def process_payment():
@@ -357,38 +673,23 @@ class CleverMartApp:
             except ValueError:
                 messagebox.showerror("Input Error", "Please enter a valid amount.")
                 return
-            current_total = sum(item["price"] * 1.10 * item["quantity"] for item in self.cart)
-            if tendered < current_total:
-                messagebox.showerror("Payment Error", "Insufficient amount tendered.")
+            try:
+                transaction = self.checkout_engine.checkout(self.cart, tendered)
+            except CheckoutError as e:
+                messagebox.showerror("Payment Error", str(e))
+                return
+            except InsufficientStockError as e:
+                messagebox.showerror("Stock Error", str(e))
+                return
+            except StorageError as e:
+                messagebox.showerror("Save Error", str(e))
                 return
-            change = tendered - current_total
+            change = transaction["change"]
             change_label.config(text=f"Change: ₱{change:.2f}")
-            for cart_item in self.cart:
-                product = next((p for p in self.inventory_manager.items if p["name"] == cart_item["name"]), None)
-                if product:
-                    product["quantity"] -= cart_item["quantity"]
-                    if product["quantity"] <= 0:
-                        self.inventory_manager.items.remove(product)
-            self.inventory_manager.save_inventory_data()
-            for cart_item in self.cart:
-                self.sales_history.append({
-                    "name": cart_item["name"],
-                    "quantity": cart_item["quantity"],
-                    "cost": cart_item["price"],
-                    "selling_price": cart_item["price"] * 1.10
-                })
-            transaction = {
-                "date": datetime.datetime.now().strftime("%Y-%m-%d"),
-                "total_sale": current_total,
-                "total_profit": sum(cart_item["price"] * 0.10 * cart_item["quantity"] for cart_item in self.cart),
-                "tendered": tendered,
-                "change": change
-            }
-            self.transaction_history.append(transaction)
-            self.save_transaction_data()
-            messagebox.showinfo("Payment Successful", f"Payment accepted. Your change is ₱{change:.2f}.")
-            self.cart.clear()
-            cart_win.destroy()
+            pay_btn.config(state="disabled")
+            # Confirmed once the writer has stored the sale (on disk, with fsync
+            # and group durability); a failed write is retried by the writer.
+            self.confirm_sale(self.storage.ticket(), change, cart_win)
 
         def return_home():
             if messagebox.askyesno("Return Home", "Returning home will clear your cart. Proceed?"):
@@ -449,6 +750,8 @@ class CleverMartApp:
     def continue_as_admin(self):
         self.previous_screen = "admin"
         self.clear_root()
+        # Not on the dashboard: Ctrl+Shift+P opens the performance panel.
+        self.root.bind("<Control-P>", lambda event: self.performance_panel())
         self.admin_frame = tk.Frame(self.root, bg="gray20")
         self.admin_frame.place(relx=0.5, rely=0.5, anchor="center", width=700, height=500)
        
@@ -466,15 +769,96 @@ class CleverMartApp:
                        width=20, height=2, command=self.pos_interface)
         pos_button.pack(pady=(15, 5))
        
-        monitoring_button = tk.Button(self.admin_frame, text="Stock Monitoring",
-                          font=("Segoe UI", 12), bg="orange", fg="white",
-                          width=20, height=2, command=self.stock_monitoring)
-        monitoring_button.pack(pady=(15, 5))
+        self.monitoring_button = tk.Button(self.admin_frame, font=("Segoe UI", 12), bg="orange", fg="white",
+                                           width=20, height=2, command=self.stock_monitoring)
+        self.monitoring_button.pack(pady=(15, 5))
+        self.update_low_stock_count()
+
+        reports_button = tk.Button(self.admin_frame, text="Reports", font=("Segoe UI", 12), bg="purple", fg="white",
+                                   width=20, height=2, command=self.reports_screen)
+        reports_button.pack(pady=(15, 5))
        
         logout_button = tk.Button(self.admin_frame, text="Logout", font=("Segoe UI", 10),
                       bg="red", fg="white", command=self.setup_welcome_screen)
         logout_button.place(relx=0.0, rely=1.0, anchor="sw", x=10, y=-10)
 
+    # ------------------------------------------------------------------------------
+    # Performance Panel: Live Timings, Profiling and Export
+    # ------------------------------------------------------------------------------
+    def performance_panel(self):
+        if self.performance_window is not None and self.performance_window.winfo_exists():
+            self.performance_window.lift()
+            return
+        perf_win = self.performance_window = tk.Toplevel(self.root)
+        perf_win.title("Performance")
+        perf_win.geometry("620x400")
+        perf_win.config(bg="gray20")
+
+        enabled_var = tk.BooleanVar(value=metrics.enabled)
+
+        def toggle():
+            metrics.enabled = enabled_var.get()
+        tk.Checkbutton(perf_win, text="Collect metrics", variable=enabled_var, command=toggle, bg="gray20",
+                       fg="white", selectcolor="gray30", activebackground="gray20").pack(anchor="w", padx=10, pady=(10, 0))
+
+        columns = ("Operation", "Count", "p50 (ms)", "p95 (ms)", "Max (ms)")
+        stats_tree = ttk.Treeview(perf_win, columns=columns, show="headings", height=10)
+        for col in columns:
+            stats_tree.heading(col, text=col)
+            stats_tree.column(col, anchor="center", width=160 if col == "Operation" else 100)
+        stats_tree.pack(fill="both", expand=True, padx=10, pady=5)
+        counters_label = tk.Label(perf_win, bg="gray20", fg="lightgray", font=("Segoe UI", 10), anchor="w",
+                                  justify="left", wraplength=600)
+        counters_label.pack(fill="x", padx=10)
+
+        def refresh():
+            if not perf_win.winfo_exists():
+                return
+            stats_tree.delete(*stats_tree.get_children())
+            for row in metrics.stats():
+                stats_tree.insert("", "end", values=(row["name"], row["count"], f"{row['p50_ms']:.2f}",
+                                                      f"{row['p95_ms']:.2f}", f"{row['max_ms']:.2f}"))
+            counters = ", ".join(f"{name}: {value}" for name, value in sorted(metrics.counters.items()))
+            counters_label.config(text=f"Counters: {counters or 'none yet'}")
+            perf_win.after(self.PERF_REFRESH_MS, refresh)
+
+        def toggle_capture():
+            if not metrics.capturing:
+                metrics.start_capture()
+                capture_btn.config(text="Stop Capture")
+                return
+            capture_btn.config(text="Start Capture")
+            prefix = f"clevermart-profile-{datetime.datetime.now():%Y%m%d-%H%M%S}"
+            try:
+                paths = metrics.stop_capture(prefix)
+            except OSError as e:
+                messagebox.showerror("Save Error", f"Error saving capture:\n{e}", parent=perf_win)
+                return
+            messagebox.showinfo("Capture Saved", "\n".join(paths), parent=perf_win)
+
+        def export(kind):
+            path = filedialog.asksaveasfilename(parent=perf_win, title="Export Metrics", defaultextension=f".{kind}",
+                                                filetypes=[(kind.upper(), f"*.{kind}")])
+            if not path:
+                return
+            try:
+                metrics.export_json(path) if kind == "json" else metrics.export_csv(path)
+            except OSError as e:
+                messagebox.showerror("Save Error", f"Error exporting metrics:\n{e}", parent=perf_win)
+
+        btn_frame = tk.Frame(perf_win, bg="gray20")
+        btn_frame.pack(pady=10)
+        capture_btn = tk.Button(btn_frame, text="Stop Capture" if metrics.capturing else "Start Capture",
+                                font=("Segoe UI", 10), bg="orange", fg="white", command=toggle_capture)
+        capture_btn.pack(side="left", padx=5)
+        tk.Button(btn_frame, text="Export JSON", font=("Segoe UI", 10), bg="blue", fg="white",
+                  command=lambda: export("json")).pack(side="left", padx=5)
+        tk.Button(btn_frame, text="Export CSV", font=("Segoe UI", 10), bg="blue", fg="white",
+                  command=lambda: export("csv")).pack(side="left", padx=5)
+        tk.Button(btn_frame, text="Reset", font=("Segoe UI", 10), bg="red", fg="white",
+                  command=metrics.reset).pack(side="left", padx=5)
+        refresh()
+
     # ------------------------------------------------------------------------------
     # Inventory Management
     # ------------------------------------------------------------------------------
@@ -505,9 +889,24 @@ class CleverMartApp:
         search_btn = tk.Button(controls_frame, text="Filter", font=("Segoe UI", 10), bg="blue", fg="white", command=lambda: self.filter_inventory(search_entry.get(), category_var.get()))
         search_btn.grid(row=0, column=4, padx=5, pady=5)
 
-        reset_btn = tk.Button(controls_frame, text="Reset", font=("Segoe UI", 10), bg="blue", fg="white", command=lambda: self.populate_inventory_table())
+        def reset():
+            search_entry.delete(0, tk.END)
+            category_combobox.current(0)
+            self.populate_inventory_table()
+
+        reset_btn = tk.Button(controls_frame, text="Reset", font=("Segoe UI", 10), bg="blue", fg="white", command=reset)
         reset_btn.grid(row=0, column=5, padx=5, pady=5)
 
+        # Search as you type: re-filter once typing pauses.
+        def schedule_filter(event=None):
+            if self.filter_job is not None:
+                self.root.after_cancel(self.filter_job)
+            self.filter_job = self.root.after(self.SEARCH_DEBOUNCE_MS, lambda: self.filter_inventory(search_entry.get(), category_var.get()))
+
+        search_entry.bind("<KeyRelease>", schedule_filter)
+        category_combobox.bind("<<ComboboxSelected>>", schedule_filter)
+        self.root.after_idle(self.inventory_manager.build_search_index)
+
         # Add a treeview for inventory items
         tree_frame = tk.Frame(self.admin_frame, bg="gray20")
         tree_frame.pack(pady=(0, 20), fill="both", expand=True)
@@ -526,6 +925,10 @@ class CleverMartApp:
         self.inventory_tree.pack(side="left", fill="both", expand=True)
         tree_vsb.pack(side="right", fill="y")
 
+        progress = ttk.Progressbar(self.admin_frame, mode="determinate")
+        progress.pack(fill="x", padx=10)
+        self.inventory_loader = TreeLoader(self.inventory_tree, progress)
+
         # Populate the inventory table
         self.populate_inventory_table()
 
@@ -545,28 +948,77 @@ class CleverMartApp:
         back_btn = tk.Button(btn_frame, text="Back", font=("Segoe UI", 10), width=15, bg="gray40", fg="white", command=self.continue_as_admin)
         back_btn.grid(row=0, column=3, padx=10, pady=5)
 
+        import_btn = tk.Button(btn_frame, text="Import Supplier File", font=("Segoe UI", 10), width=20, bg="purple", fg="white", command=self.import_supplier_file)
+        import_btn.grid(row=1, column=0, columnspan=4, pady=5)
+
+    @staticmethod
+    def inventory_row(item):
+        return (item["name"], f"₱{item['price']:.2f}", item["quantity"]), ()
+
     def populate_inventory_table(self):
         if self.inventory_tree:
-            self.inventory_tree.delete(*self.inventory_tree.get_children())
-            for item in self.inventory_manager.items:
-                self.inventory_tree.insert("", "end", values=(item["name"], f"₱{item['price']:.2f}", item["quantity"]))
+            self.inventory_loader.load(list(self.inventory_manager.items), self.inventory_row)
 
     def filter_inventory(self, query, category):
+        if self.filter_job is not None:
+            self.root.after_cancel(self.filter_job)
+            self.filter_job = None
         if self.inventory_tree:
-            self.inventory_tree.delete(*self.inventory_tree.get_children())
-            for item in self.inventory_manager.items:
-                if query.lower() in item["name"].lower() and (category == "All" or item["category"] == category):
-                    self.inventory_tree.insert("", "end", values=(item["name"], f"₱{item['price']:.2f}", item["quantity"]))
+            self.inventory_loader.load(self.inventory_manager.filter_items(query, category), self.inventory_row)
 
     # ------------------------------------------------------------------------------
     # Stock Monitoring with Restock Functionality
     # ------------------------------------------------------------------------------
+    def update_low_stock_count(self):
+        if self.monitoring_button is not None and self.monitoring_button.winfo_exists():
+            low = len(self.inventory_manager.low_stock_items())
+            self.monitoring_button.config(text=f"Stock Monitoring ({low} low)" if low else "Stock Monitoring")
+
+    def on_stock_alert(self, event, item):
+        # A product crossed into or out of the low bucket: update the dashboard
+        # count and, once per burst, the monitoring table if it is showing.
+        self.update_low_stock_count()
+        if self.stock_view is not None and not self.stock_refresh_pending:
+            self.stock_refresh_pending = True
+            self.root.after_idle(self.refresh_stock_view)
+
+    def refresh_stock_view(self):
+        self.stock_refresh_pending = False
+        if self.stock_view is not None and self.stock_view[0].winfo_exists():
+            self.show_stock_level(self.stock_view[1])
+        else:
+            self.stock_view = None
+
+    def stock_rows(self, level):
+        if level == "All":
+            return list(self.inventory_manager.items)
+        return list(self.inventory_manager.items_with_level(level))
+
+    def show_stock_level(self, level):
+        stock_tree, _, loader = self.stock_view
+        self.stock_view = (stock_tree, level, loader)
+        loader.load(self.stock_rows(level), self.stock_row)
+
+    def stock_row(self, product):
+        tag = STOCK_TAGS[self.inventory_manager.get_stock_level(product["name"])]
+        return (product["name"], product["quantity"], product["max"], tag.capitalize()), (tag,)
+
     def stock_monitoring(self):
         for widget in self.admin_frame.winfo_children():
             widget.destroy()
         title_label = tk.Label(self.admin_frame, text="Stock Monitoring",
                                font=("Segoe UI", 16, "bold"), fg="white", bg="gray20")
         title_label.pack(pady=5)
+
+        # Only the chosen stock-level bucket is rendered; low stock by default.
+        levels = {STOCK_TAGS[level]: level for level in reversed(STOCK_LEVELS)}
+        levels["All"] = "All"
+        level_var = tk.StringVar(value=STOCK_TAGS["low"])
+        level_combobox = ttk.Combobox(self.admin_frame, textvariable=level_var, values=list(levels),
+                                      state="readonly", width=20)
+        level_combobox.pack(pady=5)
+        level_combobox.bind("<<ComboboxSelected>>", lambda event: self.show_stock_level(levels[level_var.get()]))
+
         columns = ("Product Name", "Current Stock", "Max Stock", "Status")
         stock_tree = ttk.Treeview(self.admin_frame, columns=columns, show="headings", selectmode="browse")
         for col in columns:
@@ -580,17 +1032,11 @@ class CleverMartApp:
         stock_tree.tag_configure("Sufficient stock", background="green")
         stock_tree.tag_configure("Moderate stock", background="yellow")
         stock_tree.tag_configure("Nearly out of stock", background="red")
-        
-        for product in self.inventory_manager.items:
-            max_stock = product.get("max", product["quantity"])
-            current = product["quantity"]
-            if current >= 0.75 * max_stock:
-                tag = "Sufficient stock"
-            elif current >= 0.25 * max_stock:
-                tag = "Moderate stock"
-            else:
-                tag = "Nearly out of stock"
-            stock_tree.insert("", "end", values=(product["name"], current, max_stock, tag.capitalize()), tags=(tag,))
+
+        progress = ttk.Progressbar(self.admin_frame, mode="determinate")
+        progress.pack(fill="x", padx=5)
+        self.stock_view = (stock_tree, "low", TreeLoader(stock_tree, progress))
+        self.show_stock_level("low")
         
         btn_frame = tk.Frame(self.admin_frame, bg="gray20")
         btn_frame.pack(pady=5)
@@ -600,23 +1046,24 @@ class CleverMartApp:
             if not selected:
                 messagebox.showerror("Selection Error", "Please select a product to restock.")
                 return
-            item_id = selected[0]
-            item_values = stock_tree.item(item_id, "values")
-            product_name = item_values[0]
-            status = item_values[3].lower()  # e.g., "nearly out of stock"
-            if status != "nearly out of stock":
+            product_name = stock_tree.item(selected[0], "values")[0]
+            level = self.inventory_manager.get_stock_level(product_name)
+            if level is None:
+                messagebox.showerror("Restock Error", f"Product '{product_name}' no longer exists.")
+                return
+            if level != "low":
                 messagebox.showinfo("Info", f"Product '{product_name}' does not require restocking.")
                 return
             add_qty = simpledialog.askinteger("Restock Item", f"Enter quantity to add for '{product_name}':", minvalue=1)
             if add_qty is None:
                 return
-            for product in self.inventory_manager.items:
-                if product["name"] == product_name:
-                    product["quantity"] += add_qty
-                    break
-            self.inventory_manager.save_inventory_data()
+            try:
+                self.inventory_manager.restock_item(product_name, add_qty)
+            except CleverMartError as e:
+                messagebox.showerror("Restock Error", str(e))
+                return
             messagebox.showinfo("Success", f"Product '{product_name}' restocked with {add_qty} units.")
-            self.stock_monitoring()
+            self.show_stock_level(self.stock_view[1])
         
         restock_btn = tk.Button(btn_frame, text="Restock Item", font=("Segoe UI", 10), bg="blue", fg="white", command=restock_item)
         restock_btn.grid(row=0, column=0, padx=10, pady=5)
@@ -632,42 +1079,169 @@ class CleverMartApp:
         pos_title = tk.Label(self.admin_frame, text="Sales History",
                              font=("Segoe UI", 20, "bold"), fg="white", bg="gray20")
         pos_title.pack(pady=10)
-        total_sales = sum(t["total_sale"] for t in self.transaction_history)
-        total_profit = sum(t["total_profit"] for t in self.transaction_history)
+        self.load_sales_summary()
+        summary = self.checkout_engine.summary  # Running totals, kept current by each checkout.
+        total_sales = summary.total_sales
+        total_profit = summary.total_profit
+        product_rollups = summary.rows("product")
         summary_label = tk.Label(self.admin_frame, text=f"Total Sales: ₱{total_sales:.2f}    Total Profit: ₱{total_profit:.2f}", font=("Segoe UI", 16, "bold"), bg="gray20", fg="white")
         summary_label.pack(pady=5)
-        if not self.sales_history:
+        if not product_rollups:
             no_sales_label = tk.Label(self.admin_frame, text="No sales have been recorded.", font=("Segoe UI", 14), bg="gray20", fg="lightgray")
             no_sales_label.pack(pady=20)
         else:
-            columns = ("Product", "Quantity", "Cost Price", "Selling Price", "Profit")
+            columns = ("Product", "Units Sold", "Sales", "Profit")
             sales_tree = ttk.Treeview(self.admin_frame, columns=columns, show="headings", height=10)
             for col in columns:
                 sales_tree.heading(col, text=col)
                 sales_tree.column(col, anchor="center", width=100)
             sales_tree.pack(pady=10, padx=10, fill="both", expand=True)
-            for sale in self.sales_history:
-                profit = (sale["selling_price"] - sale["cost"]) * sale["quantity"]
-                sales_tree.insert("", "end", values=(
-                    sale["name"],
-                    sale["quantity"],
-                    f"₱{sale['cost']:.2f}",
-                    f"₱{sale['selling_price']:.2f}",
-                    f"₱{profit:.2f}"))
+
+            def sale_row(rollup):
+                return (rollup["key"],
+                        rollup["count"],
+                        f"₱{rollup['sales']:.2f}",
+                        f"₱{rollup['profit']:.2f}"), ()
+
+            progress = ttk.Progressbar(self.admin_frame, mode="determinate")
+            progress.pack(fill="x", padx=10)
+            TreeLoader(sales_tree, progress).load(product_rollups, sale_row)
         view_history_btn = tk.Button(self.admin_frame, text="View Purchase History", font=("Segoe UI", 10), bg="#0055aa", fg="white", command=self.view_purchase_history)
         view_history_btn.pack(pady=5)
         back_button = tk.Button(self.admin_frame, text="Back", font=("Segoe UI", 10),bg="gray40", fg="white", command=self.continue_as_admin)
         back_button.pack(pady=5)
 
     # ------------------------------------------------------------------------------
-    # view_purchase_history: Displays overall purchase transactions
+    # Reports: Revenue, Top Products, Basket Sizes and an Hour-of-Day Heatmap
+    # ------------------------------------------------------------------------------
+    REPORT_TOP_N = 20
+
+    def reports_screen(self):
+        try:
+            from clevermart_reports import WEEKDAYS, SalesReport  # needs NumPy, which the rest of the app doesn't
+        except ImportError:
+            messagebox.showerror("Reports", "Reports need NumPy. Install it with: pip install numpy")
+            return
+        try:
+            report = SalesReport.load(self.storage)
+        except StorageError as e:
+            messagebox.showerror("Load Error", str(e))
+            return
+        for widget in self.admin_frame.winfo_children():
+            widget.destroy()
+        title_label = tk.Label(self.admin_frame, text="Reports", font=("Segoe UI", 16, "bold"), fg="white", bg="gray20")
+        title_label.pack(pady=5)
+        notebook = ttk.Notebook(self.admin_frame)
+        notebook.pack(fill="both", expand=True, padx=10)
+
+        def report_tab(text, columns, choices=None, command=None):
+            tab = tk.Frame(notebook, bg="gray20")
+            notebook.add(tab, text=text)
+            choice = None
+            if choices:
+                choice = tk.StringVar(value=choices[0])
+                combobox = ttk.Combobox(tab, textvariable=choice, values=choices, state="readonly", width=15)
+                combobox.pack(pady=5)
+                combobox.bind("<<ComboboxSelected>>", lambda event: command())
+            tree = ttk.Treeview(tab, columns=columns, show="headings")
+            for col in columns:
+                tree.heading(col, text=col)
+                tree.column(col, anchor="w" if col == columns[0] else "center", width=100)
+            tree.pack(side="left", fill="both", expand=True, padx=(5, 0), pady=5)
+            scroll = ttk.Scrollbar(tab, orient="vertical", command=tree.yview)
+            scroll.pack(side="right", fill="y", pady=5)
+            tree.configure(yscrollcommand=scroll.set)
+            return choice, TreeLoader(tree)
+
+        def money(cents):
+            return f"₱{cents / 100:,.2f}"
+
+        def money_row(row):
+            return (row[0], row[1], money(row[2]), money(row[3])), ()
+
+        periods = {"Daily": "day", "Weekly": "week", "Monthly": "month"}
+
+        def show_revenue():
+            revenue = report.revenue(periods[period_var.get()])
+            revenue_loader.load(list(zip(revenue["period"].astype(str), revenue["transactions"].tolist(),
+                                         revenue["sales"].tolist(), revenue["profit"].tolist())), money_row)
+
+        period_var, revenue_loader = report_tab("Revenue", ("Period", "Transactions", "Sales", "Profit"),
+                                                list(periods), show_revenue)
+        show_revenue()
+
+        rankings = {"By Sales": "sales", "By Units": "units", "By Profit": "profit"}
+
+        def show_top():
+            top_loader.load(report.top_products(self.REPORT_TOP_N, rankings[ranking_var.get()]), money_row)
+
+        ranking_var, top_loader = report_tab("Top Products", ("Product", "Units Sold", "Sales", "Profit"),
+                                             list(rankings), show_top)
+        show_top()
+
+        baskets = report.basket_sizes()
+        _, basket_loader = report_tab("Basket Sizes", ("Units in Basket", "Transactions"))
+        basket_loader.load(list(zip(baskets["sizes"].tolist(), baskets["counts"].tolist())), lambda row: (row, ()))
+        basket_label = tk.Label(self.admin_frame, font=("Segoe UI", 10), fg="lightgray", bg="gray20",
+                                text=f"Units per basket: mean {baskets['mean']:.1f}, median {baskets['median']:.0f}, "
+                                     f"90th percentile {baskets['p90']:.0f}")
+        basket_label.pack(pady=(5, 0))
+
+        # Sales by weekday and hour, shaded from gray (none) to green (busiest).
+        heatmap = report.hourly_heatmap("sales")
+        peak = max(1, int(heatmap.max()))
+        heat_tab = tk.Frame(notebook, bg="gray20")
+        notebook.add(heat_tab, text="Hour of Day")
+        canvas = tk.Canvas(heat_tab, bg="gray20", highlightthickness=0)
+        canvas.pack(fill="both", expand=True, padx=5, pady=5)
+        cell_w, cell_h, left, top = 26, 30, 40, 20
+        for hour in range(0, 24, 3):
+            canvas.create_text(left + hour * cell_w, top - 10, text=f"{hour:02d}", anchor="w", fill="lightgray",
+                               font=("Segoe UI", 8))
+        for day, name in enumerate(WEEKDAYS):
+            canvas.create_text(left - 5, top + day * cell_h + cell_h / 2, text=name, anchor="e", fill="lightgray",
+                               font=("Segoe UI", 9))
+            for hour in range(24):
+                share = heatmap[day, hour] / peak
+                gray = int(77 * (1 - share))
+                color = f"#{gray:02x}{int(77 + 128 * share):02x}{gray:02x}"
+                canvas.create_rectangle(left + hour * cell_w, top + day * cell_h, left + (hour + 1) * cell_w - 1,
+                                        top + (day + 1) * cell_h - 1, fill=color, outline="")
+        canvas.create_text(left, top + 7 * cell_h + 15, anchor="w", fill="lightgray", font=("Segoe UI", 9),
+                           text=f"Busiest hour: {money(peak)} in sales")
+
+        back_button = tk.Button(self.admin_frame, text="Back", font=("Segoe UI", 10), bg="gray40", fg="white", command=self.continue_as_admin)
+        back_button.pack(pady=5)
+
+    # ------------------------------------------------------------------------------
+    # view_purchase_history: Overall purchase transactions, a page at a time
     # ------------------------------------------------------------------------------
+    HISTORY_PAGE_SIZE = 50
+    HISTORY_PRESETS = ("All", "Today", "Last 7 days", "Last 30 days", "This month", "This year")
+
     def view_purchase_history(self):
+        self.load_transaction_data()
+        pages = HistoryPages(self.transaction_history, self.HISTORY_PAGE_SIZE)
         trans_win = tk.Toplevel(self.root)
         trans_win.title("Purchase History")
-        trans_win.geometry("500x350")
-        trans_win.resizable(False, False)
+        trans_win.geometry("640x480")
         trans_win.config(bg="gray20")
+
+        range_frame = tk.Frame(trans_win, bg="gray20")
+        range_frame.pack(fill="x", padx=10, pady=(10, 0))
+        preset_var = tk.StringVar(value="All")
+        preset_combobox = ttk.Combobox(range_frame, textvariable=preset_var, values=self.HISTORY_PRESETS,
+                                       state="readonly", width=12)
+        preset_combobox.pack(side="left")
+        from_var, to_var = tk.StringVar(), tk.StringVar()
+        for text, var in (("From", from_var), ("To", to_var)):
+            tk.Label(range_frame, text=text, bg="gray20", fg="white").pack(side="left", padx=(10, 2))
+            entry = tk.Entry(range_frame, textvariable=var, width=11, bg="gray30", fg="white",
+                             insertbackground="white")
+            entry.pack(side="left")
+            entry.bind("<Return>", lambda event: apply_range())
+        tk.Label(range_frame, text="YYYY-MM-DD", bg="gray20", fg="gray60").pack(side="left", padx=5)
+
         trans_frame = tk.Frame(trans_win, bg="gray20")
         trans_frame.pack(pady=10, padx=10, fill="both", expand=True)
         columns = ("Date", "Total Sale", "Total Profit", "Tendered", "Change")
@@ -675,23 +1249,84 @@ class CleverMartApp:
 
         for col in columns:
             trans_tree.heading(col, text=col)
-            trans_tree.column(col, anchor="center", width=100)
+            trans_tree.column(col, anchor="center", width=150 if col == "Date" else 100)
         trans_tree.pack(side="left", fill="both", expand=True)
         trans_scroll = ttk.Scrollbar(trans_frame, orient="vertical", command=trans_tree.yview)
         trans_scroll.pack(side="right", fill="y")
         trans_tree.configure(yscrollcommand=trans_scroll.set)
-        for trans in self.transaction_history:
-            trans_tree.insert("", "end", values=(
-                trans["date"],
-                f"₱{trans['total_sale']:.2f}",
-                f"₱{trans['total_profit']:.2f}",
-                f"₱{trans['tendered']:.2f}",
-                f"₱{trans['change']:.2f}" ))
+        loader = TreeLoader(trans_tree)
+
+        def transaction_row(trans):
+            return (trans["date"],
+                    f"₱{trans['total_sale']:.2f}",
+                    f"₱{trans['total_profit']:.2f}",
+                    f"₱{trans['tendered']:.2f}",
+                    f"₱{trans['change']:.2f}"), ()
+
+        nav_frame = tk.Frame(trans_win, bg="gray20")
+        nav_frame.pack(fill="x", padx=10)
+        prev_btn = tk.Button(nav_frame, text="◀ Prev", font=("Segoe UI", 10), bg="gray40", fg="white",
+                             command=lambda: turn(-1))
+        prev_btn.pack(side="left")
+        page_label = tk.Label(nav_frame, bg="gray20", fg="white", font=("Segoe UI", 10))
+        page_label.pack(side="left", expand=True)
+        next_btn = tk.Button(nav_frame, text="Next ▶", font=("Segoe UI", 10), bg="gray40", fg="white",
+                             command=lambda: turn(1))
+        next_btn.pack(side="right")
+        totals_label = tk.Label(trans_win, bg="gray20", fg="lightgray", font=("Segoe UI", 10), justify="left")
+        totals_label.pack(fill="x", padx=10, pady=(5, 0))
+
+        def show_page():
+            # Only the current page is ever in the tree.
+            loader.load(pages.rows(), transaction_row)
+            page_label.config(text=f"Page {pages.page + 1} of {pages.page_count}")
+            prev_btn.config(state="normal" if pages.page > 0 else "disabled")
+            next_btn.config(state="normal" if pages.page < pages.page_count - 1 else "disabled")
+            totals = []
+            for label, (count, sale, profit) in (("This page", pages.page_totals()), ("Range", pages.totals())):
+                totals.append(f"{label}: {count} transactions, sales ₱{sale / 100:,.2f}, profit ₱{profit / 100:,.2f}")
+            totals_label.config(text="\n".join(totals))
+
+        def turn(step):
+            pages.go(pages.page + step)
+            show_page()
+
+        def parse_day(text):
+            return datetime.datetime.strptime(text.strip(), "%Y-%m-%d").date() if text.strip() else None
+
+        def apply_range():
+            try:
+                first, last = parse_day(from_var.get()), parse_day(to_var.get())
+            except ValueError:
+                messagebox.showerror("Input Error", "Please enter dates as YYYY-MM-DD.", parent=trans_win)
+                return
+            # The To day is included: the range ends at the start of the next day.
+            pages.select(first, last + datetime.timedelta(days=1) if last else None)
+            show_page()
+
+        def apply_preset(event):
+            today = datetime.date.today()
+            first = {"Today": today, "Last 7 days": today - datetime.timedelta(days=6),
+                     "Last 30 days": today - datetime.timedelta(days=29), "This month": today.replace(day=1),
+                     "This year": today.replace(month=1, day=1)}.get(preset_var.get())
+            from_var.set(first.isoformat() if first else "")
+            to_var.set(today.isoformat() if first else "")
+            apply_range()
+
+        preset_combobox.bind("<<ComboboxSelected>>", apply_preset)
+        apply_btn = tk.Button(range_frame, text="Apply", font=("Segoe UI", 10), bg="#0055aa", fg="white",
+                              command=apply_range)
+        apply_btn.pack(side="left", padx=5)
+        show_page()
+
         def clear_history():
+            nonlocal pages
             if messagebox.askyesno("Clear History", "Are you sure you want to clear the purchase history?"):
-                self.transaction_history.clear()
-                self.save_transaction_data()
-                trans_tree.delete(*trans_tree.get_children())
+                if not self.clear_transaction_data():
+                    return
+                self.load_transaction_data()
+                pages = HistoryPages(self.transaction_history, self.HISTORY_PAGE_SIZE)
+                show_page()
                 messagebox.showinfo("Cleared", "Purchase history has been cleared.")
         clear_btn = tk.Button(trans_win, text="Clear Purchase History", font=("Segoe UI", 10), bg="red", fg="white", command=clear_history)
         clear_btn.pack(pady=5)
@@ -732,12 +1367,11 @@ class CleverMartApp:
             if not name:
                 messagebox.showerror("Input Error", "Product name cannot be empty.")
                 return
-            for product in self.inventory_manager.items:
-                if product["name"].lower() == name.lower():
-                    messagebox.showerror("Duplicate Error", "A product with this name already exists.")
-                    name_entry.delete(0, tk.END)
-                    name_entry.focus()
-                    return
+            if self.inventory_manager.find_item_ci(name) is not None:
+                messagebox.showerror("Duplicate Error", "A product with this name already exists.")
+                name_entry.delete(0, tk.END)
+                name_entry.focus()
+                return
             try:
                 price = float(price_str)
                 if price <= 0:
@@ -757,11 +1391,14 @@ class CleverMartApp:
                 quantity_entry.focus()
                 return
             new_item = {"name": name, "price": price, "quantity": quantity, "max": quantity, "category": category}
-            self.inventory_manager.items.append(new_item)
+            try:
+                self.inventory_manager.add_item(new_item)
+            except CleverMartError as e:
+                messagebox.showerror("Save Error", str(e))
+                return
             if self.inventory_tree:
                 self.inventory_tree.insert("", "end", values=(name, f"₱{price:.2f}", quantity))
             messagebox.showinfo("Success", "Product added successfully!")
-            self.inventory_manager.save_inventory_data()
             if messagebox.askyesno("Continue?", "Product added. Do you want to add another product?"):
                 name_entry.delete(0, tk.END)
                 price_entry.delete(0, tk.END)
@@ -790,10 +1427,9 @@ class CleverMartApp:
         original_price = float(selected_values[1].replace("₱", ""))
         original_quantity = int(selected_values[2])
         current_category = "Snacks & Sweets"
-        for prod in self.inventory_manager.items:
-            if prod["name"] == original_name:
-                current_category = prod.get("category", "Snacks & Sweets")
-                break
+        prod = self.inventory_manager.get_item(original_name)
+        if prod is not None:
+            current_category = prod.get("category", "Snacks & Sweets")
         edit_win = tk.Toplevel(self.root)
         edit_win.title("Edit Product")
         edit_win.geometry("300x300")
@@ -831,6 +1467,10 @@ class CleverMartApp:
             if not new_name:
                 messagebox.showerror("Input Error", "Product name cannot be empty.")
                 return
+            existing = self.inventory_manager.find_item_ci(new_name)
+            if existing is not None and existing["name"] != original_name:
+                messagebox.showerror("Duplicate Error", "A product with this name already exists.")
+                return
             try:
                 new_price = float(new_price_str)
                 if new_price <= 0:
@@ -845,17 +1485,15 @@ class CleverMartApp:
             except ValueError:
                 messagebox.showerror("Input Error", "Quantity must be a non-negative integer or zero.")
                 return
+            try:
+                self.inventory_manager.rename_item(original_name, new_name)
+                self.inventory_manager.update_item(new_name, price=new_price, quantity=new_quantity,
+                                                   max=new_quantity, category=new_category)
+            except CleverMartError as e:
+                messagebox.showerror("Save Error", str(e))
+                return
             self.inventory_tree.item(item_id, values=(new_name, f"₱{new_price:.2f}", new_quantity))
-            for product in self.inventory_manager.items:
-                if product["name"] == original_name:
-                    product["name"] = new_name
-                    product["price"] = new_price
-                    product["quantity"] = new_quantity
-                    product["max"] = new_quantity
-                    product["category"] = new_category
-                    break
             messagebox.showinfo("Success", "Product updated successfully!")
-            self.inventory_manager.save_inventory_data()
             edit_win.destroy()
 
         submit_btn = tk.Button(edit_win, text="Save Changes", font=("Segoe UI", 10),
@@ -865,6 +1503,37 @@ class CleverMartApp:
                        bg="red", fg="white", command=edit_win.destroy)
         cancel_btn.grid(row=5, column=0, columnspan=2, pady=(0,20))
 
+    # ------------------------------------------------------------------------------
+    # Import Supplier File: Bulk Upserts and Restocks in One Commit
+    # ------------------------------------------------------------------------------
+    IMPORT_ERRORS_SHOWN = 15
+
+    def import_supplier_file(self):
+        if not self.inventory_manager.loaded:
+            messagebox.showinfo("Import", "The inventory is still loading; try again in a moment.")
+            return
+        path = filedialog.askopenfilename(title="Import Supplier File",
+                                          filetypes=[("CSV files", "*.csv"), ("All files", "*.*")])
+        if not path:
+            return
+        try:
+            report = self.inventory_manager.import_file(path)
+        except CleverMartError as e:
+            messagebox.showerror("Import Error", str(e))
+            self.populate_inventory_table()
+            return
+        self.populate_inventory_table()
+        summary = (f"Added {report['added']}, updated {report['updated']} and restocked "
+                   f"{report['restocked']} products.")
+        errors = report["errors"]
+        if not errors:
+            messagebox.showinfo("Import Complete", summary)
+            return
+        lines = [f"Line {line}: {message}" for line, message in errors[:self.IMPORT_ERRORS_SHOWN]]
+        if len(errors) > self.IMPORT_ERRORS_SHOWN:
+            lines.append(f"... and {len(errors) - self.IMPORT_ERRORS_SHOWN} more.")
+        messagebox.showwarning("Import Complete", f"{summary}\n\n{len(errors)} rows were skipped:\n" + "\n".join(lines))
+
     # ------------------------------------------------------------------------------
     # Delete Product 
     # ------------------------------------------------------------------------------
@@ -877,18 +1546,35 @@ class CleverMartApp:
         selected_values = self.inventory_tree.item(item_id, "values")
         product_name = selected_values[0]
         if messagebox.askyesno("Confirm Delete", f"Are you sure you want to delete '{product_name}'?"):
+            try:
+                self.inventory_manager.remove_item(product_name)
+            except CleverMartError as e:
+                messagebox.showerror("Save Error", str(e))
+                return
             self.inventory_tree.delete(item_id)
-            for i, product in enumerate(self.inventory_manager.items):
-                if product["name"] == product_name:
-                    del self.inventory_manager.items[i]
-                    break
             messagebox.showinfo("Success", f"Product '{product_name}' deleted successfully!")
-            self.inventory_manager.save_inventory_data()
 
 # =============================================================================
 # Main Loop
 # =============================================================================
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="CleverMart inventory & POS")
+    parser.add_argument("--db", help="store data in this SQLite database instead of the CSV files")
+    parser.add_argument("--durability", choices=["none", "fsync", "group"], default="group",
+                        help="none: leave flushing to the OS; fsync: fsync every write; "
+                             "group: fsync writes that arrive within a few ms together (default). "
+                             "A sale is confirmed once it is written; with fsync and group, once it is on disk")
+    parser.add_argument("--server", metavar="ADDRESS",
+                        help="run as a till of the inventory server at host:port or a Unix socket path")
+    parser.add_argument("--metrics", action="store_true",
+                        help="collect operation timings from startup (admin: Ctrl+Shift+P shows them)")
+    args = parser.parse_args()
+    metrics.enabled = args.metrics
+    if args.server:
+        client, storage = InventoryClient(args.server), None
+    else:
+        level = "none" if args.durability == "none" else "fsync"
+        client, storage = None, SQLiteBackend(args.db, level) if args.db else CSVBackend(durability=level)
     root = tk.Tk()
-    app = CleverMartApp(root)
+    app = CleverMartApp(root, storage=storage, group_commit=args.durability == "group", client=client)
     root.mainloop()
@@ -0,0 +1,651 @@
+"""Headless performance benchmarks for CleverMart.
+
+Usage:
+    python clevermart_bench.py run [--sizes 1000 10000 100000 1000000] [--output results.json]
+    python clevermart_bench.py generate DIR --size 10000 [--mix "Snacks & Sweets=0.6,Beverages=0.4"]
+    python clevermart_bench.py compare OLD.json NEW.json
+    python clevermart_bench.py wal --sizes 1000 10000 100000 1000000
+    python clevermart_bench.py memory --size 1000000
+    python clevermart_bench.py durability [--commits 2000] [--db]
+    python clevermart_bench.py tills [--tills 1 4 16] [--checkouts 500] [--unix]
+    python clevermart_bench.py replay [--size 1000000] [--workers 1 2 4]
+    python clevermart_bench.py reports [--size 1000000]
+    python clevermart_bench.py startup [--size 1000000]
+    python clevermart_bench.py history [--size 1000000]
+
+``run`` generates synthetic inventory.csv/transactions.csv datasets with a
+fixed seed, times the core operations on each, and writes JSON with the
+throughput, p50/p99 latency and tracemalloc peak of every case.
+"""
+import argparse
+import csv
+import datetime
+import io
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import tempfile
+import threading
+import time
+import tracemalloc
+
+from clevermart_core import Cart, CheckoutEngine, InventoryManager, Product
+from clevermart_replay import replay_logs, replay_sequential
+from clevermart_server import InventoryClient, InventoryServer, make_server
+from clevermart_storage import (INVENTORY_FIELDS, BackgroundWriter, CSVBackend, SQLiteBackend, SALE_FIELDS, TIMESTAMP_FORMAT, TRANSACTION_FIELDS,
+                                parse_inventory_row, read_binary_snapshot)
+
+CATEGORIES = ["Snacks & Sweets", "Beverages"]
+DEFAULT_MIX = {"Snacks & Sweets": 0.5, "Beverages": 0.5}
+DEFAULT_SIZES = [1000, 10000, 100000, 1000000]
+WORDS = ["Choco", "Cola", "Chips", "Juice", "Water", "Candy", "Nuts", "Tea", "Coffee",
+         "Soda", "Bar", "Mint", "Lemon", "Berry", "Salted", "Spicy", "Crunchy", "Sparkling"]
+
+# =============================================================================
+# Synthetic Datasets
+# =============================================================================
+def parse_mix(text):
+    """'Snacks & Sweets=0.6,Beverages=0.4' -> {category: weight}."""
+    mix = {}
+    for part in text.split(","):
+        category, _, weight = part.rpartition("=")
+        mix[category.strip()] = float(weight)
+    return mix
+
+
+def generate_dataset(directory, size, mix=None, seed=0):
+    """Write inventory.csv and transactions.csv with `size` rows each, and their sales.csv lines."""
+    rng = random.Random(seed)
+    mix = mix or DEFAULT_MIX
+    categories = rng.choices(list(mix), weights=list(mix.values()), k=size)
+    inventory_file = os.path.join(directory, "inventory.csv")
+    products = []
+    with open(inventory_file, "w", newline="", encoding="utf-8") as csvfile:
+        writer = csv.writer(csvfile)
+        writer.writerow(INVENTORY_FIELDS)
+        for i, category in enumerate(categories):
+            stock = rng.randint(1, 500)
+            product = [f"{rng.choice(WORDS)} {rng.choice(WORDS)} {i}", round(rng.uniform(5, 500), 2),
+                       stock, max(stock, rng.randint(1, 500)), category]
+            writer.writerow(product)
+            products.append(product)
+    transactions_file = os.path.join(directory, "transactions.csv")
+    start = datetime.datetime(2024, 1, 1)
+    with open(transactions_file, "w", newline="", encoding="utf-8") as csvfile, \
+            open(os.path.join(directory, "sales.csv"), "w", newline="", encoding="utf-8") as salesfile:
+        writer = csv.writer(csvfile)
+        writer.writerow(TRANSACTION_FIELDS)
+        sales = csv.writer(salesfile)
+        sales.writerow(SALE_FIELDS)
+        for i in range(size):
+            date = (start + datetime.timedelta(seconds=i * 31536000 // size)).strftime(TIMESTAMP_FORMAT)
+            total = 0
+            for name, price, _, _, category in rng.sample(products, min(len(products), rng.randint(1, 3))):
+                qty = rng.randint(1, 5)
+                sales.writerow([date, i + 1, name, category, qty, price, round(price * 1.1, 2)])
+                total += round(price * 1.1, 2) * qty
+            total = round(total, 2)
+            tendered = total + rng.choice([0, 0.5, 10, 100])
+            writer.writerow([i + 1, date, total, round(total / 11, 2), tendered, round(tendered - total, 2)])
+    return inventory_file, transactions_file
+
+# =============================================================================
+# Measurement
+# =============================================================================
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def measure(name, size, ops, run, items_per_op=1, memory=True):
+    """Time run(i) for i in range(ops), then rerun under tracemalloc for the peak.
+
+    Whole-dataset cases (items_per_op > 1) rerun once; per-item cases rerun
+    the full loop so the peak covers any growth across operations.
+    """
+    samples = []
+    for i in range(ops):
+        start = time.perf_counter()
+        run(i)
+        samples.append(time.perf_counter() - start)
+    peak = None
+    if memory:
+        tracemalloc.start()
+        for i in range(ops if items_per_op == 1 else 1):
+            run(i)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    total = sum(samples)
+    return {
+        "name": name,
+        "size": size,
+        "ops": ops,
+        "items_per_op": items_per_op,
+        "total_s": total,
+        "throughput_per_s": ops * items_per_op / total if total else None,
+        "p50_ms": percentile(samples, 50) * 1000,
+        "p99_ms": percentile(samples, 99) * 1000,
+        "peak_mem_bytes": peak,
+    }
+
+
+def bench_size(directory, size, repeat=3, ops=1000, memory=True, mix=None, seed=0):
+    generate_dataset(directory, size, mix, seed)
+    inventory_file = os.path.join(directory, "inventory.csv")
+    rng = random.Random(seed)
+    results = []
+
+    results.append(measure("load_inventory", size, repeat, lambda i: InventoryManager(inventory_file),
+                           items_per_op=size, memory=memory))
+    results.append(measure("first_batch", size, repeat,
+                           lambda i: next(InventoryManager(inventory_file, load=False).load_inventory_incrementally()),
+                           memory=memory))
+    manager = InventoryManager(inventory_file)
+    engine = CheckoutEngine(manager)
+    results.append(measure("save_inventory", size, repeat, lambda i: manager.save_inventory_data(),
+                           items_per_op=size, memory=memory))
+    # load_transactions stays a full parse of transactions.csv, comparable across
+    # commits; the engine itself now opens the memory-mapped log instead.
+    results.append(measure("load_transactions", size, repeat, lambda i: list(manager.storage.load_transactions()),
+                           items_per_op=size, memory=memory))
+    results.append(measure("open_transaction_log", size, repeat, lambda i: engine.load_transactions(),
+                           items_per_op=size, memory=memory))
+
+    days = [f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}" for _ in range(min(ops, 200))]
+    results.append(measure("sales_day_range", size, len(days),
+                           lambda i: engine.sales_between(days[i], days[i] + " 23:59:59"), memory=memory))
+
+    names = [item["name"] for item in manager.items]
+    lookups = [rng.choice(names) for _ in range(ops)]
+    results.append(measure("lookup", size, ops, lambda i: manager.get_item(lookups[i]), memory=memory))
+
+    def build_index(i):
+        manager._search.clear()
+        manager.build_search_index()
+
+    results.append(measure("search_index_build", size, 1, build_index, items_per_op=size, memory=memory))
+    queries = []
+    for _ in range(min(ops, 200)):
+        name = rng.choice(names).lower()
+        start = rng.randrange(max(1, len(name) - 4))
+        queries.append((name[start:start + rng.randint(2, 6)], rng.choice(["All"] + CATEGORIES)))
+    results.append(measure("filter", size, len(queries), lambda i: manager.filter_items(*queries[i]),
+                           memory=memory))
+    results.append(measure("low_stock", size, min(ops, 200), lambda i: list(manager.low_stock_items()),
+                           memory=memory))
+
+    cart = Cart()
+    stocked = [name for name in names if manager.get_item(name)["quantity"] >= 10]
+
+    def checkout(i):
+        for name in rng.sample(stocked, 3):
+            product = manager.get_item(name)
+            if product is not None and product["quantity"] > 1:
+                cart.add(product, 1)
+        if len(cart):
+            engine.checkout(cart, 10 ** 9)
+
+    results.append(measure("checkout", size, min(ops, len(stocked) // 4), checkout, memory=memory))
+
+    deliveries = [{"op": "restock", "name": name, "quantity": str(rng.randint(1, 50))}
+                  for name in rng.sample(names, min(size, 20000))]
+    results.append(measure("bulk_import", size, repeat, lambda i: manager.bulk_import(deliveries),
+                           items_per_op=len(deliveries), memory=memory))
+    manager.storage.close()  # releases the transaction log's mapping before the directory is removed
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def run_suite(sizes, repeat=3, ops=1000, memory=True, mix=None, seed=0):
+    results = []
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as directory:
+            results.extend(bench_size(directory, size, repeat, ops, memory, mix, seed))
+    return {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "sizes": sizes,
+            "mix": mix or DEFAULT_MIX,
+            "seed": seed,
+        },
+        "results": results,
+    }
+
+
+def compare(old, new):
+    """Yield (name, size, old p50, new p50, ratio) for cases present in both runs."""
+    baseline = {(r["name"], r["size"]): r for r in old["results"]}
+    for r in new["results"]:
+        before = baseline.get((r["name"], r["size"]))
+        if before:
+            yield r["name"], r["size"], before["p50_ms"], r["p50_ms"], r["p50_ms"] / before["p50_ms"]
+
+# =============================================================================
+# Inventory Write-Ahead Log
+# =============================================================================
+def build_manager(directory, size):
+    """Create an InventoryManager holding `size` synthetic products on disk."""
+    manager = InventoryManager(os.path.join(directory, "inventory.csv"))
+    for i in range(size):
+        manager._index(Product(f"Product {i:07d}", 10.0 + i % 90, 100, 100, CATEGORIES[i % len(CATEGORIES)]))
+    manager.save_inventory_data()
+    return manager
+
+
+def bench_wal(sizes, ops=1000):
+    """Per-mutation save latency: delta log append, the same through a
+    BackgroundWriter (what the UI thread waits for), and a full snapshot rewrite."""
+    results = []
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as directory:
+            manager = build_manager(directory, size)
+            names = [f"Product {i * size // ops:07d}" for i in range(ops)]
+            wal = []
+            for name in names:
+                start = time.perf_counter()
+                manager.restock_item(name, 1)
+                wal.append(time.perf_counter() - start)
+            rewrites = []
+            for _ in range(3):
+                start = time.perf_counter()
+                manager.save_inventory_data()
+                rewrites.append(time.perf_counter() - start)
+            writer = BackgroundWriter(CSVBackend(manager.csv_file))
+            manager = InventoryManager(storage=writer)
+            background = []
+            for name in names:
+                start = time.perf_counter()
+                manager.restock_item(name, 1)
+                background.append(time.perf_counter() - start)
+            writer.close()
+        results.append({
+            "size": size,
+            "wal_p50_ms": percentile(wal, 50) * 1000,
+            "wal_p99_ms": percentile(wal, 99) * 1000,
+            "wal_mean_ms": statistics.fmean(wal) * 1000,
+            "background_p50_ms": percentile(background, 50) * 1000,
+            "background_p99_ms": percentile(background, 99) * 1000,
+            "rewrite_ms": statistics.median(rewrites) * 1000,
+        })
+    return results
+
+
+# =============================================================================
+# Durability Levels and Group Commit
+# =============================================================================
+DURABILITY_MODES = [("none", "none", None), ("fsync", "fsync", None)] + [
+    (f"group-{n}", "fsync", n) for n in (1, 10, 100, 1000)]
+
+
+def bench_durability(commits=2000, sqlite=False, products=1000):
+    """Checkout commits/sec with no fsync, an fsync per commit, and group commit.
+
+    ``group-N`` runs the fsync backend behind a BackgroundWriter that holds
+    each batch open for up to 100 ms or N records+transactions; throughput is
+    measured until the last commit is flushed.
+    """
+    results = []
+    for mode, durability, group in DURABILITY_MODES:
+        with tempfile.TemporaryDirectory() as directory:
+            if sqlite:
+                backend = SQLiteBackend(os.path.join(directory, "clevermart.db"), durability)
+            else:
+                backend = CSVBackend(os.path.join(directory, "inventory.csv"), durability=durability)
+            writes = 0
+            commit = backend.commit
+
+            def counted(*args, **kwargs):
+                nonlocal writes
+                writes += 1
+                return commit(*args, **kwargs)
+
+            backend.commit = counted
+            storage = BackgroundWriter(backend, group_ms=100, group_records=group) if group else backend
+            manager = InventoryManager(storage=storage)
+            for i in range(products):
+                manager.add_item({"name": f"Product {i:05d}", "price": 10.0, "quantity": 10 ** 6,
+                                  "max": 10 ** 6, "category": CATEGORIES[i % len(CATEGORIES)]})
+            storage.flush()
+            writes = 0
+            engine = CheckoutEngine(manager)
+            cart = Cart()
+            start = time.perf_counter()
+            for i in range(commits):
+                cart.add(manager.get_item(f"Product {i % products:05d}"), 1)
+                engine.checkout(cart, 10 ** 6)
+            storage.flush()
+            elapsed = time.perf_counter() - start
+            storage.close()
+        results.append({"mode": mode, "commits": commits, "commits_per_s": commits / elapsed,
+                        "writes": writes, "commits_per_write": commits / writes})
+    return results
+
+# =============================================================================
+# Multi-Till Load Against the Inventory Server
+# =============================================================================
+DEFAULT_TILLS = [1, 4, 16]
+
+
+def bench_tills(tills=DEFAULT_TILLS, checkouts=500, unix=False, products=1000, lines=3):
+    """Checkouts/sec with N simulated tills sharing one inventory server.
+
+    Each till is a thread with its own connection; a checkout reserves
+    ``lines`` products and pays for them in one pipelined call_many, so it
+    costs one round trip.  The server runs in-process over localhost TCP
+    (or a Unix socket) with a group-commit CSV backend.
+    """
+    results = []
+    for count in tills:
+        with tempfile.TemporaryDirectory() as directory:
+            storage = BackgroundWriter(CSVBackend(os.path.join(directory, "inventory.csv"), durability="fsync"),
+                                       group_ms=10)
+            inventory_server = InventoryServer(storage)
+            for i in range(products):
+                inventory_server.inventory_manager.add_item(
+                    {"name": f"Product {i:05d}", "price": 10.0, "quantity": 10 ** 6, "max": 10 ** 6,
+                     "category": CATEGORIES[i % len(CATEGORIES)]})
+            storage.flush()
+            address = os.path.join(directory, "server.sock") if unix else "127.0.0.1:0"
+            server = make_server(address, inventory_server)
+            if not unix:
+                address = "{}:{}".format(*server.server_address)
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+            clients = [InventoryClient(address) for _ in range(count)]
+            samples = [[] for _ in range(count)]
+            errors = []
+
+            def till(n):
+                rng = random.Random(n)
+                try:
+                    for _ in range(checkouts):
+                        requests = [("reserve", {"name": f"Product {rng.randrange(products):05d}", "qty": 1})
+                                    for _ in range(lines)]
+                        start = time.perf_counter()
+                        clients[n].call_many(requests + [("checkout", {"tendered": 10 ** 6})])
+                        samples[n].append(time.perf_counter() - start)
+                except Exception as e:
+                    errors.append(e)
+
+            threads = [threading.Thread(target=till, args=(n,)) for n in range(count)]
+            start = time.perf_counter()
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            storage.flush()
+            elapsed = time.perf_counter() - start
+            for client in clients:
+                client.close()
+            server.shutdown()
+            server.server_close()
+            storage.close()
+        if errors:
+            raise errors[0]
+        latencies = [sample for till_samples in samples for sample in till_samples]
+        results.append({"tills": count, "checkouts": len(latencies), "checkouts_per_s": len(latencies) / elapsed,
+                        "p50_ms": percentile(latencies, 50) * 1000, "p99_ms": percentile(latencies, 99) * 1000})
+    return results
+
+# =============================================================================
+# Parallel Log Replay
+# =============================================================================
+def bench_replay(size, workers=(1, 2, 4), seed=0):
+    """Seconds to replay a generated sales.csv line by line and with each worker count."""
+    with tempfile.TemporaryDirectory() as directory:
+        generate_dataset(directory, size, seed=seed)
+        logs = [os.path.join(directory, "sales.csv")]
+        start = time.perf_counter()
+        replay_sequential(logs)
+        results = [{"mode": "sequential", "seconds": time.perf_counter() - start}]
+        for count in workers:
+            start = time.perf_counter()
+            replay_logs(logs, count)
+            results.append({"mode": f"workers-{count}", "seconds": time.perf_counter() - start})
+    return results
+
+# =============================================================================
+# NumPy Sales Reports
+# =============================================================================
+def bench_reports(size, seed=0):
+    """Seconds to load a year of generated history into SalesReport and to run each report on it."""
+    from clevermart_reports import PERIODS, SalesReport  # NumPy is only needed for this case
+
+    with tempfile.TemporaryDirectory() as directory:
+        generate_dataset(directory, size, seed=seed)
+        start = time.perf_counter()
+        report = SalesReport.load(CSVBackend(os.path.join(directory, "inventory.csv")))
+        results = [{"case": "load", "seconds": time.perf_counter() - start}]
+    cases = [(f"revenue_{period}", lambda period=period: report.revenue(period)) for period in PERIODS] + [
+        ("top_products", lambda: report.top_products(10)),
+        ("basket_sizes", report.basket_sizes),
+        ("hourly_heatmap", report.hourly_heatmap),
+        ("category_totals", report.category_totals),
+    ]
+    for name, run in cases:
+        start = time.perf_counter()
+        run()
+        results.append({"case": name, "seconds": time.perf_counter() - start})
+    return results
+
+# =============================================================================
+# Cold Start: CSV Parsing vs. the Binary Snapshot
+# =============================================================================
+def bench_startup(size, seed=0):
+    """Seconds to read a generated catalog from the CSV and from its binary snapshot.
+
+    ``*_read`` cases stop at the backend's rows; ``*_catalog`` cases build
+    the whole InventoryManager on top of them.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        inventory_file, _ = generate_dataset(directory, size, seed=seed)
+        backend = CSVBackend(inventory_file)
+
+        def timed(case, run, fresh_snapshot):
+            if not fresh_snapshot and os.path.exists(backend.snapshot_file):
+                os.remove(backend.snapshot_file)
+            start = time.perf_counter()
+            run()
+            return {"case": case, "seconds": time.perf_counter() - start}
+
+        def drain():
+            for _ in backend.load_items():
+                pass
+
+        return [
+            timed("csv_read", drain, False),  # leaves a fresh snapshot behind
+            timed("snapshot_columns", lambda: read_binary_snapshot(backend.snapshot_file, inventory_file), True),
+            timed("snapshot_read", drain, True),
+            timed("csv_catalog", lambda: InventoryManager(storage=backend), False),
+            timed("snapshot_catalog", lambda: InventoryManager(storage=backend), True),
+        ]
+
+# =============================================================================
+# Transaction History: List of Dicts vs. the Memory-Mapped Log
+# =============================================================================
+def bench_history(size, reads=10000, seed=0):
+    """Seconds to get the history as a list and as a TransactionLog, random reads, and the memory each holds."""
+    with tempfile.TemporaryDirectory() as directory:
+        inventory_file, _ = generate_dataset(directory, size, seed=seed)
+        results = []
+
+        def timed(case, run):
+            start = time.perf_counter()
+            result = run()
+            results.append({"case": case, "seconds": time.perf_counter() - start})
+            return result
+
+        # Every backend is closed before the directory goes: an open mapping
+        # would keep the log file from being deleted on Windows.
+        backend = CSVBackend(inventory_file)
+        try:
+            timed("list_load", lambda: list(backend.load_transactions()))
+            timed("log_build", backend.transaction_log)  # first open mirrors transactions.csv
+        finally:
+            backend.close()
+        backend = CSVBackend(inventory_file)
+        try:
+            log = timed("log_open", backend.transaction_log)
+            rng = random.Random(seed)
+            indexes = [rng.randrange(len(log)) for _ in range(reads)]
+            timed(f"log_read_{reads}", lambda: [log[i] for i in indexes])
+            list_bytes = traced_peak(lambda: list(backend.load_transactions()))
+        finally:
+            backend.close()
+        backend = CSVBackend(inventory_file)
+        try:
+            log_bytes = traced_peak(backend.transaction_log)
+        finally:
+            backend.close()
+    return results, {"list_bytes": list_bytes, "log_bytes": log_bytes}
+
+# =============================================================================
+# Item Representation Memory
+# =============================================================================
+def traced_peak(build):
+    """Peak traced bytes while build() runs and its result is still alive."""
+    tracemalloc.start()
+    result = build()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    del result
+    return peak
+
+
+def bench_memory(size, seed=0):
+    """Catalog memory as per-row dicts (the old layout) vs. Product records.
+
+    Rows are parsed from the same CSV text for both, so the category strings
+    are separate objects per row exactly as csv.DictReader produces them.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        inventory_file, _ = generate_dataset(directory, size, seed=seed)
+        with open(inventory_file, newline="", encoding="utf-8") as csvfile:
+            text = csvfile.read()
+
+    def rows():
+        return map(parse_inventory_row, csv.DictReader(io.StringIO(text, newline="")))
+
+    dict_peak = traced_peak(lambda: {row["name"]: row for row in rows()})
+    product_peak = traced_peak(lambda: {row["name"]: Product.from_row(row) for row in rows()})
+    return {"size": size, "dict_bytes": dict_peak, "product_bytes": product_peak,
+            "ratio": product_peak / dict_peak}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+    run = sub.add_parser("run", help="run the benchmark suite and emit JSON")
+    run.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    run.add_argument("--repeat", type=int, default=3, help="timed repetitions of whole-file operations")
+    run.add_argument("--ops", type=int, default=1000, help="operations for per-item cases")
+    run.add_argument("--mix", type=parse_mix, help='category weights, e.g. "Snacks & Sweets=0.6,Beverages=0.4"')
+    run.add_argument("--seed", type=int, default=0)
+    run.add_argument("--no-memory", action="store_true", help="skip the tracemalloc pass")
+    run.add_argument("--output", help="write JSON here instead of stdout")
+    generate = sub.add_parser("generate", help="write a synthetic dataset")
+    generate.add_argument("directory")
+    generate.add_argument("--size", type=int, default=10000)
+    generate.add_argument("--mix", type=parse_mix)
+    generate.add_argument("--seed", type=int, default=0)
+    cmp = sub.add_parser("compare", help="compare p50 latencies of two JSON results")
+    cmp.add_argument("old")
+    cmp.add_argument("new")
+    wal = sub.add_parser("wal", help="inventory save latency vs. catalog size")
+    wal.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    wal.add_argument("--ops", type=int, default=1000)
+    durability = sub.add_parser("durability", help="checkout commits/sec per durability mode")
+    durability.add_argument("--commits", type=int, default=2000)
+    durability.add_argument("--db", action="store_true", help="use the SQLite backend")
+    tills = sub.add_parser("tills", help="checkouts/sec with 1, 4 and 16 tills on one inventory server")
+    tills.add_argument("--tills", type=int, nargs="+", default=DEFAULT_TILLS)
+    tills.add_argument("--checkouts", type=int, default=500, help="checkouts per till")
+    tills.add_argument("--unix", action="store_true", help="use a Unix socket instead of localhost TCP")
+    replay = sub.add_parser("replay", help="sales log replay: sequential vs. worker processes")
+    replay.add_argument("--size", type=int, default=1000000, help="transactions in the generated log")
+    replay.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    replay.add_argument("--seed", type=int, default=0)
+    reports = sub.add_parser("reports", help="SalesReport load and report times")
+    reports.add_argument("--size", type=int, default=1000000, help="transactions in the generated history")
+    reports.add_argument("--seed", type=int, default=0)
+    startup = sub.add_parser("startup", help="catalog load time: CSV parsing vs. the binary snapshot")
+    startup.add_argument("--size", type=int, default=1000000)
+    startup.add_argument("--seed", type=int, default=0)
+    history = sub.add_parser("history", help="transaction history: list of dicts vs. the memory-mapped log")
+    history.add_argument("--size", type=int, default=1000000)
+    history.add_argument("--seed", type=int, default=0)
+    memory = sub.add_parser("memory", help="catalog memory: dict rows vs. Product records")
+    memory.add_argument("--size", type=int, default=1000000)
+    memory.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    if args.command == "run":
+        report = json.dumps(run_suite(args.sizes, args.repeat, args.ops, not args.no_memory, args.mix, args.seed),
+                            indent=2)
+        if args.output:
+            with open(args.output, "w") as f:
+                f.write(report + "\n")
+        else:
+            print(report)
+    elif args.command == "generate":
+        os.makedirs(args.directory, exist_ok=True)
+        for path in generate_dataset(args.directory, args.size, args.mix, args.seed):
+            print(path)
+    elif args.command == "compare":
+        with open(args.old) as f:
+            old = json.load(f)
+        with open(args.new) as f:
+            new = json.load(f)
+        print(f"{'case':<20} {'items':>9} {'old p50':>11} {'new p50':>11} {'ratio':>7}")
+        for name, size, before, after, ratio in compare(old, new):
+            print(f"{name:<20} {size:>9} {before:>9.3f}ms {after:>9.3f}ms {ratio:>6.2f}x")
+    elif args.command == "wal":
+        print(f"{'items':>9} {'wal p50':>10} {'wal p99':>10} {'wal mean':>10} {'bg p50':>10} {'bg p99':>10} "
+              f"{'rewrite':>11}")
+        for r in bench_wal(args.sizes, args.ops):
+            print(f"{r['size']:>9} {r['wal_p50_ms']:>8.3f}ms {r['wal_p99_ms']:>8.3f}ms {r['wal_mean_ms']:>8.3f}ms "
+                  f"{r['background_p50_ms']:>8.3f}ms {r['background_p99_ms']:>8.3f}ms {r['rewrite_ms']:>9.1f}ms")
+    elif args.command == "durability":
+        print(f"{'mode':<11} {'commits/s':>10} {'writes':>7} {'commits/write':>14}")
+        for r in bench_durability(args.commits, args.db):
+            print(f"{r['mode']:<11} {r['commits_per_s']:>10.0f} {r['writes']:>7} {r['commits_per_write']:>14.1f}")
+    elif args.command == "tills":
+        print(f"{'tills':>5} {'checkouts':>10} {'checkouts/s':>12} {'p50':>10} {'p99':>10}")
+        for r in bench_tills(args.tills, args.checkouts, args.unix):
+            print(f"{r['tills']:>5} {r['checkouts']:>10} {r['checkouts_per_s']:>12.0f} "
+                  f"{r['p50_ms']:>8.3f}ms {r['p99_ms']:>8.3f}ms")
+    elif args.command == "replay":
+        for r in bench_replay(args.size, args.workers, args.seed):
+            print(f"{r['mode']:<11} {r['seconds']:>8.2f}s")
+    elif args.command == "reports":
+        for r in bench_reports(args.size, args.seed):
+            print(f"{r['case']:<16} {r['seconds'] * 1000:>10.1f}ms")
+    elif args.command == "startup":
+        for r in bench_startup(args.size, args.seed):
+            print(f"{r['case']:<17} {r['seconds'] * 1000:>10.1f}ms")
+    elif args.command == "history":
+        results, memory_use = bench_history(args.size, seed=args.seed)
+        for r in results:
+            print(f"{r['case']:<16} {r['seconds'] * 1000:>10.1f}ms")
+        print(f"held in memory: list {memory_use['list_bytes'] / 2 ** 20:.1f} MiB, "
+              f"log {memory_use['log_bytes'] / 2 ** 20:.3f} MiB")
+    elif args.command == "memory":
+        r = bench_memory(args.size, args.seed)
+        print(f"{r['size']} items: dict rows {r['dict_bytes'] / 2 ** 20:.1f} MiB, "
+              f"Product {r['product_bytes'] / 2 ** 20:.1f} MiB ({r['ratio']:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
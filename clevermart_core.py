@@ -0,0 +1,1089 @@
+"""GUI-free CleverMart core: inventory, cart and checkout.
+
+Nothing here imports tkinter; failures are raised as CleverMartError
+subclasses for the caller (the Tk app, a script, a server) to present.
+
+Usage:
+    python clevermart_core.py verify|rebuild [--db clevermart.db]
+"""
+import argparse
+import bisect
+import csv
+import datetime
+import itertools
+import math
+import sys
+from collections.abc import Mapping
+
+from clevermart_metrics import metrics
+from clevermart_storage import (INVENTORY_FIELDS, TIMESTAMP_FORMAT, CSVBackend, SQLiteBackend, TransactionLog,
+                                fold_summary)
+
+MARGIN = 0.10  # profit per unit, as a fraction of cost
+MARKUP = 1 + MARGIN  # selling price = cost * MARKUP
+STOCK_LEVELS = ("sufficient", "moderate", "low")
+
+# =============================================================================
+# Exceptions
+# =============================================================================
+class CleverMartError(Exception):
+    """Base class for errors raised by the CleverMart core."""
+
+
+class StorageError(CleverMartError):
+    """Reading from or writing to the storage backend failed."""
+
+
+class DuplicateProductError(CleverMartError):
+    """A product with the same name (ignoring case) already exists."""
+
+
+class ProductNotFoundError(CleverMartError):
+    """No product with the given name exists."""
+
+
+class InsufficientStockError(CleverMartError):
+    """A product does not have enough units for the requested quantity."""
+
+
+class CheckoutError(CleverMartError):
+    """A checkout was rejected (empty cart, insufficient payment)."""
+
+
+class ImportRowError(CleverMartError):
+    """A row of a supplier import file is invalid."""
+
+# =============================================================================
+# Product: Compact Read-Only Record
+# =============================================================================
+class Product(Mapping):
+    """One catalog entry, stored in slots instead of a per-item dict.
+
+    Reads work like the dict rows it replaces (``product["price"]``,
+    ``dict(product)``, ``csv.DictWriter``); writes go through
+    InventoryManager, which assigns the attributes directly.  Category
+    names are interned so every product in a category shares one string.
+    """
+
+    __slots__ = ("name", "price", "quantity", "max", "category")
+
+    def __init__(self, name, price, quantity, max, category):
+        self.name = name
+        self.price = price
+        self.quantity = quantity
+        self.max = max
+        self.category = sys.intern(category)
+
+    @classmethod
+    def from_row(cls, row):
+        return cls(row["name"], row["price"], row["quantity"], row["max"], row["category"])
+
+    def __getitem__(self, key):
+        if key not in INVENTORY_FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __iter__(self):
+        return iter(INVENTORY_FIELDS)
+
+    def __len__(self):
+        return len(INVENTORY_FIELDS)
+
+    def __repr__(self):
+        return f"Product({dict(self)!r})"
+
+    def copy(self):
+        return Product(self.name, self.price, self.quantity, self.max, self.category)
+
+# =============================================================================
+# Stock Levels
+# =============================================================================
+def stock_level(quantity, max_stock):
+    """"sufficient" from 75% of max stock, "moderate" from 25%, "low" below that."""
+    if quantity >= 0.75 * max_stock:
+        return "sufficient"
+    if quantity >= 0.25 * max_stock:
+        return "moderate"
+    return "low"
+
+# =============================================================================
+# Supplier Import Rows
+# =============================================================================
+IMPORT_OPS = ("upsert", "restock")
+
+
+def _parse_positive(text, field, parse):
+    try:
+        value = parse(text)
+    except ValueError:
+        value = 0
+    if not (math.isfinite(value) and value > 0):
+        raise ImportRowError(f"{field} must be a positive {'integer' if parse is int else 'number'}, not '{text}'.")
+    return value
+
+# =============================================================================
+# Name Index: N-Gram Postings and a Sorted Prefix Array for Product Search
+# =============================================================================
+def _ngrams(text, n):
+    return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+
+def _index_grams(text):
+    return _ngrams(text, 2) | _ngrams(text, 3)
+
+
+class NameIndex:
+    """Case-insensitive substring search over product names.
+
+    Lowercased bigrams and trigrams map to the names containing them, so a
+    query of two or more characters only verifies the names in its rarest
+    postings list.
+    A sorted array of lowercased names answers prefix queries by bisection.
+    Both structures are built on the first search and then kept up to date
+    by add()/remove(), so loading the catalog pays nothing for them.
+    """
+
+    def __init__(self, names):
+        self._names = names     # live view of every indexed name
+        self._postings = None   # bigram/trigram -> set of names
+        self._sorted = None     # sorted [(lowercased name, name)]
+
+    def clear(self):
+        self._postings = None
+        self._sorted = None
+
+    def add(self, name):
+        lowered = name.lower()
+        if self._postings is not None:
+            for gram in _index_grams(lowered):
+                self._postings.setdefault(gram, set()).add(name)
+        if self._sorted is not None:
+            bisect.insort(self._sorted, (lowered, name))
+
+    def remove(self, name):
+        lowered = name.lower()
+        if self._postings is not None:
+            for gram in _index_grams(lowered):
+                names = self._postings.get(gram)
+                if names is not None:
+                    names.discard(name)
+                    if not names:
+                        del self._postings[gram]
+        if self._sorted is not None:
+            i = bisect.bisect_left(self._sorted, (lowered, name))
+            if i < len(self._sorted) and self._sorted[i] == (lowered, name):
+                del self._sorted[i]
+
+    def build(self):
+        """Build the postings and prefix array now instead of on the first search."""
+        if self._postings is None:
+            self._build()
+
+    def _build(self):
+        postings = {}
+        for name in self._names:
+            for gram in _index_grams(name.lower()):
+                postings.setdefault(gram, set()).add(name)
+        self._postings = postings
+        self._sorted = sorted((name.lower(), name) for name in self._names)
+
+    def prefix(self, query):
+        """Names starting with query, in alphabetical order."""
+        if self._sorted is None:
+            self._build()
+        query = query.lower()
+        entries = self._sorted
+        i = bisect.bisect_left(entries, (query,))
+        matches = []
+        while i < len(entries) and entries[i][0].startswith(query):
+            matches.append(entries[i][1])
+            i += 1
+        return matches
+
+    def search(self, query):
+        """Names containing query: prefix matches first, then the rest alphabetically."""
+        if self._postings is None:
+            self._build()
+        query = query.lower()
+        prefixed = self.prefix(query)
+        seen = set(prefixed)
+        if len(query) < 2:
+            # Too short for any n-gram; scan the already-lowercased sorted array.
+            return prefixed + [name for lowered, name in self._sorted
+                               if query in lowered and name not in seen]
+        grams = _ngrams(query, 3) or _ngrams(query, 2)
+        postings = sorted((self._postings.get(gram, set()) for gram in grams), key=len)
+        candidates = postings[0]
+        for other in postings[1:]:
+            candidates = candidates & other
+            if not candidates:
+                break
+        return prefixed + sorted((name for name in candidates if name not in seen and query in name.lower()),
+                                 key=str.lower)
+
+# =============================================================================
+# Inventory Manager: Products Keyed by Name Over a Pluggable Storage Backend
+# =============================================================================
+class InventoryManager:
+    """In-memory catalog of Product records persisted through a StorageBackend.
+
+    Each mutation is handed to the backend as one record as it happens;
+    ``checkout`` groups several into a single unit of work.
+
+    The catalog can be streamed in with ``load_inventory_incrementally``;
+    products are served as soon as they are indexed, and ``loaded`` turns
+    True once the whole catalog is in.
+
+    Products are also bucketed by stock_level; a quantity change moves one
+    product between buckets, so ``low_stock_items`` never scans the catalog.
+    """
+    LOAD_BATCH = 500
+
+    def __init__(self, csv_file="inventory.csv", storage=None, load=True):
+        self.csv_file = csv_file
+        self.storage = storage or CSVBackend(csv_file)
+        # Products keyed by name: the dict is both the store and the primary-key
+        # index, and keeps insertion order for display.
+        self._items = {}
+        self._names_ci = {}  # lowercased name -> stored name, for duplicate checks
+        self._by_category = {}  # category -> {name: item}, the category partition
+        self._levels = {}  # name -> stock level
+        self._by_level = {level: {} for level in STOCK_LEVELS}  # level -> {name: item}
+        self._search = NameIndex(self._items.keys())
+        self._listeners = []
+        self._stock_listeners = []
+        self._pending = None  # records buffered while a checkout is in progress
+        self.loaded = False
+        if load:
+            self.load_inventory_data()
+
+    @property
+    def items(self):
+        return self._items.values()
+
+    def load_inventory_data(self):
+        for _ in self.load_inventory_incrementally():
+            pass
+
+    def load_inventory_incrementally(self, batch_size=None):
+        """Stream the catalog from the backend, yielding the count read after each batch.
+
+        Mutations made between batches are kept: a streamed row whose name is
+        already present is older than the in-memory product and is skipped.
+        """
+        batch_size = batch_size or self.LOAD_BATCH
+        self._items.clear()
+        self._names_ci.clear()
+        self._by_category.clear()
+        self._levels.clear()
+        for bucket in self._by_level.values():
+            bucket.clear()
+        self.loaded = False
+        count = 0
+        rows = self.storage.load_items()
+        while True:
+            # Drop a search index built between batches so this batch doesn't
+            # pay for sorted inserts; the next search rebuilds it.
+            self._search.clear()
+            start = count
+            try:
+                with metrics.timer("inventory_load_batch"):
+                    for row in rows:
+                        count += 1
+                        if row["name"] not in self._items:
+                            self._index(Product.from_row(row))
+                        if count % batch_size == 0:
+                            break
+                    else:
+                        break
+            except Exception as e:
+                raise StorageError(f"Error loading inventory data:\n{e}") from e
+            finally:
+                metrics.count("inventory_rows", count - start)
+            yield count
+        self.loaded = True
+        yield count
+
+    def save_inventory_data(self):
+        """Write the whole catalog to the backend (a snapshot/compaction)."""
+        if not self.loaded:
+            raise StorageError("Error saving inventory data:\nthe inventory is still loading.")
+        try:
+            self.storage.save_items(self.items)
+        except Exception as e:
+            raise StorageError(f"Error saving inventory data:\n{e}") from e
+
+    def _log(self, records):
+        if self._pending is not None:
+            self._pending.extend(records)
+            return
+        try:
+            self.storage.commit(records, self.items if self.loaded else None)
+        except Exception as e:
+            raise StorageError(f"Error saving inventory data:\n{e}") from e
+
+    @staticmethod
+    def _record(op, item):
+        record = dict(item)
+        record["op"] = op
+        return record
+
+    def _saved(self, names):
+        """{name: (product, copy of it)} for the named products, to hand to _restore."""
+        return {name: (self._items[name], self._items[name].copy()) for name in names if name in self._items}
+
+    def _restore(self, saved):
+        """Undo the mutations of a batch whose commit failed.
+
+        ``saved`` maps each name the batch touched to (product, copy taken
+        before the batch), or (None, None) for a product the batch added.
+        Products come back as the same objects, re-indexed and announced
+        to subscribers like any other change.
+        """
+        for name, (item, before) in saved.items():
+            current = self._items.get(name)
+            level = self._levels.get(name)
+            if item is None:
+                if current is not None:
+                    self._unindex(name)
+                    self._notify("remove", current)
+                    self._alert(current, level, None)
+                continue
+            previous = dict(current) if current is not None else None
+            if current is not None:
+                self._unindex(name)
+            for field in INVENTORY_FIELDS[1:]:
+                setattr(item, field, before[field])
+            self._index(item)
+            if previous is None:
+                self._notify("add", item)
+            elif previous["category"] != item.category:
+                self._notify("remove", previous)
+                self._notify("add", item)
+            else:
+                self._notify("update", item)
+            self._alert(item, level, self._levels[name])
+
+    def checkout(self, lines, transaction, summary=()):
+        """Deduct (name, qty) lines and record the transaction (and summary deltas) in one commit.
+
+        Every line is checked before any stock moves, so a rejected checkout
+        leaves the inventory untouched; if the commit fails, the stock is
+        put back.
+        """
+        for name, qty in lines:
+            item = self._items.get(name)
+            if item is None or item.quantity < qty:
+                raise InsufficientStockError(f"Insufficient stock for {name}.")
+        saved = self._saved(name for name, _ in lines)
+        self._pending = []
+        try:
+            for name, qty in lines:
+                self.deduct_stock(name, qty)
+            records, self._pending = self._pending, None
+            with metrics.timer("checkout_commit"):
+                self.storage.commit(records, self.items if self.loaded else None, [transaction], summary)
+        except Exception as e:
+            self._restore(saved)
+            raise StorageError(f"Error saving checkout:\n{e}") from e
+        finally:
+            self._pending = None
+
+    def apply_deltas(self, deltas, summary=(), transactions=()):
+        """Add net quantity deltas {name: units}, transactions and sales summary delta rows in one commit.
+
+        Negative deltas are sold stock (products that sell out are removed,
+        as in deduct_stock); positive ones are restocks.  Returns the names
+        not in the catalog, which are skipped.  If the commit fails, every
+        quantity is put back.
+        """
+        missing = []
+        saved = self._saved(deltas)
+        self._pending = []
+        try:
+            for name, delta in deltas.items():
+                if name not in self._items:
+                    missing.append(name)
+                elif delta < 0:
+                    self.deduct_stock(name, -delta)
+                elif delta > 0:
+                    self.restock_item(name, delta)
+            records, self._pending = self._pending, None
+            self.storage.commit(records, self.items if self.loaded else None, transactions, summary)
+        except Exception as e:
+            self._restore(saved)
+            raise StorageError(f"Error saving replayed changes:\n{e}") from e
+        finally:
+            self._pending = None
+        return missing
+
+    def bulk_import(self, rows, first_line=1):
+        """Apply supplier rows in memory and persist them in one commit.
+
+        Each row maps INVENTORY_FIELDS (as text) plus an optional ``op``:
+        "upsert" (the default) adds a product or overwrites the fields the
+        row fills in, and "restock" adds ``quantity`` units to an existing
+        product.  Names match existing products ignoring case.  Invalid rows
+        are skipped and reported instead of raised; returns {"added",
+        "updated", "restocked", "errors": [(line, message)]}.  If the commit
+        fails, the catalog is put back as it was.
+        """
+        report = {"added": 0, "updated": 0, "restocked": 0, "errors": []}
+        saved = {}
+        self._pending = []
+        try:
+            for line, row in enumerate(rows, first_line):
+                item = self.find_item_ci((row.get("name") or "").strip())
+                if item is None:
+                    saved.setdefault((row.get("name") or "").strip(), (None, None))
+                else:
+                    saved.setdefault(item.name, (item, item.copy()))
+                try:
+                    report[self._import_row(row)] += 1
+                except CleverMartError as e:
+                    report["errors"].append((line, str(e)))
+        finally:
+            # Whatever was applied is committed, even if reading the rows failed.
+            records, self._pending = self._pending, None
+            if records:
+                try:
+                    self._log(records)
+                except StorageError:
+                    self._restore(saved)
+                    raise
+        return report
+
+    def _import_row(self, row):
+        """Validate one import row completely, then apply it; returns the report key it counts under."""
+        name = (row.get("name") or "").strip()
+        if not name:
+            raise ImportRowError("Product name is empty.")
+        op = (row.get("op") or "upsert").strip().lower()
+        if op not in IMPORT_OPS:
+            raise ImportRowError(f"Unknown op '{op}'; expected {' or '.join(IMPORT_OPS)}.")
+        item = self.find_item_ci(name)
+        if op == "restock":
+            qty = _parse_positive((row.get("quantity") or "").strip(), "quantity", int)
+            if item is None:
+                raise ProductNotFoundError(f"Product '{name}' does not exist.")
+            self.restock_item(item.name, qty)
+            return "restocked"
+        fields = {}
+        for field, parse in (("price", float), ("quantity", int), ("max", int)):
+            text = (row.get(field) or "").strip()
+            if text:
+                fields[field] = _parse_positive(text, field, parse)
+        category = (row.get("category") or "").strip()
+        if category:
+            fields["category"] = category
+        if item is not None:
+            self.update_item(item.name, **fields)
+            return "updated"
+        if "price" not in fields or "quantity" not in fields:
+            raise ImportRowError(f"New product '{name}' needs a price and a quantity.")
+        fields.setdefault("max", fields["quantity"])
+        fields.setdefault("category", "Other")
+        fields["name"] = name
+        self.add_item(fields)
+        return "added"
+
+    def import_file(self, path):
+        """bulk_import a supplier CSV with a header row; error lines are line numbers in the file."""
+        try:
+            with open(path, newline="") as csvfile:
+                reader = csv.DictReader(csvfile)
+                if not reader.fieldnames or "name" not in reader.fieldnames:
+                    raise ImportRowError(f"{path} has no 'name' column.")
+                return self.bulk_import(reader, first_line=2)
+        except (OSError, csv.Error, UnicodeDecodeError) as e:
+            raise StorageError(f"Error reading import file:\n{e}") from e
+
+    def build_search_index(self):
+        self._search.build()
+
+    def filter_items(self, query, category):
+        """Products whose name contains query (case-insensitive) in category ("All" for any)."""
+        scope = self._items if category == "All" else self._by_category.get(category, {})
+        if not query:
+            return list(scope.values())
+        return [scope[name] for name in self._search.search(query) if name in scope]
+
+    # ------------------------------------------------------------------------------
+    # Keyed Product Access
+    # ------------------------------------------------------------------------------
+    def _index(self, item):
+        self._items[item.name] = item
+        self._names_ci[item.name.lower()] = item.name
+        self._by_category.setdefault(item.category, {})[item.name] = item
+        level = stock_level(item.quantity, item.max)
+        self._levels[item.name] = level
+        self._by_level[level][item.name] = item
+        self._search.add(item.name)
+
+    def _unindex(self, name):
+        item = self._items.pop(name)
+        if self._names_ci.get(name.lower()) == name:
+            del self._names_ci[name.lower()]
+        del self._by_category[item.category][name]
+        del self._by_level[self._levels.pop(name)][name]
+        self._search.remove(name)
+        return item
+
+    def _rebucket(self, item):
+        """Move item to the bucket for its current quantity and max; returns its previous level."""
+        old = self._levels[item.name]
+        new = stock_level(item.quantity, item.max)
+        if new != old:
+            del self._by_level[old][item.name]
+            self._by_level[new][item.name] = item
+            self._levels[item.name] = new
+        return old
+
+    def subscribe(self, callback):
+        """Call callback(event, item) after each mutation; event is "add", "update" or "remove"."""
+        self._listeners.append(callback)
+
+    def _notify(self, event, item):
+        for callback in self._listeners:
+            callback(event, item)
+
+    def subscribe_stock_alerts(self, callback):
+        """Call callback(event, item) when a product enters ("low") or leaves ("cleared") the low-stock bucket.
+
+        A product that sells out or is removed while low is "cleared".
+        """
+        self._stock_listeners.append(callback)
+
+    def _alert(self, item, old, new):
+        if (old == "low") != (new == "low"):
+            event = "low" if new == "low" else "cleared"
+            for callback in self._stock_listeners:
+                callback(event, item)
+
+    def get_stock_level(self, name):
+        return self._levels.get(name)
+
+    def items_with_level(self, level):
+        return self._by_level[level].values()
+
+    def low_stock_items(self):
+        """Every nearly-out-of-stock product, without scanning the catalog."""
+        return self._by_level["low"].values()
+
+    def get_item(self, name):
+        return self._items.get(name)
+
+    def items_in_category(self, category):
+        return self._by_category.get(category, {}).values()
+
+    def find_item_ci(self, name):
+        stored_name = self._names_ci.get(name.lower())
+        return self._items.get(stored_name) if stored_name is not None else None
+
+    def add_item(self, item):
+        """Add a product given as a mapping of its fields; returns the stored Product."""
+        if self.find_item_ci(item["name"]) is not None:
+            raise DuplicateProductError(f"A product named '{item['name']}' already exists.")
+        item = Product.from_row(item)
+        self._index(item)
+        self._log([self._record("upsert", item)])
+        self._notify("add", item)
+        self._alert(item, None, self._levels[item.name])
+        return item
+
+    def remove_item(self, name):
+        if name not in self._items:
+            return None
+        level = self._levels[name]
+        item = self._unindex(name)
+        self._log([{"op": "delete", "name": name}])
+        self._notify("remove", item)
+        self._alert(item, level, None)
+        return item
+
+    def rename_item(self, old_name, new_name):
+        item = self._items.get(old_name)
+        if item is None:
+            raise ProductNotFoundError(f"Product '{old_name}' does not exist.")
+        if new_name == old_name:
+            return item
+        existing = self.find_item_ci(new_name)
+        if existing is not None and existing is not item:
+            raise DuplicateProductError(f"A product named '{new_name}' already exists.")
+        level = self._levels[old_name]
+        previous = dict(self._unindex(old_name))
+        item.name = new_name
+        self._index(item)
+        self._log([{"op": "delete", "name": old_name}, self._record("upsert", item)])
+        self._notify("remove", previous)
+        self._notify("add", item)
+        self._alert(previous, level, None)
+        self._alert(item, None, level)
+        return item
+
+    def update_item(self, name, **fields):
+        """Change price/quantity/max/category of a product in one log record."""
+        item = self._items.get(name)
+        if item is None:
+            raise ProductNotFoundError(f"Product '{name}' does not exist.")
+        unknown = set(fields).difference(INVENTORY_FIELDS[1:])
+        if unknown:
+            raise TypeError(f"update_item() got unexpected fields: {', '.join(sorted(unknown))}")
+        moved = fields.get("category", item.category) != item.category
+        level = self._levels[name]
+        if moved:
+            previous = dict(self._unindex(name))
+            fields["category"] = sys.intern(fields["category"])
+        for field, value in fields.items():
+            setattr(item, field, value)
+        if moved:
+            self._index(item)
+        else:
+            self._rebucket(item)
+        self._log([self._record("upsert", item)])
+        if moved:
+            self._notify("remove", previous)
+            self._notify("add", item)
+        else:
+            self._notify("update", item)
+        self._alert(item, level, self._levels[name])
+        return item
+
+    def deduct_stock(self, name, qty):
+        """Take qty units of a product; products that sell out are removed."""
+        item = self._items.get(name)
+        if item is None:
+            return None
+        item.quantity -= qty
+        if item.quantity <= 0:
+            level = self._levels[name]
+            self._unindex(name)
+            self._log([{"op": "delete", "name": name}])
+            self._notify("remove", item)
+            self._alert(item, level, None)
+        else:
+            level = self._rebucket(item)
+            self._log([self._record("sell", item)])
+            self._notify("update", item)
+            self._alert(item, level, self._levels[name])
+        return item
+
+    def restock_item(self, name, qty):
+        item = self._items.get(name)
+        if item is None:
+            raise ProductNotFoundError(f"Product '{name}' does not exist.")
+        item.quantity += qty
+        level = self._rebucket(item)
+        self._log([self._record("restock", item)])
+        self._notify("update", item)
+        self._alert(item, level, self._levels[name])
+        return item
+
+
+# =============================================================================
+# Cart: Lines Awaiting Checkout
+# =============================================================================
+class Cart:
+    """Cart lines keyed by product name, priced at cost (markup applied on totals)."""
+
+    def __init__(self):
+        self._lines = {}
+
+    def __iter__(self):
+        return iter(self._lines.values())
+
+    def __len__(self):
+        return len(self._lines)
+
+    def get(self, name):
+        return self._lines.get(name)
+
+    def add(self, product, qty):
+        """Add qty units of product, checking the cart total against its stock."""
+        line = self._lines.get(product["name"])
+        in_cart = line["quantity"] if line else 0
+        if product["quantity"] < in_cart + qty:
+            raise InsufficientStockError(f"Insufficient stock for {product['name']}.")
+        if line:
+            line["quantity"] += qty
+        else:
+            self._lines[product["name"]] = {"name": product["name"], "price": product["price"], "quantity": qty}
+        return self._lines[product["name"]]
+
+    def deduct(self, name, qty=1):
+        """Take qty units off a line, leaving at least one; returns the line."""
+        line = self._lines.get(name)
+        if line is None:
+            raise ProductNotFoundError(f"{name} is not in the cart.")
+        line["quantity"] = max(1, line["quantity"] - qty)
+        return line
+
+    def remove(self, name):
+        return self._lines.pop(name, None)
+
+    def clear(self):
+        self._lines.clear()
+
+    @property
+    def total(self):
+        return sum(line["price"] * MARKUP * line["quantity"] for line in self._lines.values())
+
+    @property
+    def profit(self):
+        return sum(line["price"] * MARGIN * line["quantity"] for line in self._lines.values())
+
+# =============================================================================
+# Sales Summary: Running Rollups Updated Per Checkout
+# =============================================================================
+class SalesSummary:
+    """Grand, per-day, per-product and per-category sales totals.
+
+    Every rollup is a row of SUMMARY_FIELDS keyed by (scope, key); ``count``
+    is transactions for the "total" and "day" scopes and units sold for
+    "product" and "category".  A checkout adds a handful of delta rows, so
+    keeping the summary current costs the same at any history size.
+    """
+    SCOPES = ("total", "day", "product", "category")
+
+    def __init__(self, rows=()):
+        self._rows = fold_summary(rows)
+
+    @staticmethod
+    def _transaction_rows(transaction):
+        sales, profit = transaction["total_sale"], transaction["total_profit"]
+        return [{"scope": "total", "key": "", "count": 1, "sales": sales, "profit": profit},
+                {"scope": "day", "key": transaction["date"][:10], "count": 1, "sales": sales, "profit": profit}]
+
+    @staticmethod
+    def _line_rows(line):
+        qty = line["quantity"]
+        sales = line["selling_price"] * qty
+        profit = (line["selling_price"] - line["cost"]) * qty
+        return [{"scope": "product", "key": line["name"], "count": qty, "sales": sales, "profit": profit},
+                {"scope": "category", "key": line["category"], "count": qty, "sales": sales, "profit": profit}]
+
+    @classmethod
+    def checkout_rows(cls, transaction, lines):
+        """Delta rows for one checkout; lines are sales_history dicts with a category."""
+        rows = cls._transaction_rows(transaction)
+        for line in lines:
+            rows.extend(cls._line_rows(line))
+        return rows
+
+    @classmethod
+    def rebuild(cls, transactions, lines=()):
+        """Recompute the summary from raw history: transactions and their sale lines."""
+        rows = []
+        for transaction in transactions:
+            rows.extend(cls._transaction_rows(transaction))
+        for line in lines:
+            rows.extend(cls._line_rows(line))
+        return cls(rows)
+
+    def add(self, rows):
+        fold_summary(rows, self._rows)
+
+    def clear(self):
+        self._rows.clear()
+
+    def rows(self, scope=None):
+        return [row for row in self._rows.values() if scope is None or row["scope"] == scope]
+
+    def get(self, scope, key=""):
+        return self._rows.get((scope, key), {"scope": scope, "key": key, "count": 0, "sales": 0.0, "profit": 0.0})
+
+    @property
+    def total_sales(self):
+        return self.get("total")["sales"]
+
+    @property
+    def total_profit(self):
+        return self.get("total")["profit"]
+
+    def diff(self, other, scopes=SCOPES, tolerance=0.005):
+        """(scope, key, self row, other row) for every rollup that differs."""
+        keys = {key for key in self._rows.keys() | other._rows.keys() if key[0] in scopes}
+        differences = []
+        for scope, key in sorted(keys):
+            mine, theirs = self.get(scope, key), other.get(scope, key)
+            if (mine["count"] != theirs["count"] or abs(mine["sales"] - theirs["sales"]) > tolerance
+                    or abs(mine["profit"] - theirs["profit"]) > tolerance):
+                differences.append((scope, key, mine, theirs))
+        return differences
+
+# =============================================================================
+# Checkout Engine: Payment, Stock Deduction and Sales Records
+# =============================================================================
+class CheckoutEngine:
+    """Runs checkouts against an InventoryManager and keeps the sales records.
+
+    ``transaction_history`` holds one dict per checkout (as stored by the
+    backend) once ``load_transactions`` has run; until then checkouts are
+    only written to the backend.  Where the backend keeps a TransactionLog
+    it is that sequence view, which grows as checkouts are stored;
+    otherwise it is a list the engine appends to.  ``sales_history`` holds
+    the lines sold in this session; the full line history is queried with
+    ``sales_between``.  ``summary`` is the persisted SalesSummary, loaded
+    by the first checkout or summary view (and rebuilt from the history if
+    the store has none) and updated with each checkout's deltas in the
+    same commit.
+    """
+
+    def __init__(self, inventory_manager):
+        self.inventory_manager = inventory_manager
+        self.storage = inventory_manager.storage
+        self.sales_history = []
+        self.transaction_history = []
+        self.transactions_loaded = False
+        self.summary = SalesSummary()
+        self.summary_loaded = False
+
+    def load_transactions(self):
+        try:
+            log = self.storage.transaction_log()
+            self.transaction_history = log if log is not None else list(self.storage.load_transactions())
+        except Exception as e:
+            raise StorageError(f"Error loading transactions data:\n{e}") from e
+        self.transactions_loaded = True
+
+    def ensure_transactions(self):
+        """Load the transaction history on first use."""
+        if not self.transactions_loaded:
+            self.load_transactions()
+
+    def sales_between(self, start=None, end=None, name=None):
+        """Stored sale lines with start <= timestamp < end, optionally for one product.
+
+        Bounds are datetimes or timestamp strings (a date prefix like
+        "2024-05-01" works); the backend answers from its timestamp index.
+        """
+        if isinstance(start, datetime.datetime):
+            start = start.strftime(TIMESTAMP_FORMAT)
+        if isinstance(end, datetime.datetime):
+            end = end.strftime(TIMESTAMP_FORMAT)
+        try:
+            return list(self.storage.query_sales(start, end, name))
+        except Exception as e:
+            raise StorageError(f"Error loading sales data:\n{e}") from e
+
+    def verify_summary(self, rebuild=False):
+        """Diff the stored summary against one recomputed from the raw history.
+
+        Totals and days come from the transactions, products and categories
+        from the stored sale lines.  Returns the differences (see
+        SalesSummary.diff); with rebuild=True the recomputed rollups replace
+        the stored ones.
+        """
+        self.load_summary()
+        try:
+            # The journal itself, not the cents-rounded TransactionLog.
+            transactions = self.storage.load_transactions()
+            fresh = SalesSummary.rebuild(transactions, self.sales_between())
+        except CleverMartError:
+            raise
+        except Exception as e:
+            raise StorageError(f"Error loading transactions data:\n{e}") from e
+        differences = self.summary.diff(fresh)
+        if rebuild and differences:
+            try:
+                self.storage.save_summary(fresh.rows())
+            except Exception as e:
+                raise StorageError(f"Error saving sales summary:\n{e}") from e
+            self.summary = fresh
+        return differences
+
+    def load_summary(self):
+        try:
+            summary = SalesSummary(self.storage.load_summary())
+            if not summary.rows():
+                # Stores written before the summary existed have history but no
+                # rollups: build them from the history once and keep them.
+                transactions = list(self.storage.load_transactions())
+                if transactions:
+                    summary = SalesSummary.rebuild(transactions, self.storage.query_sales())
+                    self.storage.save_summary(summary.rows())
+            self.summary = summary
+        except Exception as e:
+            raise StorageError(f"Error loading sales summary:\n{e}") from e
+        self.summary_loaded = True
+
+    def ensure_summary(self):
+        if not self.summary_loaded:
+            self.load_summary()
+
+    def clear_transactions(self):
+        # Truncate/rotate in the backend rather than rewriting the history;
+        # the records in memory go only once the backend has let go of them.
+        try:
+            self.storage.clear_transactions()
+        except Exception as e:
+            raise StorageError(f"Error clearing transactions data:\n{e}") from e
+        self.transaction_history = []
+        self.transactions_loaded = False
+        self.summary.clear()
+        self.summary_loaded = True
+
+    def checkout(self, cart, tendered, now=None):
+        """Charge the cart, deduct stock and record the sale; returns the transaction.
+
+        The cart is emptied on success and left as-is if the checkout is rejected.
+        """
+        with metrics.timer("checkout"):
+            transaction = self._checkout(cart, tendered, now)
+        metrics.count("checkouts")
+        return transaction
+
+    def _checkout(self, cart, tendered, now):
+        if not len(cart):
+            raise CheckoutError("Your cart is empty.")
+        total = cart.total
+        if tendered < total:
+            raise CheckoutError("Insufficient amount tendered.")
+        # Load (or first build) the stored summary before adding deltas to it,
+        # or a legacy store's rollups would start from this sale.
+        self.ensure_summary()
+        now = now or datetime.datetime.now()
+        transaction = {
+            "date": self.storage.sale_time(now.strftime(TIMESTAMP_FORMAT)),
+            "total_sale": total,
+            "total_profit": cart.profit,
+            "tendered": tendered,
+            "change": tendered - total
+        }
+        sales = []
+        for line in cart:
+            # Read the category now: a product that sells out leaves the catalog.
+            product = self.inventory_manager.get_item(line["name"])
+            sales.append({
+                "name": line["name"],
+                "quantity": line["quantity"],
+                "cost": line["price"],
+                "selling_price": line["price"] * MARKUP,
+                "category": product["category"] if product is not None else "Other"
+            })
+        transaction["lines"] = sales
+        summary = SalesSummary.checkout_rows(transaction, sales)
+        # The backend fills in transaction["id"] and each line's timestamp and
+        # transaction_id when it writes them.
+        self.inventory_manager.checkout([(sale["name"], sale["quantity"]) for sale in sales], transaction, summary)
+        self.sales_history.extend(sales)
+        if self.transactions_loaded and isinstance(self.transaction_history, list):
+            self.transaction_history.append(transaction)
+        if self.summary_loaded:
+            self.summary.add(summary)
+        cart.clear()
+        return transaction
+
+
+# =============================================================================
+# Purchase History: Date-Range Slices in Fixed-Size Pages
+# =============================================================================
+def _history_bound(value):
+    if isinstance(value, datetime.date) and not isinstance(value, datetime.datetime):
+        value = datetime.datetime.combine(value, datetime.time())
+    return value.strftime(TIMESTAMP_FORMAT) if isinstance(value, datetime.datetime) else value
+
+
+class HistoryPages:
+    """A transaction history in commit order, seen as fixed-size pages of a date range.
+
+    A transaction falls in a range by the latest date up to it, which only
+    grows even if the clock stepped back between sales.  ``select`` turns
+    the range into an index slice by binary search on that date and
+    ``totals`` subtracts running sums, so neither reads the transactions in
+    between.  A TransactionLog provides both itself; for a plain list (a
+    till of the inventory server) the dates and running sums are built
+    once here.  Money totals are in cents.
+    """
+
+    def __init__(self, history, page_size=50):
+        self.history = history
+        self.page_size = page_size
+        if isinstance(history, TransactionLog):
+            self._dates = self._running = None
+        else:
+            self._dates = list(itertools.accumulate((transaction["date"] for transaction in history), max))
+            self._running = [(0, 0)]
+            for transaction in history:
+                sale, profit = self._running[-1]
+                self._running.append((sale + round(transaction["total_sale"] * 100),
+                                      profit + round(transaction["total_profit"] * 100)))
+        self.select()
+
+    def index(self, when):
+        """Position of the first transaction at or after when (a date, datetime or timestamp string)."""
+        when = _history_bound(when)
+        if self._dates is None:
+            return self.history.bisect_date(when)
+        return bisect.bisect_left(self._dates, when)
+
+    def select(self, start=None, end=None):
+        """Limit the pages to start <= date < end (None: unbounded) and go to the newest page."""
+        self.start = self.index(start) if start is not None else 0
+        self.stop = self.index(end) if end is not None else len(self.history)
+        self.stop = max(self.start, self.stop)
+        self.page = self.page_count - 1
+
+    @property
+    def count(self):
+        return self.stop - self.start
+
+    @property
+    def page_count(self):
+        return max(1, -(-self.count // self.page_size))
+
+    def go(self, page):
+        self.page = min(max(page, 0), self.page_count - 1)
+
+    def page_bounds(self):
+        first = self.start + self.page * self.page_size
+        return first, min(first + self.page_size, self.stop)
+
+    def rows(self):
+        """The transactions on the current page, oldest first."""
+        first, stop = self.page_bounds()
+        return [self.history[i] for i in range(first, stop)]
+
+    def totals(self, first=None, stop=None):
+        """(transactions, sales cents, profit cents) of first <= index < stop, the whole range by default."""
+        first = self.start if first is None else first
+        stop = self.stop if stop is None else stop
+        if self._running is None:
+            sale, profit = self.history.totals(first, stop)
+        else:
+            sale = self._running[stop][0] - self._running[first][0]
+            profit = self._running[stop][1] - self._running[first][1]
+        return stop - first, sale, profit
+
+    def page_totals(self):
+        return self.totals(*self.page_bounds())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="CleverMart sales summary maintenance")
+    parser.add_argument("command", choices=["verify", "rebuild"],
+                        help="compare the stored sales summary with the history, or also replace it")
+    parser.add_argument("--db", help="SQLite database instead of the CSV files")
+    parser.add_argument("--inventory", default="inventory.csv")
+    args = parser.parse_args(argv)
+
+    storage = SQLiteBackend(args.db) if args.db else CSVBackend(args.inventory)
+    try:
+        engine = CheckoutEngine(InventoryManager(storage=storage, load=False))
+        differences = engine.verify_summary(rebuild=args.command == "rebuild")
+    finally:
+        storage.close()
+    for scope, key, stored, fresh in differences:
+        print(f"{scope:<8} {key or '-':<20} stored {stored['count']:>6} {stored['sales']:>12.2f} {stored['profit']:>10.2f}"
+              f"   history {fresh['count']:>6} {fresh['sales']:>12.2f} {fresh['profit']:>10.2f}")
+    if not differences:
+        print("Sales summary matches the sales history.")
+    elif args.command == "rebuild":
+        print(f"Rebuilt {len(differences)} rollups from the sales history.")
+    else:
+        print(f"{len(differences)} rollups differ from the sales history; run 'rebuild' to fix them.")
+    return 1 if differences and args.command == "verify" else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,178 @@
+"""Named timers and counters around CleverMart's hot paths.
+
+Instrumented code does ``with metrics.timer("checkout"):`` or
+``metrics.count("storage_writes")``.  While ``metrics.enabled`` is False
+(the default) timer() hands back one shared do-nothing context manager and
+count() returns straight away, so the instrumentation costs one attribute
+check per call.
+
+Each timer keeps its last ``window`` samples for rolling p50/p95/max, and
+running totals since the last reset.  ``start_capture``/``stop_capture``
+wrap cProfile and tracemalloc for a closer look; ``export_json`` and
+``export_csv`` write the collected numbers for offline analysis.
+"""
+import collections
+import cProfile
+import csv
+import datetime
+import json
+import os
+import threading
+import time
+import tracemalloc
+
+WINDOW = 1000  # samples kept per timer
+STAT_FIELDS = ["name", "count", "total_ms", "mean_ms", "p50_ms", "p95_ms", "max_ms"]
+
+
+def _percentile(ordered, pct):
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class _Timer:
+    __slots__ = ("metrics", "name", "start")
+
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.metrics.record(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class Metrics:
+    """Rolling timings and counters keyed by operation name; safe to update from any thread."""
+
+    def __init__(self, window=WINDOW):
+        self.enabled = False
+        self.window = window
+        self._lock = threading.Lock()
+        self._samples = {}  # name -> deque of seconds
+        self._totals = {}   # name -> [count, total seconds]
+        self.counters = {}
+        self._profile = None
+
+    def timer(self, name):
+        """Context manager timing its block under name (a shared no-op while disabled)."""
+        return _Timer(self, name) if self.enabled else _NULL_TIMER
+
+    def record(self, name, seconds):
+        """Add one timing taken elsewhere, e.g. across several event-loop turns."""
+        if not self.enabled:
+            return
+        with self._lock:
+            samples = self._samples.get(name)
+            if samples is None:
+                samples = self._samples[name] = collections.deque(maxlen=self.window)
+                self._totals[name] = [0, 0.0]
+            samples.append(seconds)
+            totals = self._totals[name]
+            totals[0] += 1
+            totals[1] += seconds
+
+    def count(self, name, n=1):
+        if not self.enabled:
+            return
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def reset(self):
+        with self._lock:
+            self._samples.clear()
+            self._totals.clear()
+            self.counters.clear()
+
+    def stats(self):
+        """One STAT_FIELDS dict per timer: totals since reset, percentiles over the rolling window."""
+        with self._lock:
+            snapshot = [(name, sorted(samples), list(self._totals[name])) for name, samples in self._samples.items()]
+        rows = []
+        for name, ordered, (count, total) in sorted(snapshot):
+            rows.append({"name": name, "count": count, "total_ms": total * 1000, "mean_ms": total / count * 1000,
+                         "p50_ms": _percentile(ordered, 50) * 1000, "p95_ms": _percentile(ordered, 95) * 1000,
+                         "max_ms": ordered[-1] * 1000})
+        return rows
+
+    # ------------------------------------------------------------------------------
+    # Export
+    # ------------------------------------------------------------------------------
+    def export_json(self, path):
+        with self._lock:
+            counters = dict(self.counters)
+        report = {"timestamp": datetime.datetime.now().isoformat(timespec="seconds"), "window": self.window,
+                  "timers": self.stats(), "counters": counters}
+        with open(path, "w") as f:
+            json.dump(report, f, indent=2)
+            f.write("\n")
+
+    def export_csv(self, path):
+        """Timers as STAT_FIELDS rows, then each counter as a row with just name and count."""
+        with self._lock:
+            counters = sorted(self.counters.items())
+        with open(path, "w", newline="") as csvfile:
+            writer = csv.DictWriter(csvfile, fieldnames=STAT_FIELDS)
+            writer.writeheader()
+            writer.writerows(self.stats())
+            writer.writerows({"name": name, "count": value} for name, value in counters)
+
+    # ------------------------------------------------------------------------------
+    # cProfile / tracemalloc Capture
+    # ------------------------------------------------------------------------------
+    @property
+    def capturing(self):
+        return self._profile is not None
+
+    def start_capture(self, memory=True):
+        """Start profiling this thread's calls (and, with memory=True, tracing allocations)."""
+        if self._profile is not None:
+            return
+        if memory:
+            tracemalloc.start()
+        self._profile = cProfile.Profile()
+        self._profile.enable()
+
+    def stop_capture(self, prefix):
+        """Stop a capture and write ``prefix``.pstats (and ``prefix``-memory.txt); returns the paths."""
+        if self._profile is None:
+            return []
+        self._profile.disable()
+        profile, self._profile = self._profile, None
+        snapshot = None
+        if tracemalloc.is_tracing():
+            # Stop tracing before writing anything, so a failed write can't
+            # leave every later allocation traced.
+            try:
+                snapshot = tracemalloc.take_snapshot()
+                current, peak = tracemalloc.get_traced_memory()
+            finally:
+                tracemalloc.stop()
+        paths = [prefix + ".pstats"]
+        profile.dump_stats(paths[0])
+        if snapshot is not None:
+            paths.append(prefix + "-memory.txt")
+            with open(paths[1], "w") as f:
+                f.write(f"current {current} bytes, peak {peak} bytes\n\n")
+                for stat in snapshot.statistics("lineno")[:50]:
+                    f.write(f"{stat}\n")
+        return [os.path.abspath(path) for path in paths]
+
+
+metrics = Metrics()
@@ -0,0 +1,312 @@
+"""Replay exported POS sale logs into the inventory and the sales summary.
+
+Usage:
+    python clevermart_replay.py LOG.csv [LOG.csv ...] [--workers 4] [--db clevermart.db] [--verify] [--dry-run]
+
+Each log is a ``sales.csv`` (SALE_FIELDS, one row per sold line).  The
+logs are cut into byte ranges on line boundaries and a ProcessPoolExecutor
+folds each range into per-product, per-category and per-day partial sums;
+the partials are merged in log order, so the result does not depend on the
+number of workers.  The merged totals become net quantity deltas and sales
+summary rows that are applied to the store in one commit, together with
+the logs' transactions and sale lines, so the stored summary stays the
+sum of the stored history.  ``--verify`` also replays the logs line by
+line in this process and compares.
+"""
+import argparse
+import csv
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+from clevermart_core import CleverMartError, InventoryManager, SalesSummary
+from clevermart_storage import CLOCK_STEP_BACK, SALE_FIELDS, CSVBackend, SQLiteBackend, parse_sale_row
+
+CHUNK_BYTES = 4 * 2 ** 20  # log bytes per worker task
+
+# =============================================================================
+# Chunking: Byte Ranges on Line Boundaries
+# =============================================================================
+def read_header(path):
+    """The log's column names and the offset of its first data line."""
+    with open(path, "rb") as log:
+        header = log.readline()
+        return next(csv.reader([header.decode("utf-8")]), []), log.tell()
+
+
+def split_log(path, chunk_bytes=CHUNK_BYTES):
+    """(start, end) byte ranges covering every data line of a log, each ending on a newline."""
+    fieldnames, start = read_header(path)
+    missing = set(SALE_FIELDS).difference(fieldnames)
+    if missing:
+        raise CleverMartError(f"{path} is not a sales log; missing columns: {', '.join(sorted(missing))}")
+    size = os.path.getsize(path)
+    ranges = []
+    with open(path, "rb") as log:
+        while start < size:
+            end = start + chunk_bytes
+            if end < size:
+                log.seek(end)
+                log.readline()  # finish the line end falls in
+                end = log.tell()
+            ranges.append((start, min(end, size)))
+            start = end
+    return fieldnames, ranges
+
+# =============================================================================
+# Map: One Byte Range -> Partial Sums
+# =============================================================================
+def replay_chunk(path, start, end, fieldnames):
+    """Fold the sale lines in [start, end) of a log into partial sums.
+
+    Returns {"products": {name: [units, sales, profit]}, "categories": {...},
+    "days": {day: [transactions, sales, profit]}, "lines", "first", "first_day",
+    "last"}, where first/last are the first and last lines' transaction ids.  A
+    transaction is counted on the first of its (contiguous) lines, so one
+    that straddles two chunks is counted twice and corrected in the merge.
+    """
+    column = {name: fieldnames.index(name) for name in SALE_FIELDS}
+    timestamp, transaction, name, category = (column["timestamp"], column["transaction_id"], column["name"],
+                                              column["category"])
+    quantity, cost, selling_price = column["quantity"], column["cost"], column["selling_price"]
+    products, categories, days = {}, {}, {}
+    first = first_day = last = None
+    lines = 0
+    with open(path, "rb") as log:
+        log.seek(start)
+        text = log.read(end - start).decode("utf-8")
+    for row in csv.reader(text.splitlines()):
+        if not row:
+            continue
+        lines += 1
+        qty = int(row[quantity])
+        price = float(row[selling_price])
+        sales = price * qty
+        profit = (price - float(row[cost])) * qty
+        for totals, key in ((products, row[name]), (categories, row[category])):
+            entry = totals.get(key)
+            if entry is None:
+                totals[key] = [qty, sales, profit]
+            else:
+                entry[0] += qty
+                entry[1] += sales
+                entry[2] += profit
+        day = row[timestamp][:10]
+        entry = days.get(day)
+        if entry is None:
+            entry = days[day] = [0, 0.0, 0.0]
+        if row[transaction] != last:
+            entry[0] += 1
+            last = row[transaction]
+            if first is None:
+                first, first_day = last, day
+        entry[1] += sales
+        entry[2] += profit
+    return {"products": products, "categories": categories, "days": days, "lines": lines,
+            "first": first, "first_day": first_day, "last": last}
+
+# =============================================================================
+# Reduce: Merge Partials in Log Order
+# =============================================================================
+class ReplayResult:
+    """Merged totals of replayed sale logs.
+
+    ``products`` and ``categories`` map a key to [units, sales, profit];
+    ``days`` maps a date to [transactions, sales, profit].
+    """
+
+    def __init__(self):
+        self.products = {}
+        self.categories = {}
+        self.days = {}
+        self.lines = 0
+        self.paths = []  # the logs replayed, in order
+        self._last = None  # transaction id of the last line merged
+
+    def merge(self, partial, continues=False):
+        """Add one chunk's partial sums; continues=True if it follows on from the previous chunk of the same log."""
+        for name in ("products", "categories", "days"):
+            totals = getattr(self, name)
+            for key, values in partial[name].items():
+                entry = totals.get(key)
+                if entry is None:
+                    totals[key] = list(values)
+                else:
+                    for i, value in enumerate(values):
+                        entry[i] += value
+        self.lines += partial["lines"]
+        if continues and partial["first"] is not None and partial["first"] == self._last:
+            # The transaction at the seam was counted by both chunks.
+            self.days[partial["first_day"]][0] -= 1
+        if partial["last"] is not None:
+            self._last = partial["last"]
+
+    @property
+    def transactions(self):
+        return sum(entry[0] for entry in self.days.values())
+
+    def deltas(self):
+        """Net stock change per product: the units sold, negated."""
+        return {name: -entry[0] for name, entry in self.products.items() if entry[0]}
+
+    def summary_rows(self):
+        """The replay as SalesSummary delta rows for every scope."""
+        rows = []
+        sales = profit = 0.0
+        for day, (count, day_sales, day_profit) in sorted(self.days.items()):
+            rows.append({"scope": "day", "key": day, "count": count, "sales": day_sales, "profit": day_profit})
+            sales += day_sales
+            profit += day_profit
+        if self.days:
+            rows.append({"scope": "total", "key": "", "count": self.transactions, "sales": sales, "profit": profit})
+        for scope, totals in (("product", self.products), ("category", self.categories)):
+            for key, (count, key_sales, key_profit) in sorted(totals.items()):
+                rows.append({"scope": scope, "key": key, "count": count, "sales": key_sales, "profit": key_profit})
+        return rows
+
+
+def replay_logs(paths, workers=None, chunk_bytes=CHUNK_BYTES):
+    """Replay sale logs in parallel; workers=1 runs every chunk in this process."""
+    tasks = []
+    for path in paths:
+        fieldnames, ranges = split_log(path, chunk_bytes)
+        tasks.extend((path, start, end, fieldnames) for start, end in ranges)
+    result = ReplayResult()
+    result.paths = list(paths)
+    if workers == 1:
+        partials = (replay_chunk(*task) for task in tasks)
+    else:
+        executor = ProcessPoolExecutor(workers)
+        partials = executor.map(replay_chunk, *zip(*tasks)) if tasks else iter(())
+    try:
+        previous = None
+        for task, partial in zip(tasks, partials):
+            # map() yields in submission order, so the merge order is fixed.
+            result.merge(partial, continues=previous is not None and previous[0] == task[0])
+            previous = task
+    finally:
+        if workers != 1:
+            executor.shutdown()
+    return result
+
+# =============================================================================
+# Sequential Reference and Verification
+# =============================================================================
+def read_transactions(paths):
+    """The logs' checkouts in log order, each a transaction dict with its sale lines under "lines".
+
+    A checkout is a run of consecutive lines with the same transaction id.
+    """
+    for path in paths:
+        transaction = previous = None
+        with open(path, newline="", encoding="utf-8") as log:
+            for row in csv.DictReader(log):
+                line = parse_sale_row(row)
+                if transaction is None or line["transaction_id"] != previous:
+                    if transaction is not None:
+                        yield transaction
+                    transaction = {"date": line["timestamp"], "total_sale": 0.0, "total_profit": 0.0, "lines": []}
+                    previous = line["transaction_id"]
+                transaction["total_sale"] += line["selling_price"] * line["quantity"]
+                transaction["total_profit"] += (line["selling_price"] - line["cost"]) * line["quantity"]
+                transaction["lines"].append({field: line[field] for field in
+                                             ("name", "category", "quantity", "cost", "selling_price")})
+        if transaction is not None:
+            yield transaction
+
+
+def replay_sequential(paths):
+    """The reference replay: every line through parse_sale_row and SalesSummary.rebuild.
+
+    Returns (deltas, SalesSummary).
+    """
+    transactions = list(read_transactions(paths))
+    lines = [line for transaction in transactions for line in transaction["lines"]]
+    deltas = {}
+    for line in lines:
+        deltas[line["name"]] = deltas.get(line["name"], 0) - line["quantity"]
+    return {name: delta for name, delta in deltas.items() if delta}, SalesSummary.rebuild(transactions, lines)
+
+
+def verify(result, paths):
+    """Differences between a parallel result and the sequential replay: (quantity mismatches, summary diff)."""
+    deltas, summary = replay_sequential(paths)
+    parallel = result.deltas()
+    quantities = [(name, parallel.get(name, 0), deltas.get(name, 0))
+                  for name in sorted(parallel.keys() | deltas.keys()) if parallel.get(name, 0) != deltas.get(name, 0)]
+    return quantities, SalesSummary(result.summary_rows()).diff(summary)
+
+# =============================================================================
+# Apply: One Commit to the Store
+# =============================================================================
+def apply_result(result, storage):
+    """Apply a replay to the catalog, the sales history and the stored summary in one commit.
+
+    The logs' transactions are stored with their sale lines, so a summary
+    rebuilt from the history matches the one the replay adds to.  Sale times
+    go through the backend's sale_time as at checkout; logs older than the
+    stored history (by more than CLOCK_STEP_BACK) are refused rather than
+    stored under moved times.  Returns the product names not in the catalog.
+    """
+    transactions = []
+    for transaction in read_transactions(result.paths):
+        if storage.sale_time(transaction["date"]) != transaction["date"]:
+            raise CleverMartError(f"Sales from {transaction['date']} are more than {CLOCK_STEP_BACK} older than the "
+                                  f"sales already stored; replay the logs into a store whose history ends before them.")
+        # The logs do not record the payment: store it as paid exactly.
+        transaction["tendered"] = transaction["total_sale"]
+        transaction["change"] = 0.0
+        transactions.append(transaction)
+    return InventoryManager(storage=storage).apply_deltas(result.deltas(), result.summary_rows(), transactions)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("logs", nargs="+", help="sales.csv files exported from the tills")
+    parser.add_argument("--workers", type=int, help="worker processes (default: one per CPU; 1 runs in-process)")
+    parser.add_argument("--db", help="SQLite database instead of the CSV files")
+    parser.add_argument("--inventory", default="inventory.csv")
+    parser.add_argument("--verify", action="store_true", help="compare with a sequential line-by-line replay")
+    parser.add_argument("--dry-run", action="store_true", help="compute and report without changing the store")
+    args = parser.parse_args(argv)
+
+    try:
+        result = replay_logs(args.logs, args.workers)
+    except (OSError, CleverMartError) as e:
+        print(f"Replay failed: {e}", file=sys.stderr)
+        return 1
+    units = sum(entry[0] for entry in result.products.values())
+    sales = sum(entry[1] for entry in result.products.values())
+    profit = sum(entry[2] for entry in result.products.values())
+    print(f"{result.lines} lines, {result.transactions} transactions, {len(result.products)} products: "
+          f"{units} units, sales {sales:.2f}, profit {profit:.2f}")
+    if args.verify:
+        quantities, differences = verify(result, args.logs)
+        for name, parallel, sequential in quantities:
+            print(f"quantity {name}: parallel {parallel}, sequential {sequential}")
+        for scope, key, mine, theirs in differences:
+            print(f"{scope:<8} {key or '-':<20} parallel {mine['count']} {mine['sales']:.2f} {mine['profit']:.2f}"
+                  f"   sequential {theirs['count']} {theirs['sales']:.2f} {theirs['profit']:.2f}")
+        if quantities or differences:
+            return 1
+        print("Parallel replay matches the sequential replay.")
+    if args.dry_run:
+        return 0
+    storage = SQLiteBackend(args.db) if args.db else CSVBackend(args.inventory)
+    try:
+        missing = apply_result(result, storage)
+    except CleverMartError as e:
+        print(e, file=sys.stderr)
+        return 1
+    finally:
+        storage.close()
+    print(f"Applied {len(result.products) - len(missing)} product deltas and {result.transactions} transactions "
+          f"in one commit.")
+    if missing:
+        print(f"{len(missing)} products are not in the catalog and were skipped: {', '.join(sorted(missing)[:10])}"
+              + (" ..." if len(missing) > 10 else ""))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,259 @@
+"""Sales reports over the transaction history, computed on NumPy arrays.
+
+Usage:
+    python clevermart_reports.py [--db clevermart.db] [--period day|week|month] [--top 10]
+                                 [--start 2024-01-01] [--end 2025-01-01]
+
+The history is loaded once into column arrays: timestamps as
+datetime64[s], money as int64 cents, products and categories as integer
+codes.  Every report is then a handful of vectorized group-bys
+(np.bincount and np.add.at over bucket codes), so it costs the same few
+array passes whatever the number of transactions.
+"""
+import argparse
+import csv
+import warnings
+
+import numpy as np
+
+from clevermart_core import StorageError
+from clevermart_storage import CSVBackend, SQLiteBackend, repair_journal
+
+PERIODS = ("day", "week", "month")
+WEEKDAYS = ("Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun")
+RANKINGS = ("sales", "units", "profit")
+
+
+def _cents(amounts):
+    return np.rint(np.asarray(amounts, dtype=np.float64) * 100).astype(np.int64)
+
+
+TRANSACTION_COLUMNS = [("date", "datetime64[s]"), ("total_sale", np.float64), ("total_profit", np.float64)]
+SALE_COLUMNS = [("timestamp", "datetime64[s]"), ("transaction_id", np.int64), ("name", object),
+                ("category", object), ("quantity", np.int64), ("cost", np.float64), ("selling_price", np.float64)]
+
+
+def _read_journal(path, columns):
+    """The named columns of a CSV journal as a structured array, parsed by NumPy's C reader."""
+    dtype = np.dtype(columns)
+    try:
+        repair_journal(path)
+    except FileNotFoundError:
+        return np.zeros(0, dtype=dtype)
+    with open(path, newline="", encoding="utf-8") as csvfile:
+        header = next(csv.reader(csvfile), [])
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", UserWarning)  # a journal holding only its header
+        return np.loadtxt(path, dtype=dtype, delimiter=",", quotechar='"', skiprows=1, ndmin=1, encoding="utf-8",
+                          usecols=[header.index(name) for name, _ in columns])
+
+
+def _factorize(values):
+    """(distinct values in first-seen order, int64 code per value)."""
+    distinct, first, codes = np.unique(np.asarray(values, dtype=object), return_index=True, return_inverse=True)
+    order = np.argsort(first, kind="stable")
+    rank = np.empty(len(order), dtype=np.int64)
+    rank[order] = np.arange(len(order))
+    return distinct[order], rank[codes.reshape(-1)]
+
+
+def _group_sum(codes, values, size):
+    """Sum int64 values per code in 0..size-1, exactly (np.bincount would round through float64)."""
+    sums = np.zeros(size, dtype=np.int64)
+    np.add.at(sums, codes, values)
+    return sums
+
+# =============================================================================
+# Sales Report: Column Arrays and Vectorized Group-Bys
+# =============================================================================
+class SalesReport:
+    """The transaction history and its sold lines as column arrays.
+
+    Transactions: ``date`` (datetime64[s]), ``sale`` and ``profit`` (int64
+    cents).  Lines: ``line_date``, ``line_transaction`` (transaction id),
+    ``line_product`` and ``line_category`` (codes into ``products`` and
+    ``categories``), ``line_quantity``, ``line_sale`` and ``line_profit``.
+    """
+
+    def __init__(self, date, sale, profit, line_date, line_transaction, line_product, line_category,
+                 line_quantity, line_sale, line_profit, products, categories):
+        self.date = date
+        self.sale = sale
+        self.profit = profit
+        self.line_date = line_date
+        self.line_transaction = line_transaction
+        self.line_product = line_product
+        self.line_category = line_category
+        self.line_quantity = line_quantity
+        self.line_sale = line_sale
+        self.line_profit = line_profit
+        self.products = products
+        self.categories = categories
+
+    @classmethod
+    def from_arrays(cls, transactions, lines):
+        """Build the report from structured arrays with TRANSACTION_COLUMNS and SALE_COLUMNS."""
+        products, line_product = _factorize(lines["name"])
+        categories, line_category = _factorize(lines["category"])
+        price = _cents(lines["selling_price"])
+        quantity = lines["quantity"]
+        return cls(transactions["date"], _cents(transactions["total_sale"]), _cents(transactions["total_profit"]),
+                   lines["timestamp"], lines["transaction_id"], line_product, line_category, quantity,
+                   price * quantity, (price - _cents(lines["cost"])) * quantity, products, categories)
+
+    @classmethod
+    def from_rows(cls, transactions, lines):
+        """Build the report from parsed transaction and sale line dicts, as the backends yield them."""
+        def to_array(rows, columns):
+            return np.array([tuple(row[name] for name, _ in columns) for row in rows], dtype=np.dtype(columns))
+
+        return cls.from_arrays(to_array(transactions, TRANSACTION_COLUMNS), to_array(lines, SALE_COLUMNS))
+
+    @classmethod
+    def load(cls, storage):
+        """Load the history from a backend; the CSV journals are parsed straight into arrays."""
+        backend = getattr(storage, "backend", storage)  # see through a BackgroundWriter
+        try:
+            if isinstance(backend, CSVBackend):
+                storage.flush()
+                return cls.from_arrays(_read_journal(backend.transactions_file, TRANSACTION_COLUMNS),
+                                       _read_journal(backend.sales_file, SALE_COLUMNS))
+            return cls.from_rows(storage.load_transactions(), storage.query_sales())
+        except Exception as e:
+            raise StorageError(f"Error loading sales data:\n{e}") from e
+
+    def between(self, start=None, end=None):
+        """The report restricted to start <= time < end (datetimes or strings like "2024-05-01")."""
+        keep = np.ones(len(self.date), dtype=bool)
+        keep_lines = np.ones(len(self.line_date), dtype=bool)
+        if start is not None:
+            start = np.datetime64(start, "s")
+            keep &= self.date >= start
+            keep_lines &= self.line_date >= start
+        if end is not None:
+            end = np.datetime64(end, "s")
+            keep &= self.date < end
+            keep_lines &= self.line_date < end
+        return SalesReport(self.date[keep], self.sale[keep], self.profit[keep],
+                           self.line_date[keep_lines], self.line_transaction[keep_lines],
+                           self.line_product[keep_lines], self.line_category[keep_lines],
+                           self.line_quantity[keep_lines], self.line_sale[keep_lines],
+                           self.line_profit[keep_lines], self.products, self.categories)
+
+    # ------------------------------------------------------------------------------
+    # Reports
+    # ------------------------------------------------------------------------------
+    def revenue(self, period="day"):
+        """Transactions, sales and profit (cents) per day, Monday-based week or month, gaps included.
+
+        Returns {"period": datetime64[D] start of each period, "transactions",
+        "sales", "profit"}.
+        """
+        if period not in PERIODS:
+            raise ValueError(f"period must be one of {', '.join(PERIODS)}")
+        if not len(self.date):
+            empty = np.zeros(0, dtype=np.int64)
+            return {"period": np.zeros(0, dtype="datetime64[D]"), "transactions": empty, "sales": empty,
+                    "profit": empty}
+        if period == "month":
+            buckets = self.date.astype("datetime64[M]").astype(np.int64)
+        else:
+            buckets = self.date.astype("datetime64[D]").astype(np.int64)
+            if period == "week":
+                buckets = (buckets + 3) // 7  # day 0 (1970-01-01) was a Thursday
+        first = buckets.min()
+        codes = buckets - first
+        size = int(codes.max()) + 1
+        starts = np.arange(first, first + size)
+        if period == "month":
+            starts = starts.astype("datetime64[M]").astype("datetime64[D]")
+        elif period == "week":
+            starts = (starts * 7 - 3).astype("datetime64[D]")
+        else:
+            starts = starts.astype("datetime64[D]")
+        return {"period": starts, "transactions": np.bincount(codes, minlength=size),
+                "sales": _group_sum(codes, self.sale, size), "profit": _group_sum(codes, self.profit, size)}
+
+    def top_products(self, n=10, by="sales"):
+        """The n best products by sales, units or profit: [(name, units, sales cents, profit cents)]."""
+        if by not in RANKINGS:
+            raise ValueError(f"by must be one of {', '.join(RANKINGS)}")
+        size = len(self.products)
+        if not size or not len(self.line_product):
+            return []
+        totals = {"units": _group_sum(self.line_product, self.line_quantity, size),
+                  "sales": _group_sum(self.line_product, self.line_sale, size),
+                  "profit": _group_sum(self.line_product, self.line_profit, size)}
+        key = totals[by]
+        n = min(n, size)
+        top = np.argpartition(-key, n - 1)[:n]
+        top = top[np.lexsort((top, -key[top]))]  # ties by first appearance, so the order is stable
+        return [(str(self.products[i]), int(totals["units"][i]), int(totals["sales"][i]), int(totals["profit"][i]))
+                for i in top if totals["units"][i]]
+
+    def category_totals(self):
+        """[(category, units, sales cents, profit cents)] by sales, largest first."""
+        size = len(self.categories)
+        if not size or not len(self.line_category):
+            return []
+        units = _group_sum(self.line_category, self.line_quantity, size)
+        sales = _group_sum(self.line_category, self.line_sale, size)
+        profit = _group_sum(self.line_category, self.line_profit, size)
+        return [(str(self.categories[i]), int(units[i]), int(sales[i]), int(profit[i]))
+                for i in np.argsort(-sales, kind="stable") if units[i]]
+
+    def basket_sizes(self):
+        """Units per transaction: {"sizes", "counts"} of the distribution plus its mean, median and p90."""
+        if not len(self.line_transaction):
+            return {"sizes": np.zeros(0, dtype=np.int64), "counts": np.zeros(0, dtype=np.int64),
+                    "mean": 0.0, "median": 0.0, "p90": 0.0}
+        ids, transaction = np.unique(self.line_transaction, return_inverse=True)
+        units = _group_sum(transaction, self.line_quantity, len(ids))
+        counts = np.bincount(units)
+        sizes = np.flatnonzero(counts)
+        return {"sizes": sizes, "counts": counts[sizes], "mean": float(units.mean()),
+                "median": float(np.median(units)), "p90": float(np.percentile(units, 90))}
+
+    def hourly_heatmap(self, value="sales"):
+        """7x24 array (Monday first) of sales cents, profit cents or transaction counts by weekday and hour."""
+        seconds = self.date.astype(np.int64)
+        days = seconds // 86400
+        cells = ((days + 3) % 7) * 24 + (seconds // 3600) % 24
+        if value == "transactions":
+            grid = np.bincount(cells, minlength=168)
+        elif value in ("sales", "profit"):
+            grid = _group_sum(cells, self.sale if value == "sales" else self.profit, 168)
+        else:
+            raise ValueError("value must be sales, profit or transactions")
+        return grid.reshape(7, 24)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", help="SQLite database instead of the CSV files")
+    parser.add_argument("--inventory", default="inventory.csv")
+    parser.add_argument("--period", choices=PERIODS, default="month")
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--start", help="first date to include, e.g. 2024-01-01")
+    parser.add_argument("--end", help="first date to leave out")
+    args = parser.parse_args(argv)
+
+    storage = SQLiteBackend(args.db) if args.db else CSVBackend(args.inventory)
+    try:
+        report = SalesReport.load(storage).between(args.start, args.end)
+    finally:
+        storage.close()
+    revenue = report.revenue(args.period)
+    print(f"{args.period:<12} {'transactions':>12} {'sales':>14} {'profit':>12}")
+    for start, count, sales, profit in zip(revenue["period"], revenue["transactions"], revenue["sales"],
+                                           revenue["profit"]):
+        print(f"{str(start):<12} {count:>12} {sales / 100:>14.2f} {profit / 100:>12.2f}")
+    print(f"\nTop {args.top} products by sales")
+    for name, units, sales, profit in report.top_products(args.top):
+        print(f"{name:<30} {units:>8} {sales / 100:>14.2f} {profit / 100:>12.2f}")
+    baskets = report.basket_sizes()
+    print(f"\nBasket size: mean {baskets['mean']:.2f}, median {baskets['median']:.0f}, p90 {baskets['p90']:.0f} units")
+
+
+if __name__ == "__main__":
+    main()
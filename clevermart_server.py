@@ -0,0 +1,580 @@
+"""Local inventory server: one process owns the catalog for several tills.
+
+Usage:
+    python clevermart_server.py [--address 127.0.0.1:8765 | /tmp/clevermart.sock] [--db clevermart.db]
+                                [--durability none|fsync|group] [--ttl 300]
+
+Each connection is one till.  Adding to the cart reserves stock on the
+server, payment turns the till's reservations into a sale, and clearing
+the cart, disconnecting or ``ttl`` seconds without touching the cart
+releases them.  Tills connect with InventoryClient (headless scripts) or
+run the app with ``--server ADDRESS``.
+
+Protocol: one JSON object per line.  A request is {"id", "op", "args"};
+the reply is {"id", "ok": true, "result"} or {"id", "ok": false, "error",
+"message"}, where ``error`` names the CleverMartError subclass.  Replies
+come back in request order, so a client may send several requests before
+reading any reply; the server answers everything that has arrived in one
+batch.
+"""
+import argparse
+import collections
+import itertools
+import json
+import os
+import socket
+import socketserver
+import threading
+import time
+
+from clevermart_core import (Cart, CheckoutEngine, CheckoutError, CleverMartError, DuplicateProductError,
+                             ImportRowError, InsufficientStockError, InventoryManager, Product, ProductNotFoundError,
+                             StorageError)
+from clevermart_storage import BackgroundWriter, CSVBackend, SQLiteBackend, StorageBackend
+
+DEFAULT_ADDRESS = "127.0.0.1:8765"
+RESERVATION_TTL = 300  # seconds a till's reservations survive without activity
+FEED_SIZE = 10000      # catalog changes kept for replicas catching up
+LISTEN_BACKLOG = 64    # tills that may be connecting at once
+ERRORS = {cls.__name__: cls for cls in (CleverMartError, StorageError, DuplicateProductError,
+                                        ProductNotFoundError, InsufficientStockError, CheckoutError,
+                                        ImportRowError)}
+
+
+def parse_address(address):
+    """"host:port" -> (host, port) for TCP; anything else is a Unix socket path."""
+    host, sep, port = address.rpartition(":")
+    if sep and port.isdigit():
+        return host or "127.0.0.1", int(port)
+    return address
+
+
+def _encode(message):
+    return json.dumps(message, separators=(",", ":")).encode() + b"\n"
+
+# =============================================================================
+# Inventory Server: Catalog, Checkout and Per-Till Reservations Behind One Lock
+# =============================================================================
+class InventoryServer:
+    """The shared InventoryManager and CheckoutEngine plus every till's reservations.
+
+    A till's reservations are a Cart held here; ``reserved`` totals them
+    per product so a reservation only succeeds while the stock not yet
+    promised to another till covers it.  Every catalog change is numbered
+    and kept in a bounded feed that replicas poll with the "changes" op.
+
+    Requests run through ``handle_batch`` under one lock, so each pipelined
+    batch costs a single acquisition.
+    """
+
+    def __init__(self, storage, reservation_ttl=RESERVATION_TTL, feed_size=FEED_SIZE):
+        self.storage = storage
+        self.reservation_ttl = reservation_ttl
+        self.lock = threading.Lock()
+        self.inventory_manager = InventoryManager(storage=storage)
+        self.checkout_engine = CheckoutEngine(self.inventory_manager)
+        self.carts = {}      # till -> Cart of reserved lines
+        self.deadlines = {}  # till -> monotonic time its reservations expire
+        self.reserved = {}   # product name -> units reserved across all tills
+        self.version = 0
+        self.feed = collections.deque(maxlen=feed_size)  # (version, event, product fields)
+        self.inventory_manager.subscribe(self._on_change)
+
+    def _on_change(self, event, item):
+        self.version += 1
+        self.feed.append((self.version, event, dict(item)))
+
+    def handle_batch(self, till, requests):
+        """Run decoded requests in order; returns their encoded replies."""
+        replies = []
+        with self.lock:
+            self._expire()
+            for request in requests:
+                request_id = request.get("id") if isinstance(request, dict) else None
+                try:
+                    if not isinstance(request, dict):
+                        raise CleverMartError("Bad request: expected a JSON object")
+                    handler = getattr(self, "op_" + str(request.get("op")), None)
+                    if handler is None:
+                        raise CleverMartError(f"Unknown operation: {request.get('op')}")
+                    reply = {"id": request_id, "ok": True, "result": handler(till, **request.get("args", {}))}
+                except CleverMartError as e:
+                    reply = {"id": request_id, "ok": False, "error": type(e).__name__, "message": str(e)}
+                except (TypeError, KeyError, ValueError) as e:
+                    reply = {"id": request_id, "ok": False, "error": "CleverMartError",
+                             "message": f"Bad request: {e}"}
+                replies.append(_encode(reply))
+        return replies
+
+    def disconnect(self, till):
+        with self.lock:
+            self._release(till)
+
+    # ------------------------------------------------------------------------------
+    # Reservations
+    # ------------------------------------------------------------------------------
+    def _expire(self):
+        now = time.monotonic()
+        for till in [till for till, deadline in self.deadlines.items() if deadline <= now]:
+            self._release(till)
+
+    def _touch(self, till):
+        self.deadlines[till] = time.monotonic() + self.reservation_ttl
+
+    def _unreserve(self, name, qty):
+        left = self.reserved.get(name, 0) - qty
+        if left > 0:
+            self.reserved[name] = left
+        else:
+            self.reserved.pop(name, None)
+
+    def _release(self, till, name=None):
+        cart = self.carts.get(till)
+        if cart is None:
+            return
+        for line in [cart.get(name)] if name is not None else list(cart):
+            if line is not None:
+                self._unreserve(line["name"], line["quantity"])
+                cart.remove(line["name"])
+        if not len(cart):
+            del self.carts[till]
+            self.deadlines.pop(till, None)
+
+    def op_reserve(self, till, name, qty):
+        product = self.inventory_manager.get_item(name)
+        if product is None:
+            raise ProductNotFoundError(f"Product '{name}' does not exist.")
+        if qty <= 0:
+            raise CheckoutError("Quantity must be at least 1.")
+        if product.quantity - self.reserved.get(name, 0) < qty:
+            raise InsufficientStockError(f"Insufficient stock for {name}.")
+        line = self.carts.setdefault(till, Cart()).add(product, qty)
+        self.reserved[name] = self.reserved.get(name, 0) + qty
+        self._touch(till)
+        return line
+
+    def op_release(self, till, name=None, qty=None):
+        """Release one line (or qty units of it, leaving at least one) or, with no name, the whole cart."""
+        cart = self.carts.get(till)
+        if name is None or qty is None or cart is None or cart.get(name) is None:
+            self._release(till, name)
+            return None
+        before = cart.get(name)["quantity"]
+        line = cart.deduct(name, qty)
+        self._unreserve(name, before - line["quantity"])
+        self._touch(till)
+        return line
+
+    def op_cart(self, till):
+        cart = self.carts.get(till)
+        return list(cart) if cart is not None else []
+
+    def op_checkout(self, till, tendered):
+        """Sell the till's reserved lines; on failure the reservations are kept."""
+        cart = self.carts.get(till)
+        if cart is None:
+            raise CheckoutError("This till holds no reserved stock; the cart may have timed out.")
+        lines = [(line["name"], line["quantity"]) for line in cart]
+        transaction = self.checkout_engine.checkout(cart, tendered)
+        for name, qty in lines:
+            self._unreserve(name, qty)
+        self._release(till)
+        # The writer thread fills in ids and timestamps later; reply with
+        # copies taken in one step each rather than iterating the live dicts.
+        reply = dict(transaction)
+        reply.pop("id", None)
+        reply["lines"] = [dict(line) for line in reply["lines"]]
+        return reply
+
+    # ------------------------------------------------------------------------------
+    # Catalog
+    # ------------------------------------------------------------------------------
+    def op_ping(self, till):
+        return None
+
+    def op_items(self, till):
+        return {"version": self.version, "items": [dict(item) for item in self.inventory_manager.items]}
+
+    def op_changes(self, till, since):
+        """Changes after version ``since``, or a reset if the feed no longer reaches back that far."""
+        if since < self.version and (not self.feed or self.feed[0][0] > since + 1):
+            return {"version": self.version, "reset": True, "changes": []}
+        changes = []
+        for version, event, fields in reversed(self.feed):
+            if version <= since:
+                break
+            changes.append([event, fields])
+        changes.reverse()
+        return {"version": self.version, "reset": False, "changes": changes}
+
+    def op_get_item(self, till, name):
+        item = self.inventory_manager.get_item(name)
+        return dict(item) if item is not None else None
+
+    def op_add_item(self, till, item):
+        return dict(self.inventory_manager.add_item(item))
+
+    def op_update_item(self, till, name, fields):
+        return dict(self.inventory_manager.update_item(name, **fields))
+
+    def op_rename_item(self, till, old_name, new_name):
+        return dict(self.inventory_manager.rename_item(old_name, new_name))
+
+    def op_remove_item(self, till, name):
+        item = self.inventory_manager.remove_item(name)
+        return dict(item) if item is not None else None
+
+    def op_restock_item(self, till, name, qty):
+        return dict(self.inventory_manager.restock_item(name, qty))
+
+    def op_bulk_import(self, till, rows, first_line=1):
+        return self.inventory_manager.bulk_import(rows, first_line)
+
+    # ------------------------------------------------------------------------------
+    # Sales Records
+    # ------------------------------------------------------------------------------
+    def op_transactions(self, till):
+        self.checkout_engine.ensure_transactions()
+        try:
+            self.storage.flush()  # so every transaction has its id
+        except Exception as e:
+            raise StorageError(f"Error saving transactions data:\n{e}") from e
+        history = [dict(transaction) for transaction in self.checkout_engine.transaction_history]
+        for transaction in history:
+            transaction.pop("lines", None)
+        return history
+
+    def op_summary(self, till):
+        self.checkout_engine.ensure_summary()
+        return self.checkout_engine.summary.rows()
+
+    def op_sales_between(self, till, start=None, end=None, name=None):
+        return self.checkout_engine.sales_between(start, end, name)
+
+# =============================================================================
+# Socket Server: One Thread per Till Connection
+# =============================================================================
+class _TillHandler(socketserver.BaseRequestHandler):
+    """Reads whatever requests have arrived, answers them as one batch and sends the replies together."""
+
+    def handle(self):
+        server = self.server.inventory_server
+        till = next(self.server.till_ids)
+        if self.server.address_family != getattr(socket, "AF_UNIX", None):
+            self.request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        pending = b""
+        try:
+            while True:
+                data = self.request.recv(65536)
+                if not data:
+                    break
+                *lines, pending = (pending + data).split(b"\n")
+                requests = []
+                for line in lines:
+                    if line.strip():
+                        try:
+                            requests.append(json.loads(line))
+                        except ValueError:
+                            requests.append({"op": None})
+                if requests:
+                    self.request.sendall(b"".join(server.handle_batch(till, requests)))
+        except OSError:
+            pass
+        finally:
+            server.disconnect(till)
+
+
+class _TCPServer(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+    request_queue_size = LISTEN_BACKLOG
+
+
+if hasattr(socketserver, "ThreadingUnixStreamServer"):
+    class _UnixServer(socketserver.ThreadingUnixStreamServer):
+        daemon_threads = True
+        request_queue_size = LISTEN_BACKLOG
+
+
+def make_server(address, inventory_server):
+    """A socketserver for ``address`` ("host:port" or a Unix socket path) serving inventory_server."""
+    address = parse_address(address)
+    if isinstance(address, tuple):
+        server = _TCPServer(address, _TillHandler)
+    else:
+        if os.path.exists(address):
+            os.remove(address)  # left behind by a server that did not shut down cleanly
+        server = _UnixServer(address, _TillHandler)
+    server.inventory_server = inventory_server
+    server.till_ids = itertools.count(1)
+    return server
+
+# =============================================================================
+# Client: Pipelined Requests Over One Connection
+# =============================================================================
+class InventoryClient:
+    """One till's connection to the server.
+
+    ``call`` sends a request and waits for its reply; ``call_many`` sends
+    several before reading any reply, so a reservation and the checkout
+    that follows it cost one round trip.  Server errors are raised as the
+    matching CleverMartError subclass; a lost connection as StorageError.
+    """
+
+    def __init__(self, address=DEFAULT_ADDRESS, timeout=30):
+        address = parse_address(address)
+        try:
+            if isinstance(address, tuple):
+                self.sock = socket.create_connection(address, timeout)
+                self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            else:
+                self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+                self.sock.settimeout(timeout)
+                self.sock.connect(address)
+        except OSError as e:
+            raise StorageError(f"Cannot reach the inventory server:\n{e}") from e
+        self._ids = itertools.count(1)
+        self._pending = b""
+
+    def call(self, op, **args):
+        return self.call_many([(op, args)])[0]
+
+    def call_many(self, requests):
+        """Send (op, args) requests back to back and return their results in order.
+
+        Every reply is read before the first failure is raised, so the
+        connection stays in step.
+        """
+        payload = b"".join(_encode({"id": next(self._ids), "op": op, "args": args}) for op, args in requests)
+        try:
+            self.sock.sendall(payload)
+            replies = [self._read_reply() for _ in requests]
+        except OSError as e:
+            raise StorageError(f"Lost connection to the inventory server:\n{e}") from e
+        for reply in replies:
+            if not reply["ok"]:
+                raise ERRORS.get(reply["error"], CleverMartError)(reply["message"])
+        return [reply["result"] for reply in replies]
+
+    def _read_reply(self):
+        while b"\n" not in self._pending:
+            data = self.sock.recv(65536)
+            if not data:
+                raise ConnectionResetError("the server closed the connection")
+            self._pending += data
+        line, self._pending = self._pending.split(b"\n", 1)
+        return json.loads(line)
+
+    def close(self):
+        self.sock.close()
+
+# =============================================================================
+# Remote Replicas: The Core Classes Backed by a Server
+# =============================================================================
+class RemoteStorage(StorageBackend):
+    """Read side of the server, for a replica InventoryManager and CheckoutEngine.
+
+    Catalog writes never reach it: RemoteInventoryManager sends operations,
+    not records, so two tills cannot overwrite each other's stock counts.
+    """
+
+    def __init__(self, client):
+        self.client = client
+        self.version = 0  # change-feed version the replica is current to
+
+    def load_items(self):
+        snapshot = self.client.call("items")
+        self.version = snapshot["version"]
+        return iter(snapshot["items"])
+
+    def load_transactions(self):
+        return iter(self.client.call("transactions"))
+
+    def load_summary(self):
+        return self.client.call("summary")
+
+    def query_sales(self, start=None, end=None, name=None):
+        return iter(self.client.call("sales_between", start=start, end=end, name=name))
+
+    def clear_transactions(self):
+        # No till may wipe the store's history over an unauthenticated socket.
+        raise StorageError("the purchase history is kept by the inventory server.")
+
+    def close(self):
+        self.client.close()
+
+
+class RemoteInventoryManager(InventoryManager):
+    """Local read replica of the server's catalog.
+
+    Reads and searches are answered locally; mutations are sent to the
+    server and come back, with every other till's, through ``sync``, which
+    applies the server's change feed and notifies subscribers as usual.
+    """
+
+    def __init__(self, client):
+        super().__init__(storage=RemoteStorage(client), load=False)
+        self.client = client
+
+    def save_inventory_data(self):
+        raise StorageError("Error saving inventory data:\nthe inventory server owns the catalog.")
+
+    def sync(self):
+        """Apply the catalog changes made on the server since the last sync."""
+        result = self.client.call("changes", since=self.storage.version)
+        if result["reset"]:
+            self.load_inventory_data()
+            for item in list(self.items):
+                self._notify("add", item)
+            return
+        for event, fields in result["changes"]:
+            item = self._items.get(fields["name"])
+            level = self._levels.get(fields["name"])
+            if event == "remove":
+                if item is not None:
+                    self._notify("remove", self._unindex(fields["name"]))
+                    self._alert(item, level, None)
+            elif item is None:
+                item = self._replace(fields)
+                self._notify("add", item)
+                self._alert(item, None, self._levels[item.name])
+            else:
+                if fields["category"] != item.category:
+                    self._unindex(item.name)
+                    self._notify("remove", item.copy())
+                    item = self._replace(fields)
+                    self._notify("add", item)
+                else:
+                    for field in ("price", "quantity", "max"):
+                        setattr(item, field, fields[field])
+                    self._rebucket(item)
+                    self._notify("update", item)
+                self._alert(item, level, self._levels[item.name])
+        self.storage.version = result["version"]
+
+    def _replace(self, fields):
+        if fields["name"] in self._items:
+            self._unindex(fields["name"])
+        item = Product.from_row(fields)
+        self._index(item)
+        return item
+
+    def _apply(self, op, **args):
+        result = self.client.call(op, **args)
+        self.sync()
+        return self.get_item(result["name"]) if result is not None else None
+
+    def add_item(self, item):
+        return self._apply("add_item", item=dict(item))
+
+    def remove_item(self, name):
+        return self._apply("remove_item", name=name)
+
+    def rename_item(self, old_name, new_name):
+        return self._apply("rename_item", old_name=old_name, new_name=new_name)
+
+    def update_item(self, name, **fields):
+        return self._apply("update_item", name=name, fields=fields)
+
+    def restock_item(self, name, qty):
+        return self._apply("restock_item", name=name, qty=qty)
+
+    def bulk_import(self, rows, first_line=1):
+        # The whole file goes to the server as one request and one commit there.
+        report = self.client.call("bulk_import", rows=[dict(row) for row in rows], first_line=first_line)
+        report["errors"] = [tuple(error) for error in report["errors"]]
+        self.sync()
+        return report
+
+    def deduct_stock(self, name, qty):
+        raise StorageError("Stock is only deducted by a checkout on the inventory server.")
+
+
+class RemoteCart(Cart):
+    """A cart whose lines are stock reservations held by the server for this till."""
+
+    def __init__(self, client):
+        super().__init__()
+        self.client = client
+
+    def add(self, product, qty):
+        line = self.client.call("reserve", name=product["name"], qty=qty)
+        self._lines[line["name"]] = line
+        return line
+
+    def deduct(self, name, qty=1):
+        if name not in self._lines:
+            raise ProductNotFoundError(f"{name} is not in the cart.")
+        self._lines[name] = self.client.call("release", name=name, qty=qty)
+        return self._lines[name]
+
+    def remove(self, name):
+        if name in self._lines:
+            self.client.call("release", name=name)
+        return self._lines.pop(name, None)
+
+    def clear(self):
+        if self._lines:
+            self.client.call("release")
+        self._lines.clear()
+
+
+class RemoteCheckoutEngine(CheckoutEngine):
+    """Checkout against the server: payment sells this till's reservations.
+
+    Other tills keep selling, so the history and summary are fetched
+    afresh whenever they are asked for.
+    """
+
+    def __init__(self, inventory_manager):
+        super().__init__(inventory_manager)
+        self.client = inventory_manager.client
+
+    def ensure_transactions(self):
+        self.load_transactions()
+
+    def ensure_summary(self):
+        self.load_summary()
+
+    def verify_summary(self, rebuild=False):
+        raise StorageError("Verify the sales summary on the inventory server's own files.")
+
+    def checkout(self, cart, tendered, now=None):
+        if not len(cart):
+            raise CheckoutError("Your cart is empty.")
+        if tendered < cart.total:
+            raise CheckoutError("Insufficient amount tendered.")
+        transaction = self.client.call("checkout", tendered=tendered)
+        self.sales_history.extend(transaction["lines"])
+        Cart.clear(cart)  # the server has already turned the reservations into a sale
+        self.inventory_manager.sync()
+        return transaction
+
+# =============================================================================
+# Command Line: Run a Server
+# =============================================================================
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--address", default=DEFAULT_ADDRESS, help="host:port, or a Unix socket path")
+    parser.add_argument("--db", help="SQLite database instead of the CSV files")
+    parser.add_argument("--inventory", default="inventory.csv")
+    parser.add_argument("--durability", choices=["none", "fsync", "group"], default="group")
+    parser.add_argument("--ttl", type=float, default=RESERVATION_TTL, help="seconds before an idle till's reservations lapse")
+    args = parser.parse_args(argv)
+
+    level = "none" if args.durability == "none" else "fsync"
+    backend = SQLiteBackend(args.db, level) if args.db else CSVBackend(args.inventory, durability=level)
+    storage = BackgroundWriter(backend, group_ms=10 if args.durability == "group" else 0)
+    server = make_server(args.address, InventoryServer(storage, args.ttl))
+    print(f"CleverMart inventory server on {args.address}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        storage.close()
+
+
+if __name__ == "__main__":
+    main()
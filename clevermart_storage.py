@@ -0,0 +1,1541 @@
+"""Storage backends for CleverMart inventory and transaction data.
+
+Usage:
+    python clevermart_storage.py migrate clevermart.db [--inventory inventory.csv] [--transactions transactions.csv]
+"""
+import argparse
+import csv
+import datetime
+import io
+import itertools
+import logging
+import mmap
+import os
+import queue
+import sqlite3
+import struct
+import sys
+import threading
+import time
+import zlib
+from array import array
+from collections.abc import Sequence
+
+from clevermart_metrics import metrics
+
+INVENTORY_FIELDS = ["name", "price", "quantity", "max", "category"]
+INVENTORY_LOG_FIELDS = ["op"] + INVENTORY_FIELDS
+TRANSACTION_FIELDS = ["id", "date", "total_sale", "total_profit", "tendered", "change"]
+SALE_FIELDS = ["timestamp", "transaction_id", "name", "category", "quantity", "cost", "selling_price"]
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"  # fixed width, so text order is time order
+DURABILITY_LEVELS = ("none", "fsync")
+SUMMARY_FIELDS = ["scope", "key", "count", "sales", "profit"]
+CLOCK_STEP_BACK = datetime.timedelta(hours=2)  # how far a sale time may trail earlier ones (DST and then some)
+
+logger = logging.getLogger(__name__)
+
+# =============================================================================
+# Journal Helpers: Append-Only CSV Files With a Crash-Safe Tail
+# =============================================================================
+def _rfind_newline(journal, end, chunk_size=4096):
+    """Offset just past the last newline before ``end`` (0 if there is none)."""
+    while end > 0:
+        start = max(0, end - chunk_size)
+        journal.seek(start)
+        newline = journal.read(end - start).rfind(b"\n")
+        if newline >= 0:
+            return start + newline + 1
+        end = start
+    return 0
+
+
+def repair_journal(path):
+    """Truncate a partial last record left by a crash mid-append; returns the journal size.
+
+    Only the tail is scanned, so this costs the same for any journal size.
+    """
+    with open(path, "r+b") as journal:
+        size = journal.seek(0, os.SEEK_END)
+        end = _rfind_newline(journal, size)
+        if end < size:
+            journal.truncate(end)
+    return end
+
+
+def open_journal(path):
+    """Open an append-only CSV journal for streaming reads, repairing its tail first."""
+    repair_journal(path)
+    return open(path, "r", newline="", encoding="utf-8")
+
+
+def journal_tail(path, fieldnames):
+    """The records of a CSV journal as dicts, last first; reads back only as far as they are iterated."""
+    try:
+        end = repair_journal(path)
+    except FileNotFoundError:
+        return
+    with open(path, "rb") as journal:
+        while end:
+            start = _rfind_newline(journal, end - 1)
+            if start == 0:
+                return  # the header
+            journal.seek(start)
+            values = next(csv.reader([journal.read(end - start).decode("utf-8")]), None)
+            if values:
+                yield dict(zip(fieldnames, values))
+            end = start
+
+
+def last_journal_row(path, fieldnames):
+    """The last record of a CSV journal as a dict, or None if it has none; reads only the tail."""
+    return next(journal_tail(path, fieldnames), None)
+
+
+def append_journal(path, fieldnames, rows, sync=False):
+    """Append rows to a CSV journal, writing the header if the file is new.
+
+    Keys outside ``fieldnames`` are ignored, so callers can pass richer dicts.
+    With sync=True the rows (and a new file's directory entry) are fsynced
+    before returning.
+    """
+    with open(path, "a", newline="", encoding="utf-8") as csvfile:
+        writer = csv.DictWriter(csvfile, fieldnames=fieldnames, extrasaction="ignore")
+        created = csvfile.tell() == 0
+        if created:
+            writer.writeheader()
+        writer.writerows(rows)
+        csvfile.flush()
+        if sync:
+            os.fsync(csvfile.fileno())
+    if sync and created:
+        fsync_directory(path)
+
+
+def write_snapshot(path, fieldnames, rows, sync=False):
+    """Replace a CSV file with rows via a temp file and os.replace.
+
+    Readers (and a crash) see either the old file or the complete new one.
+    With sync=True the data is fsynced before the rename and the directory
+    after it, so the rename itself is durable.
+    """
+    tmp_file = path + ".tmp"
+    with open(tmp_file, "w", newline="", encoding="utf-8") as csvfile:
+        writer = csv.DictWriter(csvfile, fieldnames=fieldnames, extrasaction="ignore")
+        writer.writeheader()
+        writer.writerows(rows)
+        if sync:
+            csvfile.flush()
+            os.fsync(csvfile.fileno())
+    os.replace(tmp_file, path)
+    if sync:
+        fsync_directory(path)
+
+
+def fsync_directory(path):
+    """fsync the directory holding path, making a create or rename durable (no-op on Windows)."""
+    try:
+        fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    except OSError:
+        return  # directories cannot be opened on Windows
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def parse_inventory_row(row):
+    row["price"] = float(row["price"])
+    row["quantity"] = int(row["quantity"])
+    row["max"] = int(row["max"])
+    if not row.get("category"):
+        row["category"] = "Other"
+    return row
+
+
+def parse_transaction_row(row):
+    row["id"] = int(row["id"])
+    row["total_sale"] = float(row["total_sale"])
+    row["total_profit"] = float(row["total_profit"])
+    row["tendered"] = float(row["tendered"])
+    row["change"] = float(row["change"])
+    return row
+
+
+def parse_sale_row(row):
+    row["transaction_id"] = int(row["transaction_id"])
+    row["quantity"] = int(row["quantity"])
+    row["cost"] = float(row["cost"])
+    row["selling_price"] = float(row["selling_price"])
+    return row
+
+
+def parse_summary_row(row):
+    row["count"] = int(row["count"])
+    row["sales"] = float(row["sales"])
+    row["profit"] = float(row["profit"])
+    return row
+
+
+def fold_summary(rows, totals=None):
+    """Sum summary delta rows into {(scope, key): row}."""
+    totals = {} if totals is None else totals
+    for row in rows:
+        entry = totals.get((row["scope"], row["key"]))
+        if entry is None:
+            totals[row["scope"], row["key"]] = dict(row)
+        else:
+            entry["count"] += row["count"]
+            entry["sales"] += row["sales"]
+            entry["profit"] += row["profit"]
+    return totals
+
+# =============================================================================
+# Binary Inventory Snapshot: Fixed-Layout Columns for Fast Startup
+# =============================================================================
+# Layout (little-endian): SNAPSHOT_HEADER, then the columns for ``count``
+# rows in CSV order: price float64[count], quantity int64[count], max
+# int64[count], category code int32[count], the NUL-joined UTF-8 names
+# (``names_size`` bytes) and the NUL-joined category names.  The header
+# records the st_mtime_ns and st_size of the CSV it mirrors and a CRC-32 of
+# everything after it; a snapshot matching neither is ignored.
+SNAPSHOT_MAGIC = b"CMSNAP\r\n"
+SNAPSHOT_VERSION = 1
+SNAPSHOT_HEADER = struct.Struct("<8sIIIqqQI")  # magic, version, count, categories, mtime_ns, size, names_size, crc32
+
+
+def _little_endian(column):
+    if sys.byteorder != "little":
+        column.byteswap()
+    return column
+
+
+class SnapshotColumns:
+    """Inventory rows gathered column by column for write_binary_snapshot."""
+
+    def __init__(self):
+        self.names = []
+        self.prices, self.quantities, self.maxes, self.codes = array("d"), array("q"), array("q"), array("i")
+        self.categories = {}  # name -> code
+
+    def add(self, row):
+        self.names.append(row["name"])
+        self.prices.append(row["price"])
+        self.quantities.append(row["quantity"])
+        self.maxes.append(row["max"])
+        self.codes.append(self.categories.setdefault(row["category"], len(self.categories)))
+
+    def write(self, path, stat, sync=False):
+        """Write the snapshot stamped with ``stat`` of the CSV it mirrors; False if a name holds a NUL."""
+        names_blob = "\0".join(self.names).encode("utf-8")
+        categories_blob = "\0".join(self.categories).encode("utf-8")
+        if (names_blob.count(b"\0") != max(0, len(self.names) - 1)
+                or categories_blob.count(b"\0") != max(0, len(self.categories) - 1)):
+            return False
+        payload = [_little_endian(array(column.typecode, column)).tobytes()
+                   for column in (self.prices, self.quantities, self.maxes, self.codes)]
+        payload += [names_blob, categories_blob]
+        crc = 0
+        for part in payload:
+            crc = zlib.crc32(part, crc)
+        tmp_file = path + ".tmp"
+        with open(tmp_file, "wb") as snapshot:
+            snapshot.write(SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, len(self.names), len(self.categories),
+                                                stat.st_mtime_ns, stat.st_size, len(names_blob), crc))
+            snapshot.writelines(payload)
+            if sync:
+                snapshot.flush()
+                os.fsync(snapshot.fileno())
+        os.replace(tmp_file, path)
+        return True
+
+
+def write_binary_snapshot(path, rows, source, sync=False):
+    """Write rows (INVENTORY_FIELDS mappings) as a binary snapshot of the CSV file ``source``.
+
+    Call it right after writing ``source``: the snapshot is stamped with its
+    current mtime and size.  Returns False, writing nothing, if a name or
+    category contains a NUL byte.
+    """
+    columns = SnapshotColumns()
+    for row in rows:
+        columns.add(row)
+    return columns.write(path, os.stat(source), sync)
+
+
+def read_binary_snapshot(path, source):
+    """The columns of a binary snapshot that still matches the CSV file ``source``, else None.
+
+    Returns (names, prices, quantities, maxes, category codes, categories).
+    A missing, truncated, corrupt or stale snapshot, or a different format
+    version, gives None so the caller falls back to the CSV.
+    """
+    try:
+        stat = os.stat(source)
+        with open(path, "rb") as snapshot:
+            size = os.fstat(snapshot.fileno()).st_size
+            if size < SNAPSHOT_HEADER.size:
+                return None
+            with mmap.mmap(snapshot.fileno(), 0, access=mmap.ACCESS_READ) as mapped, memoryview(mapped) as view:
+                return _read_columns(view, stat)
+    except (OSError, ValueError, UnicodeDecodeError):
+        return None
+
+
+def _read_columns(view, stat):
+    magic, version, count, category_count, mtime_ns, size, names_size, crc = SNAPSHOT_HEADER.unpack_from(view)
+    if (magic, version) != (SNAPSHOT_MAGIC, SNAPSHOT_VERSION) or (mtime_ns, size) != (stat.st_mtime_ns, stat.st_size):
+        return None
+    # Sub-views must be released before the mmap can close, hence the with.
+    with view[SNAPSHOT_HEADER.size:] as payload:
+        if zlib.crc32(payload) != crc:
+            return None
+        columns = []
+        offset = 0
+        for typecode in "dqqi":
+            column = array(typecode)
+            end = offset + column.itemsize * count
+            if end > len(payload):
+                return None
+            column.frombytes(payload[offset:end])
+            columns.append(_little_endian(column))
+            offset = end
+        names_blob = bytes(payload[offset:offset + names_size])
+        categories_blob = bytes(payload[offset + names_size:])
+    names = names_blob.decode("utf-8").split("\0") if count else []
+    categories = categories_blob.decode("utf-8").split("\0") if category_count else []
+    if len(names) != count or len(categories) != category_count:
+        return None
+    return (names, *columns, categories)
+
+
+def snapshot_rows(columns):
+    """Yield read_binary_snapshot columns as parsed inventory rows."""
+    names, prices, quantities, maxes, codes, categories = columns
+    for name, price, quantity, max_stock, code in zip(names, prices, quantities, maxes, codes):
+        yield {"name": name, "price": price, "quantity": quantity, "max": max_stock, "category": categories[code]}
+
+# =============================================================================
+# Sale Times: Real Clock Readings, Stepping Back a Bounded Amount
+# =============================================================================
+def shift_timestamp(timestamp, delta):
+    """A TIMESTAMP_FORMAT string ``delta`` from a timestamp or a prefix of one (read as its earliest time).
+
+    Returns None if the result is out of range or the text is not a timestamp.
+    """
+    try:
+        moment = datetime.datetime.strptime(timestamp + "0001-01-01 00:00:00"[len(timestamp):], TIMESTAMP_FORMAT)
+        return (moment + delta).strftime(TIMESTAMP_FORMAT)
+    except (ValueError, OverflowError):
+        return None
+
+
+_clamped_after = None  # the latest sale time bounded_sale_time last warned about
+
+
+def bounded_sale_time(timestamp, latest):
+    """The time to store for a sale at ``timestamp`` after stored sales up to ``latest``.
+
+    The real time is kept unless the clock has gone back more than
+    CLOCK_STEP_BACK; then it is moved up to that bound and logged.  Every
+    stored time is therefore within CLOCK_STEP_BACK of the latest one
+    before it, which is all the time-range searches over sale lines need.
+    """
+    global _clamped_after
+    floor = shift_timestamp(latest, -CLOCK_STEP_BACK) if latest else None
+    if floor is not None and timestamp < floor:
+        if latest != _clamped_after:  # once per step back, not for every sale until the clock catches up
+            _clamped_after = latest
+            logger.warning("Sale time %s is more than %s before the latest sale at %s; recording sales at %s "
+                           "until the clock catches up", timestamp, CLOCK_STEP_BACK, latest, floor)
+        return floor
+    return timestamp
+
+# =============================================================================
+# Transaction Log: Fixed-Width Records in a Memory-Mapped File
+# =============================================================================
+TRANSACTION_LOG_MAGIC = b"CMTXLOG\n"
+TRANSACTION_LOG_VERSION = 2
+TRANSACTION_LOG_HEADER = struct.Struct("<8sIIQQ")  # magic, version, record size, count, mark
+# id, seconds since 1970-01-01, then in cents: sale, profit, tendered, change,
+# and the running sale and profit totals up to and including this record,
+# then the latest seconds of any record up to and including this one.
+TRANSACTION_RECORD = struct.Struct("<9q")
+_EPOCH = datetime.datetime(1970, 1, 1)
+_SECOND = datetime.timedelta(seconds=1)
+
+
+def timestamp_seconds(timestamp):
+    """Seconds since 1970-01-01 of a datetime or an ISO date/TIMESTAMP_FORMAT string, as the log stores them."""
+    if not isinstance(timestamp, datetime.datetime):
+        timestamp = datetime.datetime.fromisoformat(timestamp)
+    return (timestamp - _EPOCH) // _SECOND
+
+
+class TransactionLog(Sequence):
+    """The transaction history as fixed-width binary records in a memory-mapped file.
+
+    Record i sits at ``TRANSACTION_LOG_HEADER.size + i * TRANSACTION_RECORD.size``,
+    so indexing is offset arithmetic on the mapping: nothing but the page
+    cache grows with the history.  Items are TRANSACTION_FIELDS dicts built
+    on access, with the money rounded to cents; the backend's own journal
+    stays the exact record.
+
+    Each record also carries the running sale and profit totals, so
+    ``totals`` over any index range is two reads, and the latest time so
+    far, which never decreases even if the clock stepped back between
+    sales, so ``bisect_date`` finds a date by binary search.
+
+    Records are appended past the end and then published by rewriting the
+    header's count, so a crash mid-append leaves the previous count in force.
+    ``mark`` is a number the owning backend stores with the count to know
+    how much of its journal the log mirrors.  Appends and reads may come
+    from different threads.
+    """
+
+    def __init__(self, path, sync=False):
+        self.path = path
+        self.sync = sync
+        self._lock = threading.Lock()
+        self._map = None
+        self._mapped = 0  # records covered by the current mapping
+        self._running = (0, 0, None)  # the last record's running sale, profit and latest seconds
+        try:
+            self._file = open(path, "r+b")
+        except FileNotFoundError:
+            self._file = open(path, "w+b")
+        header = self._file.read(TRANSACTION_LOG_HEADER.size)
+        if len(header) == TRANSACTION_LOG_HEADER.size:
+            magic, version, record_size, self._count, self.mark = TRANSACTION_LOG_HEADER.unpack(header)
+            size = os.fstat(self._file.fileno()).st_size
+            if ((magic, version, record_size) == (TRANSACTION_LOG_MAGIC, TRANSACTION_LOG_VERSION, TRANSACTION_RECORD.size)
+                    and TRANSACTION_LOG_HEADER.size + self._count * TRANSACTION_RECORD.size <= size):
+                if self._count:
+                    self._running = self.record(self._count - 1)[6:]
+                return
+        self.clear()
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self._count))]
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError("transaction index out of range")
+        id_, seconds, sale, profit, tendered, change, _, _, _ = self.record(index)
+        return {"id": id_, "date": (_EPOCH + datetime.timedelta(seconds=seconds)).strftime(TIMESTAMP_FORMAT),
+                "total_sale": sale / 100, "total_profit": profit / 100, "tendered": tendered / 100,
+                "change": change / 100}
+
+    def record(self, index):
+        """Record index as its raw integers (see TRANSACTION_RECORD)."""
+        with self._lock:
+            if index >= self._mapped:
+                self._remap()
+            return TRANSACTION_RECORD.unpack_from(self._map, TRANSACTION_LOG_HEADER.size
+                                                  + index * TRANSACTION_RECORD.size)
+
+    def _remap(self):
+        if self._map is not None:
+            self._map.close()
+        self._map = mmap.mmap(self._file.fileno(), TRANSACTION_LOG_HEADER.size + self._count * TRANSACTION_RECORD.size,
+                              access=mmap.ACCESS_READ)
+        self._mapped = self._count
+
+    def bisect_date(self, timestamp):
+        """Index of the first record whose latest time so far is at or after timestamp; len(self) if none.
+
+        With the clock never stepping back this is the first record at or
+        after timestamp (see timestamp_seconds).
+        """
+        seconds = timestamp_seconds(timestamp)
+        lo, hi = 0, self._count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.record(mid)[8] < seconds:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def totals(self, start, stop):
+        """(sale, profit) cents of records start <= i < stop, from the running totals."""
+        if stop <= start:
+            return 0, 0
+        sale, profit = self.record(stop - 1)[6:8]
+        if start:
+            before = self.record(start - 1)
+            sale, profit = sale - before[6], profit - before[7]
+        return sale, profit
+
+    def append(self, transactions, mark=None):
+        """Append TRANSACTION_FIELDS dicts (with ids) and publish them, together with a new mark."""
+        with self._lock:
+            running_sale, running_profit, latest = self._running
+            records = []
+            for transaction in transactions:
+                sale, profit = round(transaction["total_sale"] * 100), round(transaction["total_profit"] * 100)
+                seconds = timestamp_seconds(transaction["date"])
+                running_sale += sale
+                running_profit += profit
+                latest = seconds if latest is None else max(latest, seconds)
+                records.append(TRANSACTION_RECORD.pack(
+                    int(transaction["id"]), seconds, sale, profit,
+                    round(transaction["tendered"] * 100), round(transaction["change"] * 100),
+                    running_sale, running_profit, latest))
+            self._file.seek(TRANSACTION_LOG_HEADER.size + self._count * TRANSACTION_RECORD.size)
+            self._file.write(b"".join(records))
+            self._flush()
+            self._count += len(records)
+            self._running = (running_sale, running_profit, latest)
+            self.mark = self.mark if mark is None else mark
+            self._write_header()
+
+    def clear(self, mark=0):
+        with self._lock:
+            if self._map is not None:
+                self._map.close()
+                self._map = None
+            self._mapped = self._count = 0
+            self._running = (0, 0, None)
+            self.mark = mark
+            self._file.truncate(0)
+            self._write_header()
+
+    def _write_header(self):
+        self._file.seek(0)
+        self._file.write(TRANSACTION_LOG_HEADER.pack(TRANSACTION_LOG_MAGIC, TRANSACTION_LOG_VERSION,
+                                                     TRANSACTION_RECORD.size, self._count, self.mark))
+        self._flush()
+
+    def _flush(self):
+        self._file.flush()
+        if self.sync:
+            os.fsync(self._file.fileno())
+
+    def close(self):
+        with self._lock:
+            if self._map is not None:
+                self._map.close()
+                self._map = None
+            self._mapped = 0
+            self._file.close()
+
+# =============================================================================
+# Storage Backend Interface
+# =============================================================================
+class StorageBackend:
+    """Where InventoryManager and the transaction history are persisted.
+
+    Inventory mutations arrive as records: dicts with an ``op`` key ("upsert",
+    "sell", "restock" or "delete") plus the product's resulting fields.
+    Transactions are TRANSACTION_FIELDS dicts whose ``date`` is a full
+    TIMESTAMP_FORMAT timestamp; the backend assigns their ``id`` and stores
+    the sold lines listed under their ``lines`` key as SALE_FIELDS rows,
+    setting each line's ``transaction_id``.
+    Sales summary changes arrive as delta rows (SUMMARY_FIELDS) to be added
+    to the stored rollup with the same scope and key.
+    """
+
+    def load_items(self):
+        """Yield every stored product as a parsed item dict, streaming where possible."""
+        raise NotImplementedError
+
+    def commit(self, records, items, transactions=(), summary=()):
+        """Persist inventory records, new transactions and summary deltas as one unit of work.
+
+        ``items`` is the manager's current product view, for backends that
+        periodically rewrite a full snapshot; it is None while the catalog is
+        still loading, when no complete snapshot can be taken.  A commit
+        that raised may be retried with the same transaction dicts; whatever
+        part of it was stored must not be stored twice.
+        """
+        raise NotImplementedError
+
+    def compaction_due(self, logged, item_count):
+        """Whether a snapshot should replace ``logged`` records for a catalog of ``item_count``."""
+        return False
+
+    def flush(self):
+        """Block until every accepted commit is on disk."""
+
+    def ticket(self):
+        """A token for every write accepted so far, to pass to ``status``."""
+        return None
+
+    def status(self, ticket):
+        """"stored", "failed" (to be retried) or "pending" for the writes up to ``ticket``.
+
+        Backends that write before commit returns have always stored them.
+        """
+        return "stored"
+
+    def save_items(self, items):
+        """Replace the stored catalog with ``items``."""
+        raise NotImplementedError
+
+    def load_transactions(self):
+        """Yield every stored transaction as a parsed dict."""
+        raise NotImplementedError
+
+    def transaction_log(self):
+        """The stored transactions as a random-access TransactionLog kept current by commits, or None."""
+        return None
+
+    def clear_transactions(self):
+        """Drop the transaction history, its sale lines and the sales summary built from them."""
+        raise NotImplementedError
+
+    def query_sales(self, start=None, end=None, name=None):
+        """Yield sale lines with start <= timestamp < end, optionally for one product.
+
+        Bounds are timestamp strings; a prefix such as "2024-05-01" works too.
+        """
+        raise NotImplementedError
+
+    def sale_time(self, timestamp):
+        """The timestamp to record for a sale made at ``timestamp``; called once per sale, in commit order.
+
+        Backends that binary-search their sale lines by time may move it
+        forward (see bounded_sale_time).
+        """
+        return timestamp
+
+    def latest_sale_time(self):
+        """The latest stored sale time ("" if none) where sale_time bounds times by it; otherwise None."""
+        return None
+
+    def load_summary(self):
+        """Return the stored sales summary as a list of rows, one per scope and key."""
+        raise NotImplementedError
+
+    def save_summary(self, rows):
+        """Replace the stored sales summary with ``rows``."""
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+# =============================================================================
+# CSV Backend: Snapshot + Write-Ahead Log, Append-Only Transaction Journal
+# =============================================================================
+class CSVBackend(StorageBackend):
+    """The original file layout: ``inventory.csv`` and ``transactions.csv``.
+
+    Every inventory mutation appends one record to ``log_file``; ``save_items``
+    folds the log into a fresh snapshot.  Compaction runs automatically once
+    the log holds more records than the catalog (or ``compact_threshold``),
+    which keeps the amortised write cost per mutation constant.
+
+    Sold lines go to ``sales.csv``, one row per line keyed by transaction
+    id, with the real time of the sale.  ``sale_time`` keeps every row
+    within CLOCK_STEP_BACK of the latest one before it, so time-range
+    queries binary-search the file by byte offset for the range widened by
+    that bound and only scan its edges, instead of reading the whole file.
+
+    The sales summary uses the same layout: ``sales_summary.csv`` plus a
+    ``sales_summary.log`` of delta rows.  Deltas are not idempotent, so each
+    log starts with a generation row and the snapshot records the last
+    generation it folded in; a log the snapshot already contains is skipped.
+
+    ``transaction_log()`` mirrors ``transactions.csv`` in ``transactions.bin``
+    (a TransactionLog); once opened, every checkout is appended to both.
+
+    Next to the CSV snapshot sits ``snapshot_file``, the same rows in a
+    fixed binary layout (see read_binary_snapshot) that loads without any
+    text parsing.  It is rewritten with every CSV snapshot and after a
+    load that had to parse the CSV, and only used while it matches the
+    CSV's mtime and size; the log is replayed on top either way.
+
+    Snapshots are always written to a temp file and renamed into place.
+    ``durability="fsync"`` also fsyncs every append before commit returns
+    (and snapshots before and after the rename); "none" leaves flushing to
+    the OS.  For group commit, wrap an fsync backend in a BackgroundWriter.
+    """
+
+    def __init__(self, csv_file="inventory.csv", transactions_file=None,
+                 log_file=None, compact_threshold=1000, durability="none", snapshot_file=None):
+        if durability not in DURABILITY_LEVELS:
+            raise ValueError(f"durability must be one of {', '.join(DURABILITY_LEVELS)}")
+        self.csv_file = csv_file
+        self.sync = durability == "fsync"
+        self.transactions_file = transactions_file or os.path.join(os.path.dirname(csv_file), "transactions.csv")
+        base = os.path.dirname(self.transactions_file)
+        self.sales_file = os.path.join(base, "sales.csv")
+        self.summary_file = os.path.join(base, "sales_summary.csv")
+        self.summary_log_file = os.path.join(base, "sales_summary.log")
+        self.transaction_log_file = os.path.join(base, "transactions.bin")
+        self._transaction_log = None
+        self._transaction_log_behind = False
+        self._summary_log_checked = False
+        self._next_transaction_id = None
+        self._stored_transaction_id = 0  # last id in transactions.csv
+        self._stored_sale_id = 0         # last transaction id with lines in sales.csv
+        self._stored_sale_lines = 0      # how many of that transaction's lines are there
+        self._latest_sale_time = None
+        self.log_file = log_file or os.path.splitext(csv_file)[0] + ".log"
+        self.snapshot_file = snapshot_file or os.path.splitext(csv_file)[0] + ".bin"
+        self.compact_threshold = compact_threshold
+        self._log_records = 0
+
+    def load_items(self):
+        # The log is bounded by compaction, so it is read up front into each
+        # product's final state; the snapshot is then streamed row by row with
+        # those states substituted.  Records carry the full resulting row rather
+        # than a delta, so a log already folded into the snapshot is harmless.
+        latest = {}  # name -> final row, or None if deleted
+        self._log_records = 0
+        try:
+            with open_journal(self.log_file) as log:
+                for record in csv.DictReader(log):
+                    op = record.pop("op")
+                    latest[record["name"]] = None if op == "delete" else parse_inventory_row(record)
+                    self._log_records += 1
+        except FileNotFoundError:
+            pass
+        columns = read_binary_snapshot(self.snapshot_file, self.csv_file)
+        rows = snapshot_rows(columns) if columns is not None else self._parse_snapshot()
+        for row in rows:
+            if row["name"] in latest:
+                row = latest.pop(row["name"])
+                if row is None:
+                    continue
+            yield row
+        for row in latest.values():
+            if row is not None:
+                yield row
+
+    def _parse_snapshot(self):
+        """Yield the parsed rows of the CSV snapshot, then cache them as a binary snapshot."""
+        columns = SnapshotColumns()
+        try:
+            stat = os.stat(self.csv_file)
+            with open(self.csv_file, "r", newline="", encoding="utf-8") as csvfile:
+                for row in csv.DictReader(csvfile):
+                    row = parse_inventory_row(row)
+                    columns.add(row)
+                    yield row
+        except FileNotFoundError:
+            return
+        try:
+            current = os.stat(self.csv_file)
+            if (current.st_mtime_ns, current.st_size) == (stat.st_mtime_ns, stat.st_size):
+                columns.write(self.snapshot_file, stat)
+        except OSError:
+            pass  # only a cache; the next load parses the CSV again
+
+    def commit(self, records, items, transactions=(), summary=()):
+        if records:
+            append_journal(self.log_file, INVENTORY_LOG_FIELDS, records, self.sync)
+            self._log_records += len(records)
+        if transactions:
+            self._append_transactions(transactions)
+        if summary:
+            self._append_summary(summary)
+        if items is not None and self.compaction_due(self._log_records, len(items)):
+            self.save_items(items)
+
+    def compaction_due(self, logged, item_count):
+        return logged > max(self.compact_threshold, item_count)
+
+    def save_items(self, items):
+        items = list(items)  # written twice
+        write_snapshot(self.csv_file, INVENTORY_FIELDS, items, self.sync)
+        try:
+            write_binary_snapshot(self.snapshot_file, items, self.csv_file, self.sync)
+        except OSError:
+            pass  # a stale binary snapshot no longer matches the CSV and is ignored
+        # A crash before this truncate only leaves records the snapshot
+        # already contains, which replay applies idempotently.
+        with open(self.log_file, "w", newline=""):
+            pass
+        self._log_records = 0
+
+    def sale_time(self, timestamp):
+        timestamp = bounded_sale_time(timestamp, self.latest_sale_time())
+        self._latest_sale_time = max(timestamp, self._latest_sale_time)
+        return timestamp
+
+    def latest_sale_time(self):
+        if self._latest_sale_time is None:
+            self._latest_sale_time = self._read_latest_sale_time()
+        return self._latest_sale_time
+
+    def _read_latest_sale_time(self):
+        """The latest timestamp in sales.csv, read from the tail.
+
+        No row is more than CLOCK_STEP_BACK behind the latest before it, so
+        the scan back stops at the first row that far behind the latest seen.
+        """
+        try:
+            end = repair_journal(self.sales_file)
+        except FileNotFoundError:
+            return ""
+        latest = floor = ""
+        with open(self.sales_file, "rb") as journal:
+            while end > 0:
+                start = _rfind_newline(journal, end - 1)
+                if start == 0:
+                    break  # the header
+                journal.seek(start)
+                stamp = journal.read(19).decode("utf-8")  # TIMESTAMP_FORMAT is fixed width
+                if stamp > latest:
+                    latest = stamp
+                    floor = shift_timestamp(latest, -CLOCK_STEP_BACK) or ""
+                elif stamp <= floor:
+                    break
+                end = start
+        return latest
+
+    def _append_transactions(self, transactions):
+        if self._next_transaction_id is None:
+            self._upgrade_transactions()
+            last = last_journal_row(self.transactions_file, TRANSACTION_FIELDS)
+            self._stored_transaction_id = int(last["id"]) if last else 0
+            tail = journal_tail(self.sales_file, SALE_FIELDS)
+            last = next(tail, None)
+            self._stored_sale_id = int(last["transaction_id"] or 0) if last else 0
+            # A torn append may have stored only the first few lines of it.
+            self._stored_sale_lines = 1 + sum(1 for _ in itertools.takewhile(
+                lambda line: line["transaction_id"] == last["transaction_id"], tail)) if last else 0
+            tail.close()
+            # Past orphaned lines too, so a new transaction never claims them.
+            self._next_transaction_id = max(self._stored_transaction_id, self._stored_sale_id) + 1
+        for transaction in transactions:
+            # A transaction keeps the id of an earlier failed attempt, so a
+            # retry skips whatever part of it already reached the files.
+            if transaction.get("id") is None:
+                transaction["id"] = self._next_transaction_id
+                # The date came from sale_time; only track the latest here.
+                if self._latest_sale_time is not None:
+                    self._latest_sale_time = max(transaction["date"], self._latest_sale_time)
+                for line in transaction.get("lines", ()):
+                    line["timestamp"] = transaction["date"]
+                    line["transaction_id"] = transaction["id"]
+            self._next_transaction_id = max(self._next_transaction_id, transaction["id"] + 1)
+        sales = []
+        stored = self._stored_sale_id, self._stored_sale_lines
+        for transaction in transactions:
+            if transaction["id"] < self._stored_sale_id:
+                continue
+            lines = transaction.get("lines", ())
+            skip = self._stored_sale_lines if transaction["id"] == self._stored_sale_id else 0
+            if len(lines) > skip:
+                sales.extend(lines[skip:])
+                stored = transaction["id"], len(lines)
+        transactions = [transaction for transaction in transactions if transaction["id"] > self._stored_transaction_id]
+        try:
+            # Lines first: a crash between the two appends leaves lines whose
+            # transaction is missing, never a transaction missing its lines.
+            if sales:
+                append_journal(self.sales_file, SALE_FIELDS, sales, self.sync)
+                self._stored_sale_id, self._stored_sale_lines = stored
+            if transactions:
+                append_journal(self.transactions_file, TRANSACTION_FIELDS, transactions, self.sync)
+                self._stored_transaction_id = transactions[-1]["id"]
+        except OSError:
+            self._next_transaction_id = None  # re-read what reached the journals before the retry
+            raise
+        if transactions and self._transaction_log is not None and not self._transaction_log_behind:
+            try:
+                self._transaction_log.append(transactions, mark=os.path.getsize(self.transactions_file))
+            except OSError:
+                self._transaction_log_behind = True  # the next transaction_log() catches up from the journal
+
+    def _upgrade_transactions(self):
+        """Number the rows of a transactions.csv written before transactions had ids."""
+        try:
+            with open(self.transactions_file, "r", newline="", encoding="utf-8") as csvfile:
+                header = next(csv.reader(csvfile), None)
+                if header is None or "id" in header:
+                    return
+                rows = list(csv.DictReader(csvfile, fieldnames=header))
+        except FileNotFoundError:
+            return
+        for number, row in enumerate(rows, 1):
+            row["id"] = number
+        write_snapshot(self.transactions_file, TRANSACTION_FIELDS, rows, self.sync)
+
+    def load_transactions(self):
+        self._upgrade_transactions()
+        try:
+            journal = open_journal(self.transactions_file)
+        except FileNotFoundError:
+            return
+        with journal:
+            for row in csv.DictReader(journal):
+                yield parse_transaction_row(row)
+
+    def transaction_log(self):
+        # transactions.bin mirrors transactions.csv up to byte ``mark``; rows
+        # appended while it was closed are parsed from there on open.
+        if self._transaction_log is None:
+            self._upgrade_transactions()
+            self._transaction_log = TransactionLog(self.transaction_log_file, self.sync)
+        log = self._transaction_log
+        try:
+            size = repair_journal(self.transactions_file)
+        except FileNotFoundError:
+            size = 0
+        if log.mark > size:
+            log.clear()  # the journal was replaced
+        if log.mark < size:
+            self._catch_up(log, size)
+            last = last_journal_row(self.transactions_file, TRANSACTION_FIELDS)
+            if last is not None and (not len(log) or log.record(len(log) - 1)[0] != int(last["id"])):
+                log.clear()
+                self._catch_up(log, size)
+        self._transaction_log_behind = False
+        return log
+
+    def _catch_up(self, log, size):
+        """Append the journal rows from byte ``log.mark`` up to ``size`` (a line boundary) to the log."""
+        with open(self.transactions_file, "rb") as journal:
+            fieldnames = next(csv.reader([journal.readline().decode("utf-8")]), [])
+            journal.seek(max(log.mark, journal.tell()))
+            text = io.TextIOWrapper(journal, encoding="utf-8", newline="")
+            rows = (parse_transaction_row(row) for row in csv.DictReader(text, fieldnames=fieldnames))
+            for batch in iter(lambda: list(itertools.islice(rows, 10000)), []):
+                log.append(batch)
+        log.append((), mark=size)
+
+    def query_sales(self, start=None, end=None, name=None):
+        try:
+            size = repair_journal(self.sales_file)
+        except FileNotFoundError:
+            return
+        with open(self.sales_file, "rb") as journal:
+            journal.readline()
+            # Rows may be up to CLOCK_STEP_BACK behind earlier ones: seek to
+            # that much before start and read on until that much past end.
+            scan_start = shift_timestamp(start, -CLOCK_STEP_BACK) if start else None
+            scan_end = shift_timestamp(end, CLOCK_STEP_BACK) if end else None
+            offset = journal.tell()
+            if scan_start is not None:
+                offset = self._seek_time(journal, offset, size, scan_start.encode())
+            journal.seek(offset)
+            start = start.encode() if start else None
+            end = end.encode() if end else None
+            scan_end = scan_end.encode() if scan_end else None
+            for line in journal:
+                # Lines start with their timestamp.
+                if scan_end is not None and line >= scan_end:
+                    break
+                if (start is not None and line < start) or (end is not None and line >= end):
+                    continue
+                row = dict(zip(SALE_FIELDS, next(csv.reader([line.decode("utf-8")]))))
+                if name is None or row["name"] == name:
+                    yield parse_sale_row(row)
+
+    @staticmethod
+    def _seek_time(journal, lo, hi, start):
+        """Offset of the first line at or after ``lo`` whose timestamp is >= start.
+
+        ``lo`` only ever advances past lines known to be earlier than start,
+        so it stays a line boundary; the final forward scan is a line or two.
+        """
+        while lo < hi:
+            mid = (lo + hi) // 2
+            journal.seek(mid)
+            journal.readline()  # finish the line mid falls in
+            line = journal.readline()
+            if line and line < start:
+                lo = journal.tell()
+            else:
+                hi = mid
+        journal.seek(lo)
+        for line in journal:
+            if line >= start:
+                break
+            lo += len(line)
+        return lo
+
+    def clear_transactions(self):
+        # Archive the current journals and start empty ones instead of rewriting them.
+        stamp = datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
+        for path in (self.transactions_file, self.sales_file):
+            if os.path.exists(path):
+                base, ext = os.path.splitext(path)
+                os.replace(path, f"{base}-{stamp}{ext}")
+        write_snapshot(self.transactions_file, TRANSACTION_FIELDS, [], self.sync)
+        if self._transaction_log is not None:
+            self._transaction_log.clear(mark=os.path.getsize(self.transactions_file))
+        elif os.path.exists(self.transaction_log_file):
+            os.remove(self.transaction_log_file)
+        self._next_transaction_id = None
+        self._latest_sale_time = None
+        self.save_summary([])
+
+    @staticmethod
+    def _generation(path):
+        """The generation row at the head of a summary snapshot or log (0 if absent)."""
+        try:
+            with open(path, "r", newline="", encoding="utf-8") as csvfile:
+                for row in csv.DictReader(csvfile):
+                    return int(row["count"]) if row["scope"] == "generation" else 0
+        except FileNotFoundError:
+            pass
+        return 0
+
+    def load_summary(self):
+        rows, _ = self._read_summary()
+        return rows
+
+    def _read_summary(self):
+        generation = 0
+        totals = {}
+        try:
+            with open(self.summary_file, "r", newline="", encoding="utf-8") as csvfile:
+                for row in csv.DictReader(csvfile):
+                    if row["scope"] == "generation":
+                        generation = int(row["count"])
+                    else:
+                        totals[row["scope"], row["key"]] = parse_summary_row(row)
+        except FileNotFoundError:
+            pass
+        try:
+            with open_journal(self.summary_log_file) as log:
+                rows = csv.DictReader(log)
+                head = next(rows, None)
+                if head is not None and head["scope"] == "generation" and int(head["count"]) > generation:
+                    generation = int(head["count"])
+                    fold_summary(map(parse_summary_row, rows), totals)
+        except FileNotFoundError:
+            pass
+        return list(totals.values()), generation
+
+    def _append_summary(self, rows):
+        if not self._summary_log_checked:
+            # A log left behind by a crash mid-compaction is already in the
+            # snapshot; appending to it would hide the new rows on reload.
+            if self._generation(self.summary_log_file) <= self._generation(self.summary_file):
+                self._remove_summary_log()
+            self._summary_log_checked = True
+        try:
+            log_size = os.path.getsize(self.summary_log_file)
+        except FileNotFoundError:
+            log_size = 0
+        if log_size == 0:
+            head = {"scope": "generation", "key": "", "count": self._generation(self.summary_file) + 1,
+                    "sales": 0, "profit": 0}
+            rows = [head] + list(rows)
+        append_journal(self.summary_log_file, SUMMARY_FIELDS, rows, self.sync)
+        try:
+            snapshot_size = os.path.getsize(self.summary_file)
+        except FileNotFoundError:
+            snapshot_size = 0
+        # Fold the log in once it outgrows the snapshot; like the inventory log,
+        # that keeps the amortised cost per checkout constant.
+        if log_size > max(64 * 1024, snapshot_size):
+            try:
+                self._write_summary(*self._read_summary())
+            except OSError:
+                pass  # the rows are in the log; a failure here must not make the caller retry them
+
+    def save_summary(self, rows):
+        self._write_summary(rows, self._read_summary()[1])
+
+    def _write_summary(self, rows, generation):
+        head = {"scope": "generation", "key": "", "count": generation, "sales": 0, "profit": 0}
+        write_snapshot(self.summary_file, SUMMARY_FIELDS, itertools.chain([head], rows), self.sync)
+        # A crash before this removal leaves a log whose generation the
+        # snapshot already records, so it is skipped on the next load.
+        self._remove_summary_log()
+        self._summary_log_checked = True
+
+    def _remove_summary_log(self):
+        try:
+            os.remove(self.summary_log_file)
+        except FileNotFoundError:
+            pass
+
+    def close(self):
+        if self._transaction_log is not None:
+            self._transaction_log.close()
+            self._transaction_log = None
+
+# =============================================================================
+# SQLite Backend: Indexed Tables With Per-Row Updates
+# =============================================================================
+_SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS items (
+    name TEXT PRIMARY KEY,
+    price REAL NOT NULL,
+    quantity INTEGER NOT NULL,
+    max INTEGER NOT NULL,
+    category TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS items_name_nocase ON items (name COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS items_category ON items (category);
+CREATE TABLE IF NOT EXISTS sales_summary (
+    scope TEXT NOT NULL,
+    key TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    sales REAL NOT NULL,
+    profit REAL NOT NULL,
+    PRIMARY KEY (scope, key)
+);
+CREATE TABLE IF NOT EXISTS sales (
+    id INTEGER PRIMARY KEY,
+    timestamp TEXT NOT NULL,
+    transaction_id INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    category TEXT NOT NULL,
+    quantity INTEGER NOT NULL,
+    cost REAL NOT NULL,
+    selling_price REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS sales_timestamp ON sales (timestamp);
+CREATE INDEX IF NOT EXISTS sales_name_timestamp ON sales (name, timestamp);
+CREATE TABLE IF NOT EXISTS transactions (
+    id INTEGER PRIMARY KEY,
+    date TEXT NOT NULL,
+    total_sale REAL NOT NULL,
+    total_profit REAL NOT NULL,
+    tendered REAL NOT NULL,
+    "change" REAL NOT NULL
+);
+"""
+
+# Fixed statement texts: sqlite3 prepares each once and reuses it from its
+# statement cache on every subsequent execute.
+_UPSERT_ITEM = """
+INSERT INTO items (name, price, quantity, max, category)
+VALUES (:name, :price, :quantity, :max, :category)
+ON CONFLICT (name) DO UPDATE SET
+    price = excluded.price, quantity = excluded.quantity,
+    max = excluded.max, category = excluded.category
+"""
+_UPDATE_QUANTITY = "UPDATE items SET quantity = :quantity WHERE name = :name"
+_DELETE_ITEM = "DELETE FROM items WHERE name = :name"
+_ADD_SUMMARY = """
+INSERT INTO sales_summary (scope, key, count, sales, profit)
+VALUES (:scope, :key, :count, :sales, :profit)
+ON CONFLICT (scope, key) DO UPDATE SET
+    count = count + excluded.count, sales = sales + excluded.sales, profit = profit + excluded.profit
+"""
+_INSERT_TRANSACTION = """
+INSERT INTO transactions (date, total_sale, total_profit, tendered, "change")
+VALUES (:date, :total_sale, :total_profit, :tendered, :change)
+"""
+_INSERT_SALE = """
+INSERT INTO sales (timestamp, transaction_id, name, category, quantity, cost, selling_price)
+VALUES (:timestamp, :transaction_id, :name, :category, :quantity, :cost, :selling_price)
+"""
+_SELECT_SALES = "SELECT {} FROM sales WHERE timestamp >= :start AND timestamp < :end ORDER BY timestamp, id".format(
+    ", ".join(SALE_FIELDS))
+_SELECT_PRODUCT_SALES = ("SELECT {} FROM sales WHERE name = :name AND timestamp >= :start AND timestamp < :end "
+                         "ORDER BY timestamp, id").format(", ".join(SALE_FIELDS))
+
+
+class SQLiteBackend(StorageBackend):
+    """Inventory and transactions in a single SQLite database in WAL mode.
+
+    ``durability="none"`` runs with synchronous=NORMAL (the WAL is fsynced at
+    checkpoints only; a power cut can lose the last commits but never
+    corrupts the database); "fsync" uses synchronous=FULL, one WAL fsync per
+    commit.
+
+    ``transaction_log()`` mirrors the transactions table in
+    ``<db name>-transactions.bin``, caught up by id when opened.
+    """
+
+    def __init__(self, db_file="clevermart.db", durability="none"):
+        if durability not in DURABILITY_LEVELS:
+            raise ValueError(f"durability must be one of {', '.join(DURABILITY_LEVELS)}")
+        self.db_file = db_file
+        self.sync = durability == "fsync"
+        self._transaction_log = None
+        self._transaction_log_behind = False
+        # Usable from a BackgroundWriter's thread; the writer serialises access.
+        self.conn = sqlite3.connect(db_file, isolation_level=None, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=FULL" if durability == "fsync" else "PRAGMA synchronous=NORMAL")
+        self.conn.executescript(_SQLITE_SCHEMA)
+
+    def load_items(self):
+        for row in self.conn.execute("SELECT name, price, quantity, max, category FROM items ORDER BY rowid"):
+            yield dict(row)
+
+    def commit(self, records, items, transactions=(), summary=()):
+        with self._transaction():
+            for record in records:
+                if record["op"] == "delete":
+                    self.conn.execute(_DELETE_ITEM, record)
+                elif record["op"] in ("sell", "restock"):
+                    self.conn.execute(_UPDATE_QUANTITY, record)
+                else:
+                    self.conn.execute(_UPSERT_ITEM, record)
+            for transaction in transactions:
+                transaction["id"] = self.conn.execute(_INSERT_TRANSACTION, transaction).lastrowid
+                lines = transaction.get("lines", ())
+                for line in lines:
+                    line["timestamp"] = transaction["date"]
+                    line["transaction_id"] = transaction["id"]
+                self.conn.executemany(_INSERT_SALE, lines)
+            if summary:
+                self.conn.executemany(_ADD_SUMMARY, summary)
+        if transactions and self._transaction_log is not None and not self._transaction_log_behind:
+            try:
+                self._transaction_log.append(transactions)
+            except OSError:
+                self._transaction_log_behind = True  # the next transaction_log() catches up by id
+
+    def save_items(self, items):
+        with self._transaction():
+            self.conn.execute("DELETE FROM items")
+            # sqlite3 only binds named parameters from real dicts, not other mappings.
+            self.conn.executemany(_UPSERT_ITEM, map(dict, items))
+
+    def load_transactions(self):
+        rows = self.conn.execute(
+            'SELECT id, date, total_sale, total_profit, tendered, "change" FROM transactions ORDER BY id')
+        for row in rows:
+            yield dict(row)
+
+    def transaction_log(self):
+        if self.db_file == ":memory:":
+            return None
+        if self._transaction_log is None:
+            self._transaction_log = TransactionLog(self._transaction_log_file(), self.sync)
+        log = self._transaction_log
+        last = log.record(len(log) - 1)[0] if len(log) else 0
+        if last > (self.conn.execute("SELECT max(id) FROM transactions").fetchone()[0] or 0):
+            log.clear()  # the table was cleared without the log
+            last = 0
+        rows = self.conn.execute('SELECT id, date, total_sale, total_profit, tendered, "change" FROM transactions '
+                                 'WHERE id > ? ORDER BY id', (last,))
+        for batch in iter(lambda: rows.fetchmany(10000), []):
+            log.append(batch)
+        self._transaction_log_behind = False
+        return log
+
+    def _transaction_log_file(self):
+        return os.path.splitext(self.db_file)[0] + "-transactions.bin"
+
+    def clear_transactions(self):
+        with self._transaction():
+            self.conn.execute("DELETE FROM transactions")
+            self.conn.execute("DELETE FROM sales")
+            self.conn.execute("DELETE FROM sales_summary")
+        if self._transaction_log is not None:
+            self._transaction_log.clear()
+        elif self.db_file != ":memory:" and os.path.exists(self._transaction_log_file()):
+            os.remove(self._transaction_log_file())
+
+    def query_sales(self, start=None, end=None, name=None):
+        # Both statements are range scans on an index: (timestamp) or (name, timestamp).
+        params = {"start": start or "", "end": end or "\uffff", "name": name}
+        for row in self.conn.execute(_SELECT_PRODUCT_SALES if name is not None else _SELECT_SALES, params):
+            yield dict(row)
+
+    def load_summary(self):
+        return [dict(row) for row in self.conn.execute("SELECT scope, key, count, sales, profit FROM sales_summary")]
+
+    def save_summary(self, rows):
+        with self._transaction():
+            self.conn.execute("DELETE FROM sales_summary")
+            self.conn.executemany(_ADD_SUMMARY, rows)
+
+    def close(self):
+        if self._transaction_log is not None:
+            self._transaction_log.close()
+            self._transaction_log = None
+        self.conn.close()
+
+    def _transaction(self):
+        return _SQLiteTransaction(self.conn)
+
+
+class _SQLiteTransaction:
+    """BEGIN/COMMIT around a block; ROLLBACK if it raises."""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        self.conn.execute("BEGIN IMMEDIATE")
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        self.conn.execute("ROLLBACK" if exc_type else "COMMIT")
+        return False
+
+
+# =============================================================================
+# Background Writer: Commits Persisted Off the Caller's Thread
+# =============================================================================
+class BackgroundWriter(StorageBackend):
+    """Wraps a backend so commits return at once and a worker thread writes them.
+
+    Whatever has queued up while the worker was busy is coalesced into one
+    commit: each product's records collapse to its final state, summary
+    deltas are summed, and transactions are kept in order.  Snapshots are
+    taken from copies of the items on the caller's thread, so the worker
+    never reads live objects.
+
+    Group commit: with ``group_ms`` set, the worker holds a batch open for
+    up to that long (or until ``group_records`` records and transactions
+    have arrived) before writing it, so over a durable backend every commit
+    in the window shares one fsync per file.
+
+    A failed write is kept and retried with the next batch (from the first
+    job not yet stored), and each failure is passed to ``on_error(exc)`` on
+    the worker thread (the Tk app forwards it with root.after).  Reads,
+    ``flush`` and ``close`` wait for the queue to drain first.
+
+    Jobs are numbered as they are queued: ``ticket()`` is the number of the
+    last one, and ``status(ticket)`` tells, without waiting, whether every
+    job up to it is stored.  The Tk app polls it to confirm a sale.
+    """
+
+    def __init__(self, backend, on_error=None, group_ms=0, group_records=None):
+        self.backend = backend
+        self.on_error = on_error
+        self.group_ms = group_ms
+        self.group_records = group_records
+        self.error = None  # the last write failure, until a write succeeds
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()  # held by whichever thread is using the backend
+        self._failed = []
+        self._queued = 0  # jobs queued, numbered from 1
+        self._tried = 0   # jobs the worker has attempted to write
+        self._stored = 0  # jobs stored; those between it and _tried failed
+        self._logged = 0  # records queued since the last snapshot
+        self._latest_sale_time = None
+        self._latest_known = False  # whether the backend has been asked for its latest sale time
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="clevermart-writer", daemon=True)
+        self._thread.start()
+
+    # ------------------------------------------------------------------------------
+    # Writes: Queued on the Caller's Thread
+    # ------------------------------------------------------------------------------
+    def commit(self, records, items, transactions=(), summary=()):
+        snapshot = None
+        self._logged += len(records)
+        if items is not None and self.backend.compaction_due(self._logged, len(items)):
+            snapshot = [item.copy() for item in items]
+            self._logged = 0
+        self._queued += 1
+        self._queue.put((records, transactions, summary, snapshot))
+
+    def save_items(self, items):
+        self._logged = 0
+        self._queued += 1
+        self._queue.put(((), (), (), [item.copy() for item in items]))
+
+    def ticket(self):
+        return self._queued
+
+    def status(self, ticket):
+        if ticket <= self._stored:
+            return "stored"
+        return "failed" if ticket <= self._tried else "pending"
+
+    def sale_time(self, timestamp):
+        # Every sale passes through here before its commit is queued, so the
+        # latest time can be kept locally once the backend has supplied its own.
+        latest = self.latest_sale_time()
+        if latest is None:
+            return timestamp
+        timestamp = bounded_sale_time(timestamp, latest)
+        self._latest_sale_time = max(timestamp, latest)
+        return timestamp
+
+    def latest_sale_time(self):
+        if not self._latest_known:
+            with self._lock:
+                self._latest_sale_time = self.backend.latest_sale_time()
+            self._latest_known = True
+        return self._latest_sale_time
+
+    def flush(self):
+        """Wait for the queue to drain; raises the last failure if the final write failed."""
+        self._queue.join()
+        if self.error is not None:
+            raise self.error
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._thread.join()
+        with self._lock:
+            self.backend.close()
+        if self.error is not None:
+            raise self.error
+
+    # ------------------------------------------------------------------------------
+    # Reads and Rare Operations: Run After the Queue Drains
+    # ------------------------------------------------------------------------------
+    def _drained(self):
+        self._queue.join()
+        return self._lock
+
+    def load_items(self):
+        # Streamed with the lock taken per row, so the worker can keep writing
+        # between rows of a long load.
+        self._queue.join()
+        self._logged = 0
+        rows = self.backend.load_items()
+        while True:
+            with self._lock:
+                row = next(rows, None)
+            if row is None:
+                return
+            yield row
+
+    def load_transactions(self):
+        with self._drained():
+            return list(self.backend.load_transactions())
+
+    def transaction_log(self):
+        with self._drained():
+            return self.backend.transaction_log()
+
+    def query_sales(self, start=None, end=None, name=None):
+        with self._drained():
+            return list(self.backend.query_sales(start, end, name))
+
+    def load_summary(self):
+        with self._drained():
+            return self.backend.load_summary()
+
+    def save_summary(self, rows):
+        with self._drained():
+            self.backend.save_summary(rows)
+
+    def clear_transactions(self):
+        with self._drained():
+            self.backend.clear_transactions()
+            self._latest_known = False
+
+    def compaction_due(self, logged, item_count):
+        return self.backend.compaction_due(logged, item_count)
+
+    # ------------------------------------------------------------------------------
+    # Worker Thread
+    # ------------------------------------------------------------------------------
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.group_ms / 1000
+            size = self._job_size(batch[0])
+            while batch[-1] is not None and (self.group_records is None or size < self.group_records):
+                try:
+                    batch.append(self._queue.get(timeout=max(0, deadline - time.monotonic()))
+                                 if self.group_ms else self._queue.get_nowait())
+                except queue.Empty:
+                    break
+                size += self._job_size(batch[-1])
+            jobs = [job for job in batch if job is not None]
+            if jobs or self._failed:
+                self._write(jobs)
+            for _ in batch:
+                self._queue.task_done()
+            if None in batch:
+                return
+
+    @staticmethod
+    def _job_size(job):
+        return 0 if job is None else len(job[0]) + len(job[1])
+
+    def _write(self, jobs):
+        first = self._tried - len(self._failed)  # jobs queued before jobs[0]
+        jobs = self._failed + jobs
+        metrics.count("storage_jobs", len(jobs))
+        try:
+            with self._lock, metrics.timer("storage_write"):
+                # Snapshots split the batch: records before one are folded into
+                # it, records after it go to the fresh log.
+                start = 0
+                for end, job in enumerate(jobs):
+                    if job[3] is not None:
+                        self._commit(jobs[start:end + 1])
+                        self._stored = max(self._stored, first + end + 1)
+                        # Committed: only the snapshot is left to retry.
+                        jobs[end] = ((), (), (), job[3])
+                        start = end
+                        self.backend.save_items(job[3])
+                        start = end + 1
+                self._commit(jobs[start:])
+        except Exception as e:
+            # Jobs before ``start`` are stored; the backend's commit skips
+            # transactions a failed commit already stored.
+            self._failed = jobs[start:]
+            self._tried = first + len(jobs)
+            self.error = e
+            if self.on_error is not None:
+                self.on_error(e)
+        else:
+            self._failed = []
+            self._stored = self._tried = first + len(jobs)
+            self.error = None
+
+    def _commit(self, jobs):
+        latest = {}
+        transactions = []
+        summary = []
+        for records, job_transactions, job_summary, _ in jobs:
+            for record in records:
+                # Records carry full rows, so a product's last record is its
+                # state; it becomes an upsert unless the product was deleted.
+                previous = latest.pop(record["name"], None)
+                if previous is not None and record["op"] != "delete":
+                    record = dict(record, op="upsert")
+                latest[record["name"]] = record
+            transactions.extend(job_transactions)
+            summary.extend(job_summary)
+        if latest or transactions or summary:
+            self.backend.commit(list(latest.values()), None, transactions, list(fold_summary(summary).values()))
+
+# =============================================================================
+# Migration: CSV Files -> SQLite
+# =============================================================================
+def migrate_csv_to_sqlite(db_file, inventory_file="inventory.csv", transactions_file="transactions.csv"):
+    source = CSVBackend(inventory_file, transactions_file)
+    target = SQLiteBackend(db_file)
+    try:
+        items = list(source.load_items())
+        transactions = list(source.load_transactions())
+        target.save_items(items)
+        summary = source.load_summary()
+        if not summary and transactions:
+            # CSV files from before the summary existed: build it rather than copy nothing.
+            from clevermart_core import SalesSummary  # clevermart_core imports this module
+            summary = SalesSummary.rebuild(transactions, source.query_sales()).rows()
+        target.save_summary(summary)
+        with target._transaction():
+            target.conn.execute("DELETE FROM transactions")
+            target.conn.execute("DELETE FROM sales")
+            # Keep the CSV ids so the migrated sale lines still point at their transactions.
+            target.conn.executemany('INSERT INTO transactions (id, date, total_sale, total_profit, tendered, "change") '
+                                    "VALUES (:id, :date, :total_sale, :total_profit, :tendered, :change)",
+                                    transactions)
+            target.conn.executemany(_INSERT_SALE, source.query_sales())
+    finally:
+        target.close()
+    return len(items), len(transactions)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+    migrate = sub.add_parser("migrate", help="import the CSV files into a SQLite database")
+    migrate.add_argument("db_file")
+    migrate.add_argument("--inventory", default="inventory.csv")
+    migrate.add_argument("--transactions", default="transactions.csv")
+    args = parser.parse_args(argv)
+
+    if args.command == "migrate":
+        items, transactions = migrate_csv_to_sqlite(args.db_file, args.inventory, args.transactions)
+        print(f"Imported {items} products and {transactions} transactions into {args.db_file}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""Tests for the headless checkout: cart totals, rejected checkouts and commits that fail."""
+import datetime
+
+import pytest
+
+from clevermart_core import (MARKUP, Cart, CheckoutEngine, CheckoutError, InsufficientStockError, InventoryManager,
+                             StorageError)
+from clevermart_storage import CSVBackend
+
+
+class FailingBackend(CSVBackend):
+    """A CSV backend whose commits raise while ``failing`` is set."""
+
+    failing = False
+
+    def commit(self, records, items, transactions=(), summary=()):
+        if self.failing:
+            raise OSError("disk full")
+        super().commit(records, items, transactions, summary)
+
+
+@pytest.fixture
+def manager(tmp_path):
+    inventory = InventoryManager(storage=FailingBackend(str(tmp_path / "inventory.csv")))
+    for name, quantity in (("Chips", 5), ("Soda", 2)):
+        inventory.add_item({"name": name, "price": 10.0, "quantity": quantity, "max": 10, "category": "Snacks & Sweets"})
+    yield inventory
+    inventory.storage.close()
+
+
+def cart_of(manager, **quantities):
+    cart = Cart()
+    for name, qty in quantities.items():
+        cart.add(manager.get_item(name), qty)
+    return cart
+
+
+def test_checkout_deducts_stock_and_records_the_sale(manager):
+    engine = CheckoutEngine(manager)
+    cart = cart_of(manager, Chips=2, Soda=2)
+    assert cart.total == pytest.approx(40.0 * MARKUP)
+    transaction = engine.checkout(cart, 50.0, datetime.datetime(2024, 5, 1, 12))
+
+    assert transaction["change"] == pytest.approx(50.0 - 40.0 * MARKUP)
+    assert manager.get_item("Chips").quantity == 3
+    assert manager.get_item("Soda") is None  # sold out
+    assert not len(cart) and engine.summary.get("product", "Chips")["count"] == 2
+
+
+def test_rejected_checkouts_leave_cart_and_stock_alone(manager):
+    engine = CheckoutEngine(manager)
+    with pytest.raises(CheckoutError):
+        engine.checkout(Cart(), 10.0)
+    cart = cart_of(manager, Chips=2)
+    with pytest.raises(CheckoutError):
+        engine.checkout(cart, 1.0)
+    with pytest.raises(InsufficientStockError):
+        cart.add(manager.get_item("Chips"), 4)
+    assert len(cart) == 1 and manager.get_item("Chips").quantity == 5
+
+
+def test_failed_commit_puts_the_stock_back(manager):
+    engine = CheckoutEngine(manager)
+    engine.ensure_summary()
+    events = []
+    manager.subscribe(lambda event, item: events.append((event, item["name"], item["quantity"])))
+    cart = cart_of(manager, Chips=2, Soda=2)
+    manager.storage.failing = True
+    with pytest.raises(StorageError):
+        engine.checkout(cart, 50.0)
+
+    soda = manager.get_item("Soda")
+    assert (manager.get_item("Chips").quantity, soda.quantity) == (5, 2)
+    assert list(manager.items_in_category("Snacks & Sweets")) == [manager.get_item("Chips"), soda]
+    assert manager.filter_items("sod", "All") == [soda]
+    assert events[-2:] == [("update", "Chips", 5), ("add", "Soda", 2)]
+    assert len(cart) == 2 and engine.summary.rows() == []
+
+    manager.storage.failing = False
+    engine.checkout(cart, 50.0)
+    assert manager.get_item("Chips").quantity == 3
+
+
+def test_failed_commit_undoes_replayed_deltas_and_imports(manager):
+    manager.storage.failing = True
+    with pytest.raises(StorageError):
+        manager.apply_deltas({"Chips": -5, "Soda": 3})
+    with pytest.raises(StorageError):
+        manager.bulk_import([{"name": "chips", "quantity": "1", "op": "restock"},
+                             {"name": "Gum", "price": "1.0", "quantity": "9"},
+                             {"name": "Soda", "category": "Beverages"}])
+
+    assert [(item.name, item.quantity, item.category) for item in manager.items] == [
+        ("Chips", 5, "Snacks & Sweets"), ("Soda", 2, "Snacks & Sweets")]
+    assert list(manager.items_in_category("Beverages")) == []
@@ -0,0 +1,113 @@
+"""Tests for the headless core: paged purchase history and the persisted sales summary."""
+import datetime
+import os
+import random
+
+import pytest
+
+from clevermart_core import Cart, CheckoutEngine, HistoryPages, InventoryManager
+from clevermart_storage import CSVBackend, TransactionLog
+
+
+def transactions(count, seed=0):
+    """count transactions a few minutes apart, starting 2024-05-01, with whole-cent amounts."""
+    rng = random.Random(seed)
+    moment = datetime.datetime(2024, 5, 1, 8)
+    history = []
+    for number in range(1, count + 1):
+        moment += datetime.timedelta(minutes=rng.randint(1, 240))
+        sale = rng.randint(100, 10000) / 100
+        history.append({"id": number, "date": moment.strftime("%Y-%m-%d %H:%M:%S"), "total_sale": sale,
+                        "total_profit": round(sale / 11, 2), "tendered": 100.0, "change": round(100.0 - sale, 2)})
+    return history
+
+
+@pytest.fixture
+def history_log(tmp_path):
+    history = transactions(500)
+    log = TransactionLog(str(tmp_path / "transactions.bin"))
+    log.append(history)
+    yield history, log
+    log.close()
+
+
+def brute_force(history, start, end):
+    return [t for t in history if (start is None or t["date"] >= start) and (end is None or t["date"] < end)]
+
+# =============================================================================
+# Purchase History: Paging and Date Bisection
+# =============================================================================
+@pytest.mark.parametrize("as_list", [False, True])
+def test_history_pages_match_brute_force(history_log, as_list):
+    history, log = history_log
+    pages = HistoryPages(list(log) if as_list else log, page_size=7)
+    rng = random.Random(1)
+    for _ in range(50):
+        start, end = sorted(rng.choice(history)["date"][:rng.choice((10, 19))] for _ in range(2))
+        pages.select(start, end)
+        wanted = brute_force(history, start, end)
+        seen = []
+        for page in range(pages.page_count):
+            pages.go(page)
+            seen.extend(pages.rows())
+        assert [t["id"] for t in seen] == [t["id"] for t in wanted]
+        assert pages.totals() == (len(wanted), sum(round(t["total_sale"] * 100) for t in wanted),
+                                  sum(round(t["total_profit"] * 100) for t in wanted))
+
+
+def test_history_pages_bounds(history_log):
+    _, log = history_log
+    pages = HistoryPages(log, page_size=50)
+    assert (pages.count, pages.page_count, pages.page) == (500, 10, 9)
+    pages.go(99)
+    assert pages.page_bounds() == (450, 500)
+    pages.go(-3)
+    assert pages.page_bounds() == (0, 50)
+    assert pages.page_totals()[0] == 50
+
+    pages.select("2030-01-01")
+    assert (pages.count, pages.page_count, pages.rows()) == (0, 1, [])
+    pages.select(datetime.date(2024, 5, 2), datetime.date(2024, 5, 1))
+    assert pages.count == 0
+
+
+def test_history_pages_with_clock_stepping_back(tmp_path):
+    dates = ["2024-11-03 01:40:00", "2024-11-03 01:05:00", "2024-11-03 01:50:00", "2024-11-03 01:10:00",
+             "2024-11-03 02:30:00"]
+    history = [dict(t, date=date) for t, date in zip(transactions(len(dates)), dates)]
+    log = TransactionLog(str(tmp_path / "transactions.bin"))
+    log.append(history)
+    for pages in (HistoryPages(log), HistoryPages(history)):
+        # Each transaction is placed by the latest time up to it.
+        assert [pages.index(date) for date in dates] == [0, 0, 2, 0, 4]
+        pages.select("2024-11-03 01:45:00", "2024-11-03 02:00:00")
+        assert [t["id"] for t in pages.rows()] == [3, 4]
+    log.close()
+
+# =============================================================================
+# Sales Summary: Rebuilt for Stores Without One
+# =============================================================================
+def sell(engine, manager, times):
+    for day in range(1, times + 1):
+        cart = Cart()
+        cart.add(manager.get_item("Chips"), 2)
+        engine.checkout(cart, 100.0, datetime.datetime(2024, 5, day, 12))
+
+
+def test_summary_is_built_for_store_without_one(tmp_path):
+    csv_file = str(tmp_path / "inventory.csv")
+    manager = InventoryManager(storage=CSVBackend(csv_file))
+    manager.add_item({"name": "Chips", "price": 10.0, "quantity": 50, "max": 50, "category": "Snacks & Sweets"})
+    sell(CheckoutEngine(manager), manager, 3)
+    manager.storage.close()
+    for name in ("sales_summary.csv", "sales_summary.log"):
+        if os.path.exists(tmp_path / name):
+            os.remove(tmp_path / name)
+
+    manager = InventoryManager(storage=CSVBackend(csv_file))
+    engine = CheckoutEngine(manager)
+    sell(engine, manager, 1)  # a sale before the summary is ever viewed
+    assert engine.summary.get("total")["count"] == 4
+    assert engine.summary.get("product", "Chips")["count"] == 8
+    assert engine.verify_summary() == []
+    manager.storage.close()
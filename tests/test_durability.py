@@ -0,0 +1,109 @@
+"""Tests for failed writes: torn journal appends, background writer retries and group commit."""
+import pytest
+
+import clevermart_storage
+from clevermart_storage import BackgroundWriter, CSVBackend
+
+
+def checkout(date, *names):
+    lines = [{"name": name, "category": "Snacks & Sweets", "quantity": 1, "cost": 1.0, "selling_price": 1.1}
+             for name in names]
+    return {"date": date, "total_sale": 1.1 * len(lines), "total_profit": 0.1 * len(lines), "tendered": 10.0,
+            "change": 10.0 - 1.1 * len(lines), "lines": lines}
+
+
+@pytest.fixture
+def tear(monkeypatch):
+    """tear(path, rows): the next append to path stores only that many rows and half of the next, then fails."""
+    append = clevermart_storage.append_journal
+    torn = {}
+
+    def append_journal(path, fieldnames, rows, sync=False):
+        if path not in torn:
+            return append(path, fieldnames, rows, sync)
+        append(path, fieldnames, rows[:torn.pop(path)], sync)
+        with open(path, "ab") as journal:
+            journal.write(b"2024-05-01 12:00:00,9")
+        raise OSError("disk full")
+
+    monkeypatch.setattr(clevermart_storage, "append_journal", append_journal)
+    return torn.__setitem__
+
+
+def stored_lines(store):
+    return [(line["transaction_id"], line["name"]) for line in store.query_sales()]
+
+
+def test_retry_after_torn_sales_append_stores_every_line(tmp_path, tear):
+    store = CSVBackend(str(tmp_path / "inventory.csv"))
+    store.commit([], None, [checkout("2024-05-01 09:00:00", "Chips")])
+    transactions = [checkout("2024-05-01 10:00:00", "Soda", "Gum"), checkout("2024-05-01 11:00:00", "Tea", "Jam", "Nuts")]
+    tear(store.sales_file, 3)  # Soda, Gum, Tea and part of Jam
+    with pytest.raises(OSError):
+        store.commit([], None, transactions)
+    store.commit([], None, transactions)  # the retry, with the same transaction dicts
+
+    assert stored_lines(store) == [(1, "Chips"), (2, "Soda"), (2, "Gum"), (3, "Tea"), (3, "Jam"), (3, "Nuts")]
+    assert [transaction["id"] for transaction in store.load_transactions()] == [1, 2, 3]
+    store.close()
+
+
+def test_retry_after_failed_transaction_append_does_not_repeat_lines(tmp_path, tear):
+    store = CSVBackend(str(tmp_path / "inventory.csv"))
+    transactions = [checkout("2024-05-01 10:00:00", "Soda", "Gum")]
+    tear(store.transactions_file, 0)
+    with pytest.raises(OSError):
+        store.commit([], None, transactions)
+    store.commit([], None, transactions)
+
+    assert stored_lines(store) == [(1, "Soda"), (1, "Gum")]
+    assert len(list(store.load_transactions())) == 1
+    store.close()
+
+
+def test_writer_retries_a_torn_batch_with_the_next_one(tmp_path, tear):
+    errors = []
+    writer = BackgroundWriter(CSVBackend(str(tmp_path / "inventory.csv")), on_error=errors.append)
+    tear(writer.backend.sales_file, 1)
+    writer.commit([], None, [checkout("2024-05-01 10:00:00", "Soda", "Gum")])
+    with pytest.raises(OSError):
+        writer.flush()
+    writer.commit([], None, [checkout("2024-05-01 11:00:00", "Tea")])
+    writer.flush()
+
+    assert len(errors) == 1 and writer.error is None
+    assert stored_lines(writer) == [(1, "Soda"), (1, "Gum"), (2, "Tea")]
+    writer.close()
+
+
+def test_writer_retries_only_the_snapshot_after_its_commit(tmp_path, monkeypatch):
+    backend = CSVBackend(str(tmp_path / "inventory.csv"), compact_threshold=1)
+    writer = BackgroundWriter(backend)
+    items = [{"name": "Chips", "price": 1.0, "quantity": 5, "max": 5, "category": "Other"}]
+    save_items = backend.save_items
+
+    def failing_save(rows):
+        monkeypatch.setattr(backend, "save_items", save_items)
+        raise OSError("disk full")
+
+    monkeypatch.setattr(backend, "save_items", failing_save)
+    writer.commit([dict(items[0], op="upsert"), dict(items[0], op="upsert")], items,
+                  [checkout("2024-05-01 10:00:00", "Chips")])
+    with pytest.raises(OSError):
+        writer.flush()
+    writer.commit([], None)
+    writer.flush()
+
+    assert len(writer.load_transactions()) == 1
+    assert [row["name"] for row in CSVBackend(backend.csv_file).load_items()] == ["Chips"]
+    writer.close()
+
+
+@pytest.mark.parametrize("durability", ["none", "fsync"])
+def test_group_commit_stores_every_job_in_order(tmp_path, durability):
+    writer = BackgroundWriter(CSVBackend(str(tmp_path / "inventory.csv"), durability=durability), group_ms=20)
+    for minute in range(10):
+        writer.commit([], None, [checkout(f"2024-05-01 10:{minute:02d}:00", f"Item {minute}")])
+    writer.flush()
+    assert [line["name"] for line in writer.query_sales()] == [f"Item {minute}" for minute in range(10)]
+    writer.close()
@@ -0,0 +1,63 @@
+"""Tests for the bulk supplier import: row validation, the error report and the single commit."""
+import pytest
+
+from clevermart_core import ImportRowError, InventoryManager, StorageError
+from clevermart_storage import CSVBackend
+
+
+@pytest.fixture
+def manager(tmp_path):
+    inventory = InventoryManager(storage=CSVBackend(str(tmp_path / "inventory.csv")))
+    inventory.add_item({"name": "Chips", "price": 10.0, "quantity": 5, "max": 50, "category": "Snacks & Sweets"})
+    yield inventory
+    inventory.storage.close()
+
+
+def test_rows_are_added_updated_and_restocked(manager):
+    report = manager.bulk_import([{"name": "Gum", "price": "1.5", "quantity": "20"},
+                                  {"name": " chips ", "price": "12"},
+                                  {"name": "CHIPS", "quantity": "3", "op": "Restock"}])
+
+    assert report == {"added": 1, "updated": 1, "restocked": 1, "errors": []}
+    assert dict(manager.get_item("Gum")) == {"name": "Gum", "price": 1.5, "quantity": 20, "max": 20,
+                                             "category": "Other"}
+    assert (manager.get_item("Chips").price, manager.get_item("Chips").quantity) == (12.0, 8)
+
+
+@pytest.mark.parametrize("row", [{"name": ""}, {"name": "Gum", "op": "delete"}, {"name": "Gum", "price": "1.0"},
+                                 {"name": "Gum", "quantity": "1", "op": "restock"},
+                                 {"name": "Chips", "quantity": "2.5"}, {"name": "Chips", "price": "-1"},
+                                 {"name": "Chips", "price": "inf"}, {"name": "Chips", "price": "nan"},
+                                 {"name": "Chips", "max": "1e400"}])
+def test_invalid_rows_are_reported_and_skipped(manager, row):
+    report = manager.bulk_import([row, {"name": "Soda", "price": "2", "quantity": "4"}], first_line=2)
+    assert [line for line, _ in report["errors"]] == [2]
+    assert report["added"] == 1
+    assert dict(manager.get_item("Chips")) == {"name": "Chips", "price": 10.0, "quantity": 5, "max": 50,
+                                               "category": "Snacks & Sweets"}
+
+
+def test_import_file_is_one_commit(manager, tmp_path, monkeypatch):
+    path = tmp_path / "supplier.csv"
+    path.write_text("name,price,quantity,op\nGum,1.0,9,\nChips,,4,restock\nBad,x,1,\n", encoding="utf-8")
+    commits = []
+    commit = manager.storage.commit
+    monkeypatch.setattr(manager.storage, "commit", lambda records, *args: commits.append(records) or
+                        commit(records, *args))
+
+    report = manager.import_file(str(path))
+    assert (report["added"], report["restocked"], report["errors"][0][0]) == (1, 1, 4)
+    assert [[record["name"] for record in records] for records in commits] == [["Gum", "Chips"]]
+
+    reopened = InventoryManager(storage=CSVBackend(manager.storage.csv_file))
+    assert (reopened.get_item("Gum").quantity, reopened.get_item("Chips").quantity) == (9, 9)
+    reopened.storage.close()
+
+
+def test_unreadable_import_file_raises(manager, tmp_path):
+    with pytest.raises(StorageError):
+        manager.import_file(str(tmp_path / "missing.csv"))
+    path = tmp_path / "no_names.csv"
+    path.write_text("sku,price\n1,2\n", encoding="utf-8")
+    with pytest.raises(ImportRowError):
+        manager.import_file(str(path))
@@ -0,0 +1,69 @@
+"""Tests for the opt-in timers, counters, exports and cProfile/tracemalloc capture."""
+import csv
+import json
+import tracemalloc
+
+import pytest
+
+from clevermart_metrics import Metrics
+
+
+@pytest.fixture
+def metrics():
+    collected = Metrics(window=3)
+    collected.enabled = True
+    return collected
+
+
+def test_disabled_metrics_record_nothing():
+    collected = Metrics()
+    with collected.timer("checkout"):
+        pass
+    collected.count("checkouts")
+    collected.record("load", 1.0)
+    assert collected.stats() == [] and collected.counters == {}
+
+
+def test_stats_keep_totals_and_a_rolling_window(metrics):
+    for seconds in (0.004, 0.001, 0.002, 0.003):
+        metrics.record("checkout", seconds)
+    metrics.count("checkouts", 4)
+
+    [row] = metrics.stats()
+    assert row["count"] == 4
+    assert row["total_ms"] == pytest.approx(10.0)
+    assert row["max_ms"] == pytest.approx(3.0)  # the 4 ms sample has left the window
+    assert metrics.counters == {"checkouts": 4}
+    metrics.reset()
+    assert metrics.stats() == [] and metrics.counters == {}
+
+
+def test_exports(metrics, tmp_path):
+    metrics.record("checkout", 0.002)
+    metrics.count("checkouts")
+    metrics.export_json(str(tmp_path / "metrics.json"))
+    metrics.export_csv(str(tmp_path / "metrics.csv"))
+
+    with open(tmp_path / "metrics.json") as f:
+        report = json.load(f)
+    assert report["counters"] == {"checkouts": 1}
+    assert [timer["name"] for timer in report["timers"]] == ["checkout"]
+    with open(tmp_path / "metrics.csv", newline="") as f:
+        assert [row["name"] for row in csv.DictReader(f)] == ["checkout", "checkouts"]
+
+
+def test_capture_writes_profile_and_memory_report(metrics, tmp_path):
+    metrics.start_capture()
+    assert metrics.capturing and tracemalloc.is_tracing()
+    sum(range(1000))
+    paths = metrics.stop_capture(str(tmp_path / "capture"))
+
+    assert [path.rsplit("capture", 1)[1] for path in paths] == [".pstats", "-memory.txt"]
+    assert not metrics.capturing and not tracemalloc.is_tracing()
+
+
+def test_failed_capture_write_still_stops_tracing(metrics, tmp_path):
+    metrics.start_capture()
+    with pytest.raises(OSError):
+        metrics.stop_capture(str(tmp_path / "missing" / "capture"))
+    assert not metrics.capturing and not tracemalloc.is_tracing()
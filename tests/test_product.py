@@ -0,0 +1,48 @@
+"""Tests for Product, the compact record that reads like the dict rows it replaced."""
+import csv
+import io
+
+import pytest
+
+from clevermart_core import Product
+from clevermart_storage import INVENTORY_FIELDS
+
+
+def chips():
+    return Product.from_row({"name": "Chips", "price": 10.0, "quantity": 5, "max": 50, "category": "Snacks & Sweets"})
+
+
+def test_product_reads_like_a_dict_row():
+    product = chips()
+    assert product["price"] == 10.0 and product.get("quantity") == 5
+    assert list(product) == INVENTORY_FIELDS and len(product) == 5
+    assert dict(product) == {"name": "Chips", "price": 10.0, "quantity": 5, "max": 50, "category": "Snacks & Sweets"}
+    assert "category" in product and "stock" not in product
+    assert product.get("stock", "-") == "-"
+    with pytest.raises(KeyError):
+        product["stock"]
+    with pytest.raises(KeyError):
+        product["__slots__"]
+
+
+def test_product_has_no_per_instance_dict():
+    product = chips()
+    assert not hasattr(product, "__dict__")
+    with pytest.raises(AttributeError):
+        product.colour = "red"
+
+
+def test_copy_is_independent_and_categories_are_shared():
+    product = chips()
+    copy = product.copy()
+    copy.quantity = 1
+    assert product.quantity == 5 and copy == dict(product, quantity=1)
+    other = Product("Gum", 1.0, 1, 1, "".join(["Snacks", " & ", "Sweets"]))
+    assert other.category is product.category
+
+
+def test_product_writes_as_a_csv_row():
+    out = io.StringIO()
+    writer = csv.DictWriter(out, fieldnames=INVENTORY_FIELDS)
+    writer.writerow(chips())
+    assert out.getvalue() == "Chips,10.0,5,50,Snacks & Sweets\r\n"
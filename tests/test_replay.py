@@ -0,0 +1,68 @@
+"""Tests for the parallel sales log replay: merging chunks, verifying and applying in one commit."""
+import pytest
+
+from clevermart_core import CheckoutEngine, CleverMartError, InventoryManager
+from clevermart_replay import apply_result, replay_logs, verify
+from clevermart_storage import SALE_FIELDS, CSVBackend, append_journal
+
+
+def sale(transaction_id, timestamp, name, quantity, category="Snacks & Sweets", cost=2.0, price=2.2):
+    return {"timestamp": timestamp, "transaction_id": transaction_id, "name": name, "category": category,
+            "quantity": quantity, "cost": cost, "selling_price": price}
+
+
+@pytest.fixture
+def log(tmp_path):
+    path = str(tmp_path / "till1" / "sales.csv")
+    (tmp_path / "till1").mkdir()
+    lines = []
+    for number in range(1, 41):
+        timestamp = f"2024-05-{1 + number // 10:02d} 12:{number:02d}:00"
+        lines.append(sale(number, timestamp, "Chips", 1))
+        if number % 3 == 0:
+            lines.append(sale(number, timestamp, "Soda", 2, category="Beverages", cost=1.0, price=1.1))
+    append_journal(path, SALE_FIELDS, lines)
+    return path
+
+
+def store(tmp_path):
+    manager = InventoryManager(storage=CSVBackend(str(tmp_path / "inventory.csv")))
+    for name in ("Chips", "Soda"):
+        manager.add_item({"name": name, "price": 2.0, "quantity": 100, "max": 100, "category": "Other"})
+    return manager
+
+
+@pytest.mark.parametrize("chunk_bytes", [64, 1000, 2 ** 20])
+def test_chunked_replay_matches_sequential(log, chunk_bytes):
+    result = replay_logs([log], workers=1, chunk_bytes=chunk_bytes)
+    assert (result.lines, result.transactions) == (53, 40)
+    assert result.deltas() == {"Chips": -40, "Soda": -26}
+    assert verify(result, [log]) == ([], [])
+
+
+def test_applied_replay_stores_the_history_behind_its_summary(tmp_path, log):
+    manager = store(tmp_path)
+    manager.storage.close()
+    storage = CSVBackend(manager.storage.csv_file)
+    try:
+        assert apply_result(replay_logs([log], workers=1, chunk_bytes=64), storage) == []
+    finally:
+        storage.close()
+
+    manager = InventoryManager(storage=CSVBackend(manager.storage.csv_file))
+    engine = CheckoutEngine(manager)
+    assert (manager.get_item("Chips")["quantity"], manager.get_item("Soda")["quantity"]) == (60, 74)
+    assert len(list(manager.storage.load_transactions())) == 40
+    assert engine.verify_summary() == []
+    assert engine.summary.get("product", "Soda")["count"] == 26
+    manager.storage.close()
+
+
+def test_logs_older_than_the_stored_history_are_refused(tmp_path, log):
+    manager = store(tmp_path)
+    manager.storage.commit([], None, [{"date": manager.storage.sale_time("2024-07-01 09:00:00"), "total_sale": 2.2,
+                                       "total_profit": 0.2, "tendered": 5.0, "change": 2.8}])
+    with pytest.raises(CleverMartError):
+        apply_result(replay_logs([log], workers=1), manager.storage)
+    assert len(list(manager.storage.load_transactions())) == 1
+    manager.storage.close()
@@ -0,0 +1,68 @@
+"""Tests for the NumPy sales reports: group-bys, rankings and loading from the CSV journals."""
+import numpy as np
+
+from clevermart_reports import SalesReport, _factorize, _group_sum
+from clevermart_storage import CSVBackend
+
+
+def line(transaction_id, timestamp, name, category, quantity, cost, price):
+    return {"timestamp": timestamp, "transaction_id": transaction_id, "name": name, "category": category,
+            "quantity": quantity, "cost": cost, "selling_price": price}
+
+
+TRANSACTIONS = [{"date": "2024-05-01 09:00:00", "total_sale": 13.2, "total_profit": 1.2},
+                {"date": "2024-05-01 18:30:00", "total_sale": 5.5, "total_profit": 0.5},
+                {"date": "2024-06-03 09:15:00", "total_sale": 11.0, "total_profit": 1.0}]
+LINES = [line(1, "2024-05-01 09:00:00", "Soda", "Beverages", 2, 2.0, 2.2),
+         line(1, "2024-05-01 09:00:00", "Chips", "Snacks & Sweets", 4, 2.0, 2.2),
+         line(2, "2024-05-01 18:30:00", "Crème", "Dairy", 1, 5.0, 5.5),
+         line(3, "2024-06-03 09:15:00", "Soda", "Beverages", 5, 2.0, 2.2)]
+
+
+def test_factorize_keeps_first_seen_order():
+    distinct, codes = _factorize(np.array(["b", "a", "b", "c", "a"], dtype=object))
+    assert list(distinct) == ["b", "a", "c"]
+    assert list(codes) == [0, 1, 0, 2, 1]
+    distinct, codes = _factorize(np.zeros(0, dtype=object))
+    assert (len(distinct), len(codes)) == (0, 0)
+
+
+def test_group_sum_is_exact_past_float_precision():
+    big = 2 ** 62
+    sums = _group_sum(np.array([0, 1, 0]), np.array([big, 7, 1], dtype=np.int64), 3)
+    assert sums.dtype == np.int64 and list(sums) == [big + 1, 7, 0]
+
+
+def test_reports_from_rows():
+    report = SalesReport.from_rows(TRANSACTIONS, LINES)
+    revenue = report.revenue("month")
+    assert [str(start) for start in revenue["period"]] == ["2024-05-01", "2024-06-01"]
+    assert list(revenue["transactions"]) == [2, 1] and list(revenue["sales"]) == [1870, 1100]
+    assert report.top_products(2) == [("Soda", 7, 1540, 140), ("Chips", 4, 880, 80)]
+    assert report.top_products(1, by="profit") == [("Soda", 7, 1540, 140)]
+    assert report.category_totals()[0] == ("Beverages", 7, 1540, 140)
+    baskets = report.basket_sizes()
+    assert (list(baskets["sizes"]), list(baskets["counts"]), baskets["median"]) == ([1, 5, 6], [1, 1, 1], 5.0)
+    assert report.hourly_heatmap("transactions")[2, 9] == 1  # 2024-05-01 was a Wednesday
+
+
+def test_between_filters_both_arrays():
+    report = SalesReport.from_rows(TRANSACTIONS, LINES).between("2024-05-01 12:00", "2024-06-01")
+    assert len(report.date) == 1 and report.top_products() == [("Crème", 1, 550, 50)]
+
+
+def test_load_parses_the_csv_journals(tmp_path):
+    store = CSVBackend(str(tmp_path / "inventory.csv"))
+    store.commit([], None, [dict(transaction, tendered=20.0, change=20.0 - transaction["total_sale"],
+                                 lines=[{key: row[key] for key in ("name", "category", "quantity", "cost",
+                                                                   "selling_price")}
+                                        for row in LINES if row["transaction_id"] == number])
+                            for number, transaction in enumerate(TRANSACTIONS, 1)])
+    try:
+        loaded = SalesReport.load(store)
+    finally:
+        store.close()
+
+    expected = SalesReport.from_rows(TRANSACTIONS, LINES)
+    assert loaded.top_products() == expected.top_products()
+    assert list(loaded.revenue("day")["sales"]) == list(expected.revenue("day")["sales"])
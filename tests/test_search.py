@@ -0,0 +1,48 @@
+"""Tests for the product name index behind the live inventory search."""
+import random
+
+from clevermart_core import InventoryManager, NameIndex
+from clevermart_storage import CSVBackend
+
+
+def brute_force(names, query):
+    query = query.lower()
+    prefixed = sorted((name for name in names if name.lower().startswith(query)), key=lambda name: (name.lower(), name))
+    rest = sorted((name for name in names if query in name.lower() and name not in prefixed), key=str.lower)
+    return prefixed + rest
+
+
+def test_search_matches_a_scan_as_names_come_and_go():
+    rng = random.Random(0)
+    words = ["Chips", "Choco", "Soda", "Milk", "Tea", "Jam", "Bread", "Cola", "Oat"]
+    names = {}
+    index = NameIndex(names.keys())
+    for step in range(300):
+        name = f"{rng.choice(words)} {rng.choice(words).lower()} {rng.randint(1, 40)}"
+        if name in names:
+            del names[name]
+            index.remove(name)
+        else:
+            names[name] = None
+            index.add(name)
+        if step % 10 == 0:
+            for query in ("c", "ch", "Cho", "oda", "A 1", "milk tea", "zz", "O"):
+                assert index.search(query) == brute_force(names, query)
+
+
+def test_prefix_is_alphabetical_and_case_insensitive():
+    index = NameIndex(["soda", "Salt", "Sugar", "Chips"])
+    assert index.prefix("S") == ["Salt", "soda", "Sugar"]
+    assert index.prefix("x") == []
+
+
+def test_filter_items_by_query_and_category(tmp_path):
+    manager = InventoryManager(storage=CSVBackend(str(tmp_path / "inventory.csv")))
+    for name, category in (("Chips", "Snacks & Sweets"), ("Choco Milk", "Beverages"), ("Milk", "Dairy")):
+        manager.add_item({"name": name, "price": 1.0, "quantity": 5, "max": 5, "category": category})
+    assert [item.name for item in manager.filter_items("milk", "All")] == ["Milk", "Choco Milk"]
+    assert [item.name for item in manager.filter_items("milk", "Beverages")] == ["Choco Milk"]
+    manager.rename_item("Milk", "Fresh Milk")
+    assert [item.name for item in manager.filter_items("fresh", "All")] == ["Fresh Milk"]
+    assert manager.filter_items("", "Dairy") == [manager.get_item("Fresh Milk")]
+    manager.storage.close()
@@ -0,0 +1,80 @@
+"""Tests for the inventory server: reservations, checkout, bad requests and the pipelined client."""
+import json
+import threading
+
+import pytest
+
+from clevermart_core import CheckoutError, CleverMartError, InsufficientStockError, StorageError
+from clevermart_server import (InventoryClient, InventoryServer, RemoteCheckoutEngine, RemoteInventoryManager,
+                               make_server)
+from clevermart_storage import CSVBackend
+
+
+@pytest.fixture
+def server(tmp_path):
+    storage = CSVBackend(str(tmp_path / "inventory.csv"))
+    inventory = InventoryServer(storage)
+    inventory.inventory_manager.add_item({"name": "Chips", "price": 10.0, "quantity": 5, "max": 50,
+                                          "category": "Snacks & Sweets"})
+    yield inventory
+    storage.close()
+
+
+def call(server, till, *requests):
+    return [json.loads(reply) for reply in server.handle_batch(till, list(requests))]
+
+
+def test_reservations_hold_stock_across_tills(server):
+    [first] = call(server, 1, {"id": 1, "op": "reserve", "args": {"name": "Chips", "qty": 4}})
+    [second] = call(server, 2, {"id": 1, "op": "reserve", "args": {"name": "Chips", "qty": 2}})
+    assert first["ok"] and (second["ok"], second["error"]) == (False, "InsufficientStockError")
+
+    call(server, 1, {"id": 2, "op": "release", "args": {"name": "Chips", "qty": 3}})
+    [sold, _] = call(server, 2, {"id": 2, "op": "reserve", "args": {"name": "Chips", "qty": 2}},
+                     {"id": 3, "op": "checkout", "args": {"tendered": 100.0}})
+    assert sold["ok"] and server.inventory_manager.get_item("Chips").quantity == 3
+    server.disconnect(1)
+    assert server.reserved == {}
+
+
+def test_bad_requests_get_error_replies(server):
+    replies = call(server, 1, ["not", "an", "object"], 7, {"id": 2, "op": "nope"},
+                   {"id": 3, "op": "reserve", "args": {"name": "Chips"}}, {"id": 4, "op": "ping"})
+    assert [(reply["id"], reply["ok"]) for reply in replies] == [(None, False), (None, False), (2, False),
+                                                                 (3, False), (4, True)]
+    assert replies[0]["message"].startswith("Bad request")
+
+
+def test_tills_cannot_clear_the_history(server):
+    [reply] = call(server, 1, {"id": 1, "op": "clear_transactions", "args": {}})
+    assert not reply["ok"] and "Unknown operation" in reply["message"]
+
+
+def test_client_round_trip(server):
+    listener = make_server("127.0.0.1:0", server)
+    thread = threading.Thread(target=listener.serve_forever, daemon=True)
+    thread.start()
+    client = InventoryClient("%s:%d" % listener.server_address)
+    try:
+        client.sock.sendall(b"[1, 2]\n")  # a till sending garbage keeps its connection
+        assert not client._read_reply()["ok"]
+        manager = RemoteInventoryManager(client)
+        manager.load_inventory_data()
+        engine = RemoteCheckoutEngine(manager)
+        with pytest.raises(CheckoutError):
+            client.call("checkout", tendered=10.0)
+        reserved, _ = client.call_many([("reserve", {"name": "Chips", "qty": 2}), ("cart", {})])
+        assert reserved["quantity"] == 2
+        with pytest.raises(InsufficientStockError):
+            client.call("reserve", name="Chips", qty=4)
+        client.call("checkout", tendered=50.0)
+        manager.sync()
+        assert manager.get_item("Chips").quantity == 3
+        with pytest.raises(StorageError):
+            engine.clear_transactions()
+        with pytest.raises(CleverMartError):
+            client.call("no_such_op")
+    finally:
+        client.close()
+        listener.shutdown()
+        listener.server_close()
@@ -0,0 +1,56 @@
+"""Tests for stock level buckets and low-stock alerts."""
+import pytest
+
+from clevermart_core import InventoryManager, stock_level
+from clevermart_storage import CSVBackend
+
+
+@pytest.fixture
+def manager(tmp_path):
+    inventory = InventoryManager(storage=CSVBackend(str(tmp_path / "inventory.csv")))
+    yield inventory
+    inventory.storage.close()
+
+
+@pytest.fixture
+def alerts(manager):
+    received = []
+    manager.subscribe_stock_alerts(lambda event, item: received.append((event, item["name"])))
+    return received
+
+
+def add(manager, name, quantity, max_stock=100):
+    return manager.add_item({"name": name, "price": 1.0, "quantity": quantity, "max": max_stock, "category": "Other"})
+
+
+@pytest.mark.parametrize("quantity, level", [(100, "sufficient"), (75, "sufficient"), (74, "moderate"),
+                                             (25, "moderate"), (24, "low"), (0, "low")])
+def test_stock_level_thresholds(quantity, level):
+    assert stock_level(quantity, 100) == level
+
+
+def test_buckets_follow_every_change(manager):
+    add(manager, "Chips", 90)
+    add(manager, "Soda", 50)
+    add(manager, "Gum", 10)
+    assert [item.name for item in manager.low_stock_items()] == ["Gum"]
+
+    manager.deduct_stock("Chips", 70)
+    manager.restock_item("Gum", 80)
+    manager.update_item("Soda", max=500)
+    assert {level: sorted(item.name for item in manager.items_with_level(level))
+            for level in ("sufficient", "moderate", "low")} == {"sufficient": ["Gum"], "moderate": [],
+                                                                "low": ["Chips", "Soda"]}
+    manager.rename_item("Chips", "Crisps")
+    assert manager.get_stock_level("Crisps") == "low" and manager.get_stock_level("Chips") is None
+
+
+def test_alerts_fire_on_entering_and_leaving_low(manager, alerts):
+    add(manager, "Chips", 30)
+    manager.deduct_stock("Chips", 2)   # moderate -> moderate
+    manager.deduct_stock("Chips", 10)  # moderate -> low
+    manager.deduct_stock("Chips", 1)   # low -> low
+    manager.restock_item("Chips", 60)  # low -> sufficient
+    add(manager, "Gum", 5)
+    manager.deduct_stock("Gum", 5)     # sells out while low
+    assert alerts == [("low", "Chips"), ("cleared", "Chips"), ("low", "Gum"), ("cleared", "Gum")]
@@ -0,0 +1,302 @@
+"""Round-trip and crash tests for the CSV backend's journals, snapshots and logs."""
+import csv
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from clevermart_storage import (INVENTORY_LOG_FIELDS, SALE_FIELDS, TRANSACTION_LOG_HEADER, TRANSACTION_RECORD,
+                                CSVBackend, TransactionLog, append_journal, last_journal_row, read_binary_snapshot,
+                                repair_journal)
+
+
+def item(name, quantity=10, price=5.0, category="Snacks & Sweets"):
+    return {"name": name, "price": price, "quantity": quantity, "max": 100, "category": category}
+
+
+def transaction(date, sale=10.0, profit=1.0):
+    return {"date": date, "total_sale": sale, "total_profit": profit, "tendered": 20.0, "change": 20.0 - sale}
+
+
+def summary_row(scope, key, count, sales):
+    return {"scope": scope, "key": key, "count": count, "sales": sales, "profit": sales / 10}
+
+
+@pytest.fixture
+def backend(tmp_path):
+    store = CSVBackend(str(tmp_path / "inventory.csv"))
+    yield store
+    store.close()
+
+
+def reopen(store):
+    store.close()
+    return CSVBackend(store.csv_file)
+
+
+def load(store):
+    return {row["name"]: row for row in store.load_items()}
+
+# =============================================================================
+# Journal Helpers
+# =============================================================================
+def test_repair_journal_truncates_torn_tail(tmp_path):
+    path = str(tmp_path / "sales.csv")
+    append_journal(path, INVENTORY_LOG_FIELDS, [dict(item("Chips"), op="upsert")])
+    size = os.path.getsize(path)
+    with open(path, "ab") as journal:
+        journal.write(b"upsert,Half a ro")
+
+    assert repair_journal(path) == size
+    assert os.path.getsize(path) == size
+    assert last_journal_row(path, INVENTORY_LOG_FIELDS)["name"] == "Chips"
+
+
+def test_last_journal_row_of_header_only_journal(tmp_path):
+    path = str(tmp_path / "sales.csv")
+    append_journal(path, SALE_FIELDS, [])
+    assert last_journal_row(path, SALE_FIELDS) is None
+    assert last_journal_row(str(tmp_path / "missing.csv"), SALE_FIELDS) is None
+
+# =============================================================================
+# Inventory: Write-Ahead Log and Compaction
+# =============================================================================
+def test_log_replays_over_snapshot(backend):
+    backend.save_items([item("Chips"), item("Soda"), item("Candy")])
+    backend.commit([dict(item("Chips", quantity=3), op="sell"),
+                    {"op": "delete", **item("Soda")},
+                    dict(item("Gum", quantity=7), op="upsert")],
+                   [item("Chips", quantity=3), item("Candy"), item("Gum", quantity=7)])
+
+    rows = load(reopen(backend))
+    assert list(rows) == ["Chips", "Candy", "Gum"]
+    assert rows["Chips"]["quantity"] == 3
+    assert rows["Gum"]["quantity"] == 7
+
+
+def test_compaction_folds_log_into_snapshot(tmp_path):
+    store = CSVBackend(str(tmp_path / "inventory.csv"), compact_threshold=2)
+    items = [item("Chips"), item("Soda")]
+    store.save_items(items)
+    for quantity in (9, 8, 7):
+        items[0] = item("Chips", quantity=quantity)
+        store.commit([dict(items[0], op="sell")], items)
+
+    assert os.path.getsize(store.log_file) == 0
+    with open(store.csv_file, newline="") as snapshot:
+        assert [row["quantity"] for row in csv.DictReader(snapshot)] == ["7", "10"]
+    assert load(reopen(store))["Chips"]["quantity"] == 7
+
+
+def test_torn_log_tail_is_dropped_on_load(backend):
+    backend.save_items([item("Chips")])
+    backend.commit([dict(item("Chips", quantity=4), op="sell")], [item("Chips", quantity=4)])
+    with open(backend.log_file, "ab") as log:
+        log.write(b"sell,Chips,5.0,1")
+
+    assert load(reopen(backend))["Chips"]["quantity"] == 4
+
+NON_ASCII_ROUND_TRIP = """
+import json
+from clevermart_storage import CSVBackend
+
+store = CSVBackend("inventory.csv", compact_threshold=1)
+store.save_items([{"name": "Crème", "price": 5.0, "quantity": 10, "max": 100, "category": "Crèmerie"}])
+store.commit([{"op": "upsert", "name": "Café", "price": 2.0, "quantity": 3, "max": 9, "category": "Crèmerie"}], None,
+             [{"date": "2024-05-01 10:00:00", "total_sale": 5.5, "total_profit": 0.5, "tendered": 10.0, "change": 4.5,
+               "lines": [{"name": "Crème", "category": "Crèmerie", "quantity": 1, "cost": 5.0, "selling_price": 5.5}]}],
+             [{"scope": "product", "key": "Crème", "count": 1, "sales": 5.5, "profit": 0.5}])
+store.save_summary(store.load_summary())
+store.close()
+store = CSVBackend("inventory.csv")
+print(json.dumps([[row["name"] for row in store.load_items()], [row["name"] for row in store.query_sales()],
+                  [row["key"] for row in store.load_summary()]]))
+store.close()
+"""
+
+
+def test_non_ascii_names_round_trip_under_an_ascii_locale(tmp_path):
+    env = dict(os.environ, LC_ALL="C", LANG="C", PYTHONUTF8="0", PYTHONCOERCECLOCALE="0",
+               PYTHONPATH=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    script = tmp_path / "round_trip.py"
+    script.write_text(NON_ASCII_ROUND_TRIP, encoding="utf-8")
+    output = subprocess.run([sys.executable, str(script)], cwd=tmp_path, env=env, capture_output=True,
+                            check=True).stdout
+    assert json.loads(output) == [["Crème", "Café"], ["Crème"], ["Crème"]]
+    # The files are UTF-8, whatever the locale that wrote them.
+    store = CSVBackend(str(tmp_path / "inventory.csv"))
+    assert load(store)["Crème"]["category"] == "Crèmerie"
+    store.close()
+    with open(tmp_path / "sales.csv", "rb") as sales:
+        assert "Crème".encode("utf-8") in sales.read()
+
+# =============================================================================
+# Inventory: Binary Snapshot
+# =============================================================================
+def test_binary_snapshot_round_trip(backend):
+    backend.save_items([item("Chips"), item("Soda", category="Beverages")])
+
+    names, prices, quantities, maxes, codes, categories = read_binary_snapshot(backend.snapshot_file, backend.csv_file)
+    assert names == ["Chips", "Soda"]
+    assert list(prices) == [5.0, 5.0]
+    assert [categories[code] for code in codes] == ["Snacks & Sweets", "Beverages"]
+    assert load(reopen(backend)) == {"Chips": item("Chips"), "Soda": item("Soda", category="Beverages")}
+
+
+def test_stale_binary_snapshot_falls_back_to_csv(backend):
+    backend.save_items([item("Chips")])
+    stale = backend.snapshot_file + ".old"
+    os.replace(backend.snapshot_file, stale)
+    backend.save_items([item("Chips"), item("Soda")])
+    os.replace(stale, backend.snapshot_file)
+
+    assert read_binary_snapshot(backend.snapshot_file, backend.csv_file) is None
+    assert list(load(reopen(backend))) == ["Chips", "Soda"]
+    # The full parse wrote a fresh binary snapshot.
+    assert read_binary_snapshot(backend.snapshot_file, backend.csv_file)[0] == ["Chips", "Soda"]
+
+
+@pytest.mark.parametrize("damage", ["truncate", "flip"])
+def test_damaged_binary_snapshot_falls_back_to_csv(backend, damage):
+    backend.save_items([item("Chips"), item("Soda")])
+    stat = os.stat(backend.csv_file)
+    with open(backend.snapshot_file, "r+b") as snapshot:
+        if damage == "truncate":
+            snapshot.truncate(os.path.getsize(backend.snapshot_file) - 3)
+        else:
+            snapshot.seek(-1, os.SEEK_END)
+            last = snapshot.read(1)
+            snapshot.seek(-1, os.SEEK_END)
+            snapshot.write(bytes([last[0] ^ 0xFF]))
+    os.utime(backend.csv_file, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+
+    assert read_binary_snapshot(backend.snapshot_file, backend.csv_file) is None
+    assert list(load(reopen(backend))) == ["Chips", "Soda"]
+
+# =============================================================================
+# Sales Summary: Generations
+# =============================================================================
+def totals(store):
+    return {(row["scope"], row["key"]): (row["count"], row["sales"]) for row in store.load_summary()}
+
+
+def test_summary_deltas_fold_and_survive_compaction(backend):
+    backend.commit([], None, summary=[summary_row("total", "", 1, 10.0)])
+    backend.commit([], None, summary=[summary_row("total", "", 2, 15.0), summary_row("day", "2024-05-01", 2, 15.0)])
+    backend.save_summary(backend.load_summary())
+
+    assert not os.path.exists(backend.summary_log_file)
+    assert totals(reopen(backend)) == {("total", ""): (3, 25.0), ("day", "2024-05-01"): (2, 15.0)}
+
+
+def test_log_left_by_crash_mid_compaction_is_not_counted_twice(backend):
+    backend.commit([], None, summary=[summary_row("total", "", 1, 10.0)])
+    with open(backend.summary_log_file, "rb") as log:
+        leftover = log.read()
+    backend.save_summary(backend.load_summary())
+    # The crash: the snapshot holds generation 1, but its log was never removed.
+    with open(backend.summary_log_file, "wb") as log:
+        log.write(leftover)
+
+    store = reopen(backend)
+    assert totals(store) == {("total", ""): (1, 10.0)}
+    store.commit([], None, summary=[summary_row("total", "", 1, 5.0)])
+    assert totals(reopen(store)) == {("total", ""): (2, 15.0)}
+
+# =============================================================================
+# Transaction Log: Layout, Crash Truncation and Catch-Up
+# =============================================================================
+def test_transaction_log_layout(tmp_path):
+    path = str(tmp_path / "transactions.bin")
+    log = TransactionLog(path)
+    log.append([dict(transaction("2024-05-01 10:00:00"), id=1),
+                dict(transaction("2024-05-01 11:00:00", sale=12.5, profit=2.25), id=2)], mark=99)
+    log.close()
+
+    with open(path, "rb") as data:
+        raw = data.read()
+    assert len(raw) == TRANSACTION_LOG_HEADER.size + 2 * TRANSACTION_RECORD.size
+    magic, _, record_size, count, mark = TRANSACTION_LOG_HEADER.unpack_from(raw)
+    assert (magic, record_size, count, mark) == (b"CMTXLOG\n", TRANSACTION_RECORD.size, 2, 99)
+    second = TRANSACTION_RECORD.unpack_from(raw, TRANSACTION_LOG_HEADER.size + TRANSACTION_RECORD.size)
+    assert second[0] == 2 and second[2:4] == (1250, 225)
+    assert second[6:8] == (2250, 325)  # running totals
+
+    log = TransactionLog(path)
+    assert log[1] == {"id": 2, "date": "2024-05-01 11:00:00", "total_sale": 12.5, "total_profit": 2.25,
+                      "tendered": 20.0, "change": 7.5}
+    assert log.totals(0, 2) == (2250, 325) and log.totals(1, 2) == (1250, 225)
+    assert log.bisect_date("2024-05-01 10:30:00") == 1
+    log.close()
+
+
+def test_transaction_log_ignores_unpublished_records(tmp_path):
+    path = str(tmp_path / "transactions.bin")
+    log = TransactionLog(path)
+    log.append([dict(transaction("2024-05-01 10:00:00"), id=1)])
+    log.close()
+    # A crash after writing a record but before publishing the new count.
+    with open(path, "ab") as data:
+        data.write(TRANSACTION_RECORD.pack(2, 0, 0, 0, 0, 0, 0, 0, 0)[:40])
+
+    log = TransactionLog(path)
+    assert len(log) == 1
+    log.append([dict(transaction("2024-05-01 11:00:00"), id=2)])
+    assert [record["id"] for record in log] == [1, 2]
+    log.close()
+
+
+def test_transaction_log_with_count_past_the_end_is_rebuilt(tmp_path):
+    path = str(tmp_path / "transactions.bin")
+    log = TransactionLog(path)
+    log.append([dict(transaction("2024-05-01 10:00:00"), id=i) for i in (1, 2, 3)], mark=500)
+    log.close()
+    with open(path, "r+b") as data:
+        data.truncate(TRANSACTION_LOG_HEADER.size + TRANSACTION_RECORD.size + 10)
+
+    log = TransactionLog(path)
+    assert (len(log), log.mark) == (0, 0)
+    log.close()
+
+
+def test_transaction_log_catches_up_from_journal(backend):
+    backend.commit([], None, [transaction("2024-05-01 10:00:00"), transaction("2024-05-01 11:00:00")])
+    log = backend.transaction_log()
+    assert [record["id"] for record in log] == [1, 2]
+    backend.close()
+    # Checkouts stored while the log was closed, then a log lost altogether.
+    store = CSVBackend(backend.csv_file)
+    store.commit([], None, [transaction("2024-05-01 12:00:00")])
+    store.close()
+    store = CSVBackend(backend.csv_file)
+    assert [record["date"] for record in store.transaction_log()][-1] == "2024-05-01 12:00:00"
+    store.close()
+    os.remove(backend.transaction_log_file)
+
+    store = CSVBackend(backend.csv_file)
+    assert [record["id"] for record in store.transaction_log()] == [1, 2, 3]
+    store.close()
+
+
+# =============================================================================
+# Sale Lines: A Clock Stepping Back
+# =============================================================================
+def test_sale_lines_follow_a_clock_stepping_back(backend):
+    dates = ["2024-11-03 01:50:00", "2024-11-03 01:10:00", "2024-11-03 01:20:00", "2024-11-03 02:05:00"]
+    for date in dates:
+        stored = dict(transaction(backend.sale_time(date)), lines=[
+            {"name": "Chips", "category": "Snacks & Sweets", "quantity": 1, "cost": 5.0, "selling_price": 5.5}])
+        backend.commit([], None, [stored])
+        assert stored["date"] == date
+
+    found = [line["transaction_id"] for line in backend.query_sales("2024-11-03 01:15:00", "2024-11-03 02:00:00")]
+    assert sorted(found) == [1, 3]
+    assert reopen(backend).latest_sale_time() == "2024-11-03 02:05:00"
+
+
+def test_large_clock_step_back_is_bounded(backend):
+    backend.commit([], None, [transaction(backend.sale_time("2024-05-01 12:00:00"))])
+    assert backend.sale_time("2024-04-01 12:00:00") == "2024-05-01 10:00:00"
+
@@ -0,0 +1,92 @@
+"""Tests for the background writer: coalesced batches and per-sale tickets."""
+import threading
+
+from clevermart_storage import BackgroundWriter, CSVBackend
+
+
+class GatedBackend(CSVBackend):
+    """A CSV backend whose commits wait for ``gate`` and raise while ``failing`` is set."""
+
+    failing = False
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.gate = threading.Event()
+        self.gate.set()
+        self.commits = []
+
+    def commit(self, records, items, transactions=(), summary=()):
+        self.gate.wait()
+        if self.failing:
+            raise OSError("disk full")
+        self.commits.append(records)
+        super().commit(records, items, transactions, summary)
+
+
+def sale(date):
+    return {"date": date, "total_sale": 2.0, "total_profit": 0.2, "tendered": 2.0, "change": 0.0}
+
+
+def item(quantity):
+    return {"op": "sell", "name": "Chips", "price": 1.0, "quantity": quantity, "max": 9, "category": "Other"}
+
+
+def test_direct_backends_have_always_stored(tmp_path):
+    store = CSVBackend(str(tmp_path / "inventory.csv"))
+    assert store.status(store.ticket()) == "stored"
+    store.close()
+
+
+def test_ticket_is_stored_once_its_job_is_written(tmp_path):
+    backend = GatedBackend(str(tmp_path / "inventory.csv"))
+    writer = BackgroundWriter(backend)
+    backend.gate.clear()
+    writer.commit([], None, [sale("2024-05-01 10:00:00")])
+    first = writer.ticket()
+    writer.commit([], None, [sale("2024-05-01 10:01:00")])
+    second = writer.ticket()
+    assert (writer.status(first), writer.status(second)) == ("pending", "pending")
+
+    backend.gate.set()
+    writer.flush()
+    assert (first, second) == (1, 2)
+    assert (writer.status(first), writer.status(second)) == ("stored", "stored")
+    writer.close()
+
+
+def test_failed_ticket_is_stored_by_the_retry(tmp_path):
+    backend = GatedBackend(str(tmp_path / "inventory.csv"))
+    errors = []
+    writer = BackgroundWriter(backend, on_error=errors.append)
+    writer.commit([], None, [sale("2024-05-01 10:00:00")])
+    writer.flush()
+    backend.failing = True
+    writer.commit([], None, [sale("2024-05-01 10:01:00")])
+    ticket = writer.ticket()
+    try:
+        writer.flush()
+    except OSError:
+        pass
+    assert (writer.status(1), writer.status(ticket), len(errors)) == ("stored", "failed", 1)
+
+    backend.failing = False
+    writer.commit([], None, [sale("2024-05-01 10:02:00")])
+    writer.flush()
+    assert writer.status(ticket) == writer.status(writer.ticket()) == "stored"
+    assert [transaction["id"] for transaction in writer.load_transactions()] == [1, 2, 3]
+    writer.close()
+
+
+def test_queued_records_collapse_to_each_products_final_state(tmp_path):
+    backend = GatedBackend(str(tmp_path / "inventory.csv"))
+    writer = BackgroundWriter(backend)
+    backend.gate.clear()
+    writer.commit([item(9)], None)  # taken by the worker, which then waits at the gate
+    for quantity in (8, 7, 6):
+        writer.commit([item(quantity)], None)
+    backend.gate.set()
+    writer.flush()
+
+    assert [[record["quantity"] for record in records] for records in backend.commits][-1] == [6]
+    assert sum(len(records) for records in backend.commits) <= 2
+    writer.close()